@@ -1,6 +1,5 @@
 from flask import Flask
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
 
 def create_app(config_name="default"):
     """
@@ -14,18 +13,56 @@ def create_app(config_name="default"):
     """
     app = Flask(__name__)
     
+    # 使用编译后的模型序列化函数，视图可直接jsonify模型对象
+    from app.core.serialization import FastJSONProvider
+    app.json = FastJSONProvider(app)
+    
     # 加载配置
     from app.config.config import config
     app.config.from_object(config[config_name])
     config[config_name].init_app(app)
     
+    # 请求指标最先注册，使其覆盖其他钩子的耗时
+    from app.core.metrics import request_metrics
+    request_metrics.init_app(app)
+    
+    # 响应压缩紧随其后注册，其after_request在其他钩子修改响应之后执行
+    from app.core.compression import response_compression
+    response_compression.init_app(app)
+    
     # 初始化扩展
+    from app.core.jwt_manager import CachingJWTManager
     CORS(app)  # 启用CORS
-    jwt = JWTManager(app)  # 初始化JWT
+    jwt = CachingJWTManager(app)  # 初始化JWT（带已验证令牌缓存）
     
     from app.core.extensions import init_extensions
     init_extensions(app)
     
+    from app.core.passwords import password_hasher
+    password_hasher.init_app(app)
+    
+    # 令牌吊销列表注册到JWT的吊销检查回调
+    from app.core.revocation import token_blocklist
+    token_blocklist.init_app(app, jwt)
+    
+    # 限流依赖JWT识别调用者，在JWT之后初始化
+    from app.core.rate_limit import agent_concurrency, rate_limiter
+    rate_limiter.init_app(app)
+    agent_concurrency.init_app(app)
+    
+    from app.core.idempotency import idempotency
+    idempotency.init_app(app)
+    
+    from app.agents import init_agent_pool, result_cache
+    init_agent_pool(app)
+    result_cache.init_app(app)
+    
+    from app.services.agent_job_service import job_runner
+    job_runner.init_app(app)
+    
+    from app.services.user_cache import user_cache
+    user_cache.init_app(app)
+        
     # 注册蓝图
     from app.api.v1 import api_bp
     app.register_blueprint(api_bp, url_prefix='/api/v1')
@@ -38,5 +75,5 @@ def create_app(config_name="default"):
     def health_check():
         """健康检查端点"""
         return {'status': 'ok'}, 200
-        
+    
     return app 
\ No newline at end of file
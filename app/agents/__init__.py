@@ -2,4 +2,8 @@
 Agent模块，包含各种Agent实现
 """
 
-from .agent_factory import get_agent 
\ No newline at end of file
+from .agent_factory import (
+    get_agent, get_agent_class, list_agent_types, register_agent_type, validate_agent_type,
+    acquire_agent, checkout_agent, agent_pool, init_agent_pool
+)
+from .result_cache import result_cache
@@ -1,15 +1,88 @@
 """
 Agent工厂模块
 """
+import importlib
+import threading
 from app.core.errors import ValidationError
-from .demo_agent import DemoAgent
+from .agent_pool import AgentPool
 
-# Agent类型映射
+# Agent类型注册表："类型名称" -> "模块路径:类名"
+# Agent类在首次使用时才导入，避免重量级依赖（torch、diffusers等）拖慢进程启动
 AGENT_TYPES = {
-    'demo': DemoAgent,
+    'demo': 'app.agents.demo_agent:DemoAgent',
     # 在这里添加更多Agent类型
 }
 
+# 已导入的Agent类缓存
+_agent_classes = {}
+_import_lock = threading.Lock()
+
+def register_agent_type(agent_type, target):
+    """
+    注册Agent类型
+    
+    Args:
+        agent_type (str): Agent类型名称
+        target (str|type): "模块路径:类名" 形式的字符串，或Agent类本身
+    """
+    with _import_lock:
+        _agent_classes.pop(agent_type, None)
+        if isinstance(target, str):
+            AGENT_TYPES[agent_type] = target
+        else:
+            AGENT_TYPES[agent_type] = f"{target.__module__}:{target.__qualname__}"
+            _agent_classes[agent_type] = target
+
+def list_agent_types():
+    """
+    列出所有已注册的Agent类型，不会触发Agent模块导入
+    
+    Returns:
+        list: Agent类型名称列表
+    """
+    return list(AGENT_TYPES.keys())
+
+def validate_agent_type(agent_type):
+    """
+    校验Agent类型是否已注册，不会触发Agent模块导入
+    
+    Args:
+        agent_type (str): Agent类型名称
+        
+    Raises:
+        ValidationError: 无效的Agent类型
+    """
+    if agent_type not in AGENT_TYPES:
+        raise ValidationError(f"无效的Agent类型: {agent_type}，支持的类型: {', '.join(AGENT_TYPES.keys())}")
+
+def get_agent_class(agent_type):
+    """
+    获取指定类型的Agent类，首次调用时导入对应模块
+    
+    Args:
+        agent_type (str): Agent类型名称
+        
+    Returns:
+        type: Agent类
+        
+    Raises:
+        ValidationError: 无效的Agent类型
+    """
+    agent_class = _agent_classes.get(agent_type)
+    if agent_class is not None:
+        return agent_class
+        
+    validate_agent_type(agent_type)
+    
+    with _import_lock:
+        agent_class = _agent_classes.get(agent_type)
+        if agent_class is None:
+            module_path, _, class_name = AGENT_TYPES[agent_type].partition(':')
+            module = importlib.import_module(module_path)
+            agent_class = getattr(module, class_name)
+            _agent_classes[agent_type] = agent_class
+    return agent_class
+
 def get_agent(agent_type, config=None):
     """
     获取指定类型的Agent实例
@@ -24,11 +97,59 @@ def get_agent(agent_type, config=None):
     Raises:
         ValidationError: 无效的Agent类型
     """
-    if agent_type not in AGENT_TYPES:
-        raise ValidationError(f"无效的Agent类型: {agent_type}，支持的类型: {', '.join(AGENT_TYPES.keys())}")
-        
     # 获取Agent类
-    agent_class = AGENT_TYPES[agent_type]
+    agent_class = get_agent_class(agent_type)
     
     # 创建并返回Agent实例
-    return agent_class(config) 
\ No newline at end of file
+    return agent_class(config)
+
+# 当前工作进程的Agent池
+agent_pool = AgentPool(get_agent)
+
+def acquire_agent(agent_type, config=None):
+    """
+    从Agent池借出指定类型的Agent，用于with语句，退出时自动归还
+    
+    Args:
+        agent_type (str): Agent类型名称
+        config (dict, optional): Agent配置
+        
+    Returns:
+        ContextManager[BaseAgent]: 产出Agent实例的上下文管理器
+        
+    Raises:
+        ValidationError: 无效的Agent类型
+    """
+    validate_agent_type(agent_type)
+    return agent_pool.acquire(agent_type, config)
+
+def checkout_agent(agent_type, config=None):
+    """
+    从Agent池借出指定类型的Agent，调用方负责通过agent_pool.checkin归还
+    
+    适用于生命周期跨越请求处理函数的场景（例如流式响应）。
+    
+    Args:
+        agent_type (str): Agent类型名称
+        config (dict, optional): Agent配置
+        
+    Returns:
+        BaseAgent: Agent实例
+        
+    Raises:
+        ValidationError: 无效的Agent类型
+    """
+    validate_agent_type(agent_type)
+    return agent_pool.checkout(agent_type, config)
+
+def init_agent_pool(app):
+    """
+    根据应用配置设置Agent池参数
+    
+    Args:
+        app: Flask应用实例
+    """
+    agent_pool.configure(
+        max_size=app.config.get('AGENT_POOL_MAX_SIZE', 32),
+        idle_ttl=app.config.get('AGENT_POOL_IDLE_TTL', 300.0)
+    )
@@ -0,0 +1,226 @@
+"""
+Agent实例池
+
+每个工作进程维护一个Agent池，按 (Agent类型, 配置摘要) 复用已初始化的实例，
+避免每个请求重复执行 initialize/cleanup。实例通过 checkout/checkin 显式借出与归还，
+同一实例在同一时刻只会被一个请求持有。
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from app.utils.digest import stable_digest
+
+class AgentPool:
+    """
+    带LRU淘汰与空闲过期的Agent实例池
+    """
+
+    def __init__(self, factory, max_size=32, idle_ttl=300.0):
+        """
+        初始化Agent池
+
+        Args:
+            factory: 创建Agent实例的函数，签名为 factory(agent_type, config)
+            max_size (int): 池中最多保留的空闲实例数，0表示禁用池化
+            idle_ttl (float): 空闲实例的最长保留秒数
+        """
+        self._factory = factory
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        # key -> deque[(agent, 归还时间)]，OrderedDict顺序即LRU顺序
+        self._idle = OrderedDict()
+        self._idle_count = 0
+        self._checked_out = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def configure(self, max_size=None, idle_ttl=None):
+        """
+        更新池参数，超出新容量的空闲实例会被立即淘汰
+
+        Args:
+            max_size (int, optional): 最大空闲实例数
+            idle_ttl (float, optional): 空闲过期秒数
+        """
+        with self._lock:
+            if max_size is not None:
+                self.max_size = max_size
+            if idle_ttl is not None:
+                self.idle_ttl = idle_ttl
+            released = self._evict_overflow_locked()
+        self._close_all(released)
+
+    @staticmethod
+    def make_key(agent_type, config=None):
+        """
+        计算池键
+
+        Args:
+            agent_type (str): Agent类型
+            config (dict, optional): Agent配置
+
+        Returns:
+            tuple: (agent_type, 配置摘要)
+        """
+        return agent_type, stable_digest(config or {})
+
+    def checkout(self, agent_type, config=None):
+        """
+        借出一个Agent实例，池中无可用实例时新建
+
+        Args:
+            agent_type (str): Agent类型
+            config (dict, optional): Agent配置
+
+        Returns:
+            BaseAgent: Agent实例
+        """
+        key = self.make_key(agent_type, config)
+        with self._lock:
+            released = self._expire_locked(time.monotonic())
+            agent = None
+            bucket = self._idle.get(key)
+            if bucket:
+                agent, _ = bucket.pop()
+                self._idle_count -= 1
+                if not bucket:
+                    del self._idle[key]
+                self._hits += 1
+            else:
+                self._misses += 1
+            self._checked_out += 1
+        self._close_all(released)
+
+        if agent is not None:
+            agent._pool_key = key
+            return agent
+
+        try:
+            agent = self._factory(agent_type, config)
+        except Exception:
+            with self._lock:
+                self._checked_out -= 1
+            raise
+        agent._pool_key = key
+        return agent
+
+    def checkin(self, agent, discard=False):
+        """
+        归还Agent实例
+
+        Args:
+            agent (BaseAgent): 通过checkout借出的实例
+            discard (bool): 为True时直接销毁实例而不放回池中（例如处理过程中出错）
+        """
+        key = getattr(agent, '_pool_key', None)
+        if not discard:
+            try:
+                agent.reset()
+            except Exception:
+                discard = True
+
+        with self._lock:
+            self._checked_out = max(self._checked_out - 1, 0)
+            if discard or key is None or self.max_size <= 0:
+                released = [agent]
+            else:
+                self._idle.setdefault(key, deque()).append((agent, time.monotonic()))
+                self._idle.move_to_end(key)
+                self._idle_count += 1
+                released = self._evict_overflow_locked()
+        self._close_all(released)
+
+    @contextmanager
+    def acquire(self, agent_type, config=None):
+        """
+        以上下文管理器方式借出Agent，退出时自动归还；处理异常时销毁实例
+
+        Args:
+            agent_type (str): Agent类型
+            config (dict, optional): Agent配置
+
+        Yields:
+            BaseAgent: Agent实例
+        """
+        agent = self.checkout(agent_type, config)
+        try:
+            yield agent
+        except BaseException:
+            self.checkin(agent, discard=True)
+            raise
+        else:
+            self.checkin(agent)
+
+    def clear(self):
+        """
+        清空池中所有空闲实例
+        """
+        with self._lock:
+            released = [agent for bucket in self._idle.values() for agent, _ in bucket]
+            self._idle.clear()
+            self._idle_count = 0
+        self._close_all(released)
+
+    def stats(self):
+        """
+        获取池统计信息
+
+        Returns:
+            dict: 命中、未命中、淘汰等计数
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'max_size': self.max_size,
+                'idle_ttl': self.idle_ttl,
+                'idle': self._idle_count,
+                'checked_out': self._checked_out,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'hit_rate': self._hits / lookups if lookups else 0.0
+            }
+
+    def _expire_locked(self, now):
+        """移除超过空闲时间的实例，返回待清理的实例列表"""
+        released = []
+        if self.idle_ttl is None or self.idle_ttl <= 0:
+            return released
+        deadline = now - self.idle_ttl
+        for key in list(self._idle.keys()):
+            bucket = self._idle[key]
+            # 每个队列按归还时间递增，最旧的在左侧
+            while bucket and bucket[0][1] < deadline:
+                released.append(bucket.popleft()[0])
+                self._idle_count -= 1
+                self._expirations += 1
+            if not bucket:
+                del self._idle[key]
+        return released
+
+    def _evict_overflow_locked(self):
+        """按LRU顺序淘汰超出容量的实例，返回待清理的实例列表"""
+        released = []
+        while self._idle_count > max(self.max_size, 0):
+            key, bucket = next(iter(self._idle.items()))
+            released.append(bucket.popleft()[0])
+            self._idle_count -= 1
+            self._evictions += 1
+            if not bucket:
+                del self._idle[key]
+        return released
+
+    @staticmethod
+    def _close_all(agents):
+        """在锁外清理实例，避免耗时的cleanup阻塞其他请求"""
+        for agent in agents:
+            try:
+                agent.close()
+            except Exception:
+                pass
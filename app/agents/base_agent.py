@@ -8,6 +8,11 @@ class BaseAgent(ABC):
     基础Agent抽象类，所有Agent必须继承此类
     """
     
+    # 相同类型、配置和输入总是产生相同结果的Agent可声明为可缓存
+    cacheable = False
+    # 结果缓存的过期秒数，None表示使用全局默认值
+    cache_ttl = None
+    
     def __init__(self, config=None):
         """
         初始化Agent
@@ -16,6 +21,7 @@ class BaseAgent(ABC):
             config: Agent配置
         """
         self.config = config or {}
+        self._closed = False
         self.initialize()
         
     def initialize(self):
@@ -38,14 +44,66 @@ class BaseAgent(ABC):
         """
         pass
         
+    def process_batch(self, inputs, **kwargs):
+        """
+        批量处理输入数据，默认逐个调用process，子类可重写为向量化实现
+        
+        单个输入失败不影响其他输入：失败项在结果列表的对应位置返回异常对象。
+        
+        Args:
+            inputs (list): 输入数据列表
+            **kwargs: 额外参数
+            
+        Returns:
+            list: 与inputs顺序一致的结果列表，元素为处理结果或Exception实例
+        """
+        results = []
+        for input_data in inputs:
+            try:
+                results.append(self.process(input_data, **kwargs))
+            except Exception as e:
+                results.append(e)
+        return results
+        
+    def process_stream(self, input_data, **kwargs):
+        """
+        以生成器方式逐步产出处理结果，默认一次性产出process的结果
+        
+        生成产出的每一项都会立即发送给客户端；客户端断开时生成器会被close，
+        子类可在finally中停止正在进行的计算。
+        
+        Args:
+            input_data: 输入数据
+            **kwargs: 额外参数
+            
+        Yields:
+            部分处理结果
+        """
+        yield self.process(input_data, **kwargs)
+        
+    def reset(self):
+        """
+        归还到Agent池前重置请求级状态，可被子类重写
+        """
+        pass
+        
     def cleanup(self):
         """
         清理资源，可被子类重写
         """
         pass
         
+    def close(self):
+        """
+        释放Agent，保证cleanup只执行一次
+        """
+        if getattr(self, '_closed', True):
+            return
+        self._closed = True
+        self.cleanup()
+        
     def __del__(self):
         """
         析构函数，确保资源被清理
         """
-        self.cleanup() 
\ No newline at end of file
+        self.close()
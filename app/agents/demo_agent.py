@@ -8,6 +8,8 @@ class DemoAgent(BaseAgent):
     示例Agent，提供基本的回声功能
     """
     
+    cacheable = True
+    
     def initialize(self):
         """
         初始化Agent
@@ -34,6 +36,25 @@ class DemoAgent(BaseAgent):
             'kwargs': kwargs
         }
         
+    def process_stream(self, input_data, **kwargs):
+        """
+        逐词流式返回回声结果
+        
+        Args:
+            input_data: 输入数据
+            **kwargs: 额外参数
+            
+        Yields:
+            dict: 部分处理结果
+        """
+        words = f"Echo: {input_data}".split(' ')
+        for index, word in enumerate(words):
+            yield {
+                'agent_name': self.name,
+                'index': index,
+                'delta': word if index == 0 else f" {word}"
+            }
+        
     def cleanup(self):
         """
         清理资源
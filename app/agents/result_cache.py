@@ -0,0 +1,165 @@
+"""
+Agent结果缓存
+
+对声明为可缓存（cacheable=True）的确定性Agent，按 (agent_type, config, input)
+的规范化摘要缓存处理结果。内存LRU层为每个工作进程独享，可选的磁盘层为同一主机
+上的所有工作进程共享。
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.local_store import LocalStore, local_store_path
+from app.utils.digest import stable_digest
+
+_DISK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS agent_results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+class ResultCache:
+    """
+    两级Agent结果缓存
+    """
+    
+    def __init__(self, max_entries=1024, default_ttl=300.0):
+        """
+        初始化缓存
+        
+        Args:
+            max_entries (int): 内存层最多缓存的结果数
+            default_ttl (float): Agent未声明TTL时使用的过期秒数
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = {}
+        self.enabled = True
+        self._memory = OrderedDict()
+        self._disk = None
+        self._lock = threading.Lock()
+        self._writes = 0
+    
+    def init_app(self, app):
+        """
+        根据应用配置初始化缓存
+        
+        Args:
+            app: Flask应用实例
+        """
+        self.enabled = app.config.get('AGENT_CACHE_ENABLED', True)
+        self.max_entries = app.config.get('AGENT_CACHE_MAX_ENTRIES', 1024)
+        self.default_ttl = app.config.get('AGENT_CACHE_DEFAULT_TTL', 300.0)
+        self.ttls = dict(app.config.get('AGENT_CACHE_TTLS') or {})
+        self._disk = None
+        if app.config.get('AGENT_CACHE_DISK_ENABLED'):
+            path = app.config.get('AGENT_CACHE_DISK_PATH') or local_store_path(app, 'agent_cache.db')
+            self._disk = LocalStore(path, _DISK_SCHEMA)
+        self.clear_memory()
+    
+    @staticmethod
+    def make_key(agent_type, config, input_data):
+        """
+        计算缓存键
+        
+        Args:
+            agent_type (str): Agent类型
+            config (dict): Agent配置
+            input_data: 输入数据
+        
+        Returns:
+            str: 规范化摘要
+        """
+        return stable_digest([agent_type, config or {}, input_data])
+    
+    def ttl_for(self, agent_type, agent_class):
+        """
+        获取Agent类型的缓存过期秒数，配置优先于Agent类声明
+        
+        Args:
+            agent_type (str): Agent类型
+            agent_class (type): Agent类
+        
+        Returns:
+            float: 过期秒数
+        """
+        if agent_type in self.ttls:
+            return self.ttls[agent_type]
+        return getattr(agent_class, 'cache_ttl', None) or self.default_ttl
+    
+    def get(self, key):
+        """
+        查询缓存，内存层未命中时回落到磁盘层
+        
+        Args:
+            key (str): 缓存键
+        
+        Returns:
+            tuple: (是否命中, 结果)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    return True, value
+                del self._memory[key]
+        
+        if self._disk is None:
+            return False, None
+        row = self._disk.connect().execute(
+            'SELECT value, expires_at FROM agent_results WHERE key = ? AND expires_at > ?',
+            (key, now)
+        ).fetchone()
+        if row is None:
+            return False, None
+        value = json.loads(row[0])
+        self._set_memory(key, value, row[1])
+        return True, value
+    
+    def set(self, key, value, ttl):
+        """
+        写入缓存
+        
+        Args:
+            key (str): 缓存键
+            value: 可JSON序列化的结果
+            ttl (float): 过期秒数
+        """
+        if ttl is None or ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        self._set_memory(key, value, expires_at)
+        
+        if self._disk is None:
+            return
+        with self._disk.transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO agent_results (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value, separators=(',', ':'), default=str), expires_at)
+            )
+            # 定期顺带清理过期条目，避免磁盘层无限增长
+            self._writes += 1
+            if self._writes % 256 == 0:
+                conn.execute('DELETE FROM agent_results WHERE expires_at <= ?', (time.time(),))
+    
+    def clear_memory(self):
+        """清空内存层"""
+        with self._lock:
+            self._memory.clear()
+    
+    def _set_memory(self, key, value, expires_at):
+        """写入内存层并按LRU淘汰"""
+        with self._lock:
+            self._memory[key] = (value, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+# 当前工作进程的结果缓存
+result_cache = ResultCache()
@@ -9,4 +9,5 @@ api_bp = Blueprint('api_v1', __name__)
 # 导入所有路由
 from . import routes
 from . import auth_routes
-from . import agent_routes 
\ No newline at end of file
+from . import agent_routes 
+from . import user_routes
\ No newline at end of file
@@ -1,14 +1,23 @@
 """
 Agent相关路由
 """
-from flask import jsonify, request
-from flask_jwt_extended import jwt_required
+from flask import Response, current_app, jsonify, request, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from . import api_bp
-from app.agents import get_agent
-from app.core.errors import ValidationError
+from app.agents import (
+    acquire_agent, checkout_agent, get_agent_class, agent_pool, result_cache
+)
+# 视图函数与之同名，使用别名避免视图调用自身
+from app.agents import list_agent_types as available_agent_types
+from app.core.compression import conditional_get
+from app.core.errors import APIError, ValidationError
+from app.core.idempotency import idempotent
+from app.core.rate_limit import agent_concurrency
+from app.services.agent_job_service import AgentJobService
 
 @api_bp.route('/agents', methods=['GET'])
 @jwt_required()
+@conditional_get
 def list_agent_types():
     """
     列出所有可用的Agent类型
@@ -16,15 +25,14 @@ def list_agent_types():
     Returns:
         JSON: 包含Agent类型列表的响应
     """
-    from app.agents.agent_factory import AGENT_TYPES
-    
     return jsonify({
         'status': 'success',
-        'agent_types': list(AGENT_TYPES.keys())
+        'agent_types': available_agent_types()
     })
 
 @api_bp.route('/agents/process', methods=['POST'])
 @jwt_required()
+@idempotent
 def process_with_agent():
     """
     使用指定Agent处理请求
@@ -47,14 +55,255 @@ def process_with_agent():
     if input_data is None:
         raise ValidationError('缺少input字段')
         
-    # 获取Agent实例
-    agent = get_agent(agent_type, agent_config)
+    # 可缓存的Agent先查结果缓存
+    agent_class = get_agent_class(agent_type)
+    cache_key = None
+    if agent_class.cacheable and result_cache.enabled:
+        cache_key = result_cache.make_key(agent_type, agent_config, input_data)
+        hit, result = result_cache.get(cache_key)
+        if hit:
+            response = jsonify({
+                'status': 'success',
+                'agent_type': agent_type,
+                'result': result
+            })
+            response.headers['X-Cache'] = 'HIT'
+            return response
+        
+    # 占用该Agent类型的处理名额，再从Agent池借出实例处理输入，结束后自动归还
+    with agent_concurrency.slot(agent_type), acquire_agent(agent_type, agent_config) as agent:
+        result = agent.process(input_data)
     
-    # 处理输入
-    result = agent.process(input_data)
+    response = jsonify({
+        'status': 'success',
+        'agent_type': agent_type,
+        'result': result
+    })
+    if cache_key is not None:
+        result_cache.set(cache_key, result, result_cache.ttl_for(agent_type, agent_class))
+        response.headers['X-Cache'] = 'MISS'
+    return response
+
+@api_bp.route('/agents/process/batch', methods=['POST'])
+@jwt_required()
+@idempotent
+def process_batch_with_agent():
+    """
+    使用指定Agent批量处理多个输入
+    
+    结果按输入顺序返回，单个输入失败只会在对应位置返回错误信息。
+        
+    Returns:
+        JSON: 批量处理结果
+    """
+    if not request.is_json:
+        raise ValidationError('请求必须是JSON格式')
+    
+    # 获取请求数据
+    data = request.json
+    agent_type = data.get('agent_type')
+    agent_config = data.get('config', {})
+    inputs = data.get('inputs')
+    
+    # 验证必要字段
+    if not agent_type:
+        raise ValidationError('缺少agent_type字段')
+    if not isinstance(inputs, list):
+        raise ValidationError('inputs字段必须是列表')
+    max_size = current_app.config.get('AGENT_BATCH_MAX_SIZE', 1000)
+    if len(inputs) > max_size:
+        raise ValidationError(f'inputs数量超过上限: {max_size}')
+        
+    with agent_concurrency.slot(agent_type), acquire_agent(agent_type, agent_config) as agent:
+        outputs = agent.process_batch(inputs)
+        
+    if len(outputs) != len(inputs):
+        raise APIError('Agent返回的结果数量与输入不一致', status_code=500)
     
+    results = []
+    failed = 0
+    for index, output in enumerate(outputs):
+        if isinstance(output, Exception):
+            failed += 1
+            if isinstance(output, APIError):
+                message = output.message
+            else:
+                # 未预期的异常只记录在服务端日志，不向客户端暴露内部细节
+                current_app.logger.error('Agent批量处理失败: %s[%d]', agent_type, index, exc_info=output)
+                message = '服务器内部错误'
+            results.append({'index': index, 'status': 'error', 'message': message})
+        else:
+            results.append({'index': index, 'status': 'success', 'result': output})
+            
     return jsonify({
         'status': 'success',
         'agent_type': agent_type,
-        'result': result
-    }) 
\ No newline at end of file
+        'total': len(results),
+        'failed': failed,
+        'results': results
+    })
+
+# 流式响应支持的格式与对应的MIME类型
+STREAM_FORMATS = {
+    'sse': 'text/event-stream',
+    'ndjson': 'application/x-ndjson'
+}
+
+def _select_stream_format():
+    """根据format查询参数或Accept请求头选择流式格式，默认SSE"""
+    stream_format = request.args.get('format')
+    if stream_format:
+        if stream_format not in STREAM_FORMATS:
+            raise ValidationError(f"无效的流格式: {stream_format}，支持的格式: {', '.join(STREAM_FORMATS.keys())}")
+        return stream_format
+    best = request.accept_mimetypes.best_match(list(STREAM_FORMATS.values()))
+    if best == STREAM_FORMATS['ndjson']:
+        return 'ndjson'
+    return 'sse'
+
+def _encode_stream_event(stream_format, event, payload):
+    """将单个事件编码为SSE或NDJSON格式的字节串"""
+    body = current_app.json.dumps(payload)
+    if stream_format == 'sse':
+        return f"event: {event}\ndata: {body}\n\n".encode('utf-8')
+    return f"{body}\n".encode('utf-8')
+
+@api_bp.route('/agents/process/stream', methods=['POST'])
+@jwt_required()
+def process_stream_with_agent():
+    """
+    使用指定Agent流式处理请求，边生成边发送部分结果
+    
+    通过 ?format=sse|ndjson 或 Accept 请求头选择格式。客户端断开连接时，
+    服务器在下一次写出失败后关闭生成器，Agent的process_stream随之停止。
+        
+    Returns:
+        Response: 分块传输的流式响应
+    """
+    if not request.is_json:
+        raise ValidationError('请求必须是JSON格式')
+    
+    # 获取请求数据
+    data = request.json
+    agent_type = data.get('agent_type')
+    agent_config = data.get('config', {})
+    input_data = data.get('input')
+    
+    # 验证必要字段
+    if not agent_type:
+        raise ValidationError('缺少agent_type字段')
+    if input_data is None:
+        raise ValidationError('缺少input字段')
+    stream_format = _select_stream_format()
+    
+    # 在开始响应前占用名额并借出Agent，使名额已满、无效类型等错误仍以普通JSON错误返回；
+    # 名额在整个流式响应期间保持占用
+    lease_id = agent_concurrency.acquire(agent_type)
+    try:
+        agent = checkout_agent(agent_type, agent_config)
+    except Exception:
+        agent_concurrency.release(lease_id)
+        raise
+    
+    released = []
+    
+    def release(discard=False):
+        # 生成器的finally与响应关闭回调都会调用，保证只归还一次
+        if not released:
+            released.append(True)
+            agent_pool.checkin(agent, discard=discard)
+            agent_concurrency.release(lease_id)
+            
+    def generate():
+        chunks = agent.process_stream(input_data)
+        failed = False
+        try:
+            for chunk in chunks:
+                yield _encode_stream_event(stream_format, 'chunk', {'status': 'success', 'result': chunk})
+            yield _encode_stream_event(stream_format, 'end', {'status': 'success', 'agent_type': agent_type})
+        except Exception as e:
+            # 响应头已经发出，只能以错误事件通知客户端
+            failed = True
+            current_app.logger.exception('Agent流式处理失败: %s', agent_type)
+            message = e.message if isinstance(e, APIError) else '服务器内部错误'
+            yield _encode_stream_event(stream_format, 'error', {'status': 'error', 'message': message})
+        finally:
+            # 客户端断开时生成器被close，在此停止Agent的生成器并归还实例
+            chunks.close()
+            release(discard=failed)
+    
+    response = Response(stream_with_context(generate()), mimetype=STREAM_FORMATS[stream_format])
+    # 响应未被迭代就关闭时（例如客户端在首包前断开）同样归还Agent
+    response.call_on_close(release)
+    response.headers['Cache-Control'] = 'no-cache'
+    # 禁止反向代理缓冲，保证部分结果即时到达客户端
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@api_bp.route('/agents/jobs', methods=['POST'])
+@jwt_required()
+@idempotent
+def create_agent_job():
+    """
+    创建异步Agent任务，立即返回任务ID
+        
+    Returns:
+        JSON: 任务信息，状态码202；队列已满时返回503
+    """
+    if not request.is_json:
+        raise ValidationError('请求必须是JSON格式')
+        
+    # 获取请求数据
+    data = request.json
+    agent_type = data.get('agent_type')
+    agent_config = data.get('config', {})
+    input_data = data.get('input')
+    
+    # 验证必要字段
+    if not agent_type:
+        raise ValidationError('缺少agent_type字段')
+    if input_data is None:
+        raise ValidationError('缺少input字段')
+    
+    job = AgentJobService.submit_job(agent_type, agent_config, input_data, owner=get_jwt_identity())
+        
+    response = jsonify({
+        'status': 'success',
+        'job': job.to_dict()
+    })
+    response.status_code = 202
+    response.headers['Location'] = f"{request.path}/{job.id}"
+    return response
+
+@api_bp.route('/agents/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_agent_job(job_id):
+    """
+    查询异步Agent任务的状态与结果
+    
+    Args:
+        job_id: 任务ID
+    
+    Returns:
+        JSON: 任务信息
+    """
+    job = AgentJobService.get_job(job_id, owner=get_jwt_identity())
+    
+    return jsonify({
+        'status': 'success',
+        'job': job.to_dict()
+    })
+
+@api_bp.route('/agents/pool', methods=['GET'])
+@jwt_required()
+def agent_pool_stats():
+    """
+    获取当前工作进程的Agent池统计信息
+    
+    Returns:
+        JSON: 命中、未命中、淘汰等计数
+    """
+    return jsonify({
+        'status': 'success',
+        'pool': agent_pool.stats()
+    })
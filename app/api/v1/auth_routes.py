@@ -4,10 +4,12 @@
 from flask import jsonify, request
 from flask_jwt_extended import (
     create_access_token, create_refresh_token,
-    jwt_required, get_jwt_identity
+    jwt_required, get_jwt, get_jwt_identity
 )
 from . import api_bp
+from app.core.compression import conditional_get
 from app.core.errors import ValidationError, AuthenticationError
+from app.core.revocation import token_blocklist
 
 @api_bp.route('/auth/login', methods=['POST'])
 def login():
@@ -60,8 +62,25 @@ def refresh():
         'access_token': access_token
     })
 
+@api_bp.route('/auth/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    """
+    吊销当前请求使用的令牌（访问令牌或刷新令牌）
+    
+    Returns:
+        JSON: 操作结果
+    """
+    token_blocklist.revoke(get_jwt())
+    
+    return jsonify({
+        'status': 'success',
+        'message': '令牌已吊销'
+    })
+
 @api_bp.route('/auth/profile', methods=['GET'])
 @jwt_required()
+@conditional_get
 def profile():
     """
     获取当前用户信息
@@ -0,0 +1,214 @@
+"""
+用户管理相关路由
+"""
+import codecs
+import csv
+import io
+import json
+from flask import Response, current_app, jsonify, request, stream_with_context
+from flask_jwt_extended import jwt_required
+from . import api_bp
+from app.core.errors import ValidationError
+from app.services.user_service import UserService, EXPORT_COLUMNS
+
+# 列表接口的总数统计方式
+COUNT_MODES = ('none', 'approx', 'exact')
+
+# 支持的导入格式
+IMPORT_FORMATS = {
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv'
+}
+
+def _iter_request_lines():
+    """逐行读取请求体并增量解码，不把整个请求体读入内存"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    while True:
+        chunk = request.stream.read(64 * 1024)
+        if not chunk:
+            break
+        buffer += decoder.decode(chunk)
+        lines = buffer.split('\n')
+        buffer = lines.pop()
+        for line in lines:
+            yield line.rstrip('\r')
+    buffer += decoder.decode(b'', final=True)
+    if buffer:
+        yield buffer.rstrip('\r')
+
+def _iter_ndjson_records(lines):
+    """解析NDJSON，每行一个用户对象，空行被忽略"""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            raise ValidationError(f'第{line_number}行不是合法的JSON')
+
+def _iter_csv_records(lines):
+    """解析带表头的CSV"""
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None:
+        return
+    missing = {'username', 'email', 'password'} - set(reader.fieldnames)
+    if missing:
+        raise ValidationError(f"CSV缺少列: {', '.join(sorted(missing))}")
+    for row in reader:
+        # 空单元格按未提供处理，其余取值由导入校验解析
+        if not (row.get('is_active') or '').strip():
+            row.pop('is_active', None)
+        yield row
+
+def _parse_bool_arg(name):
+    """解析布尔查询参数，未提供时返回None"""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    value = value.lower()
+    if value in ('1', 'true', 'yes'):
+        return True
+    if value in ('0', 'false', 'no'):
+        return False
+    raise ValidationError(f'{name}必须是true或false')
+
+@api_bp.route('/users', methods=['GET'])
+@jwt_required()
+def list_users():
+    """
+    分页列出用户
+    
+    查询参数：
+        limit: 每页条数
+        cursor: 上一页返回的next_cursor
+        is_active: 按是否启用过滤
+        username_prefix: 按用户名前缀过滤
+        fields: 逗号分隔的返回字段
+        count: 总数统计方式，none（默认）、approx（估算全表行数，忽略过滤条件）或exact（COUNT(*)）
+    
+    Returns:
+        JSON: 用户列表和下一页游标
+    """
+    max_limit = current_app.config.get('USER_LIST_MAX_LIMIT', 100)
+    try:
+        limit = int(request.args.get('limit', current_app.config.get('USER_LIST_DEFAULT_LIMIT', 20)))
+    except ValueError:
+        raise ValidationError('limit必须是整数')
+    if limit < 1 or limit > max_limit:
+        raise ValidationError(f'limit必须在1到{max_limit}之间')
+    
+    count_mode = request.args.get('count', 'none')
+    if count_mode not in COUNT_MODES:
+        raise ValidationError(f"count只能是{'、'.join(COUNT_MODES)}之一")
+    
+    fields = request.args.get('fields')
+    fields = [name.strip() for name in fields.split(',') if name.strip()] if fields else None
+    is_active = _parse_bool_arg('is_active')
+    username_prefix = request.args.get('username_prefix') or None
+    if username_prefix is not None and len(username_prefix) > 64:
+        raise ValidationError('username_prefix长度不能超过64')
+    
+    users, next_cursor = UserService.list_users(
+        limit=limit,
+        cursor=request.args.get('cursor') or None,
+        is_active=is_active,
+        username_prefix=username_prefix,
+        fields=fields
+    )
+    
+    data = {
+        'status': 'success',
+        'users': users,
+        'next_cursor': next_cursor
+    }
+    if count_mode == 'approx':
+        data['total_estimate'] = UserService.estimate_user_count()
+    elif count_mode == 'exact':
+        data['total'] = UserService.count_users(is_active=is_active, username_prefix=username_prefix)
+    return jsonify(data)
+
+@api_bp.route('/users/import', methods=['POST'])
+@jwt_required()
+def import_users():
+    """
+    批量导入用户
+    
+    请求体为NDJSON（application/x-ndjson）或带表头的CSV（text/csv），
+    按行流式解析并分批写入。
+    
+    Returns:
+        JSON: 导入结果
+    """
+    import_format = IMPORT_FORMATS.get(request.mimetype)
+    if import_format is None:
+        raise ValidationError(
+            f"不支持的导入格式，支持的格式: {', '.join(IMPORT_FORMATS)}"
+        )
+    
+    lines = _iter_request_lines()
+    if import_format == 'csv':
+        records = _iter_csv_records(lines)
+    else:
+        records = _iter_ndjson_records(lines)
+    
+    result = UserService.bulk_import_users(
+        records,
+        batch_size=current_app.config.get('USER_IMPORT_BATCH_SIZE', 1000)
+    )
+    
+    return jsonify({
+        'status': 'success',
+        'total': result['total'],
+        'created': result['created'],
+        'skipped': result['skipped']
+    })
+
+def _format_export_value(value):
+    """格式化导出字段，日期时间使用ISO 8601"""
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+@api_bp.route('/users/export', methods=['GET'])
+@jwt_required()
+def export_users():
+    """
+    流式导出全部用户
+    
+    默认输出NDJSON，?format=csv 时输出CSV。
+    
+    Returns:
+        Response: 流式响应
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        raise ValidationError('format只能是ndjson或csv')
+    
+    batch_size = current_app.config.get('USER_EXPORT_BATCH_SIZE', 1000)
+    users = UserService.iter_users(batch_size=batch_size)
+    
+    if export_format == 'csv':
+        def generate():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            for user in users:
+                writer.writerow([_format_export_value(user[name]) for name in EXPORT_COLUMNS])
+                if buffer.tell() >= 64 * 1024:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+        mimetype = 'text/csv'
+    else:
+        def generate():
+            for user in users:
+                yield json.dumps(
+                    {name: _format_export_value(value) for name, value in user.items()},
+                    ensure_ascii=False
+                ) + '\n'
+        mimetype = 'application/x-ndjson'
+    
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=users.{export_format}'
+    return response
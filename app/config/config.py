@@ -1,4 +1,7 @@
+import atexit
 import os
+import shutil
+import tempfile
 from datetime import timedelta
 
 class Config:
@@ -8,19 +11,138 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     
+    # 已验证令牌缓存（每个工作进程独立）
+    JWT_VERIFY_CACHE_ENABLED = True
+    JWT_VERIFY_CACHE_SIZE = int(os.environ.get('JWT_VERIFY_CACHE_SIZE', 10000))
+    
+    # 令牌吊销列表：布隆过滤器容量与误报率，从数据库同步其他进程吊销记录的间隔（秒），
+    # 以及清理过期吊销记录并重建过滤器的间隔（秒）
+    JWT_BLOCKLIST_ENABLED = True
+    JWT_BLOCKLIST_CAPACITY = int(os.environ.get('JWT_BLOCKLIST_CAPACITY', 1000000))
+    JWT_BLOCKLIST_ERROR_RATE = 0.001
+    JWT_BLOCKLIST_SYNC_INTERVAL = float(os.environ.get('JWT_BLOCKLIST_SYNC_INTERVAL', 1.0))
+    JWT_BLOCKLIST_PURGE_INTERVAL = float(os.environ.get('JWT_BLOCKLIST_PURGE_INTERVAL', 3600))
+    
+    # 密码哈希配置：哈希方法（需写明全部参数）、并发计算数、最大排队数与排队等待秒数，
+    # 以及是否在请求线程中直接计算（gunicorn的sync工作进程由gunicorn.conf.py默认开启）
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 2.0))
+    PASSWORD_HASH_INLINE = os.environ.get('PASSWORD_HASH_INLINE', 'false').lower() == 'true'
+    
+    # 用户批量导入每批提交的记录数，以及导出时每次从数据库获取的行数
+    USER_IMPORT_BATCH_SIZE = int(os.environ.get('USER_IMPORT_BATCH_SIZE', 1000))
+    USER_EXPORT_BATCH_SIZE = int(os.environ.get('USER_EXPORT_BATCH_SIZE', 1000))
+    # 用户列表每页默认条数与上限
+    USER_LIST_DEFAULT_LIMIT = 20
+    USER_LIST_MAX_LIMIT = int(os.environ.get('USER_LIST_MAX_LIMIT', 100))
+    
+    # 用户读穿缓存：每个工作进程独立的条目上限与过期秒数，以及读取本机跨进程失效日志的间隔（秒）
+    USER_CACHE_ENABLED = os.environ.get('USER_CACHE_ENABLED', 'true').lower() == 'true'
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 10000))
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', 60))
+    USER_CACHE_SYNC_INTERVAL = float(os.environ.get('USER_CACHE_SYNC_INTERVAL', 0))
+    # 配置只读副本时，失效后该秒数内从副本读到的用户不写入缓存（应不小于副本的最大复制延迟）
+    USER_CACHE_REPLICA_LAG = float(os.environ.get('USER_CACHE_REPLICA_LAG', 5))
+    
     # 数据库配置
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 每个工作进程的连接池大小、溢出连接数、获取连接超时与连接回收秒数
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'false').lower() == 'true'
+    
+    # SQLite性能参数（在每个新连接上通过PRAGMA设置，非SQLite数据库忽略）
+    SQLITE_PRAGMAS_ENABLED = os.environ.get('SQLITE_PRAGMAS_ENABLED', 'true').lower() == 'true'
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64000))  # 负数表示KiB
+    SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+    # 设置为IMMEDIATE时每个事务开始即获取写锁，适合写多的部署；默认沿用驱动的延迟事务
+    SQLITE_BEGIN_MODE = os.environ.get('SQLITE_BEGIN_MODE')
+    
+    # 只读副本：逗号分隔的数据库URI，每个注册为一个replica_N绑定；副本健康探测间隔与失败后的重试间隔（秒）
+    SQLALCHEMY_READ_REPLICAS = [uri for uri in os.environ.get('DATABASE_READ_REPLICAS', '').split(',') if uri]
+    DB_REPLICA_CHECK_INTERVAL = float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', 5))
+    DB_REPLICA_RETRY_INTERVAL = float(os.environ.get('DB_REPLICA_RETRY_INTERVAL', 30))
+    
+    # SQL统计：慢查询阈值（秒），是否输出X-DB-Query-*响应头（None表示仅在调试和测试模式下输出）
+    SQL_STATS_ENABLED = True
+    SQL_SLOW_QUERY_THRESHOLD = float(os.environ.get('SQL_SLOW_QUERY_THRESHOLD', 0.5))
+    SQL_STATS_HEADERS = None
+    
+    # 响应压缩：客户端接受时对不小于COMPRESS_MIN_SIZE字节的可压缩类型响应进行gzip/deflate编码，流式响应逐块压缩
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html')
     
     # API文档配置
     SWAGGER_TITLE = "NextJS Backend API"
     SWAGGER_DESCRIPTION = "Backend API for NextJS Frontend"
     SWAGGER_VERSION = "1.0.0"
     
+    # Agent池配置（每个工作进程独立）
+    AGENT_POOL_MAX_SIZE = int(os.environ.get('AGENT_POOL_MAX_SIZE', 32))
+    AGENT_POOL_IDLE_TTL = float(os.environ.get('AGENT_POOL_IDLE_TTL', 300))
+    
+    # 批量处理单次请求的最大输入数
+    AGENT_BATCH_MAX_SIZE = int(os.environ.get('AGENT_BATCH_MAX_SIZE', 1000))
+    
+    # 限流：按端点声明令牌桶额度（"次数/second|minute|hour|day"，按JWT主体计，未认证时按IP），
+    # 以及按Agent类型的同时处理数上限（None表示不限制）；额度在本机所有工作进程间共享
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMITS = {
+        'api_v1.login': '10/minute',
+        'api_v1.process_with_agent': '120/minute',
+        'api_v1.process_batch_with_agent': '20/minute',
+        'api_v1.process_stream_with_agent': '60/minute',
+        'api_v1.create_agent_job': '60/minute'
+    }
+    AGENT_CONCURRENCY_LIMITS = {}  # 按Agent类型覆盖上限，例如 {'demo': 8}
+    AGENT_CONCURRENCY_DEFAULT = int(os.environ.get('AGENT_CONCURRENCY_DEFAULT', 0)) or None
+    # 名额的最长持有秒数（超过后视为持有者已失效），以及名额已满时建议的重试秒数
+    AGENT_CONCURRENCY_LEASE_TTL = float(os.environ.get('AGENT_CONCURRENCY_LEASE_TTL', 300))
+    AGENT_CONCURRENCY_RETRY_AFTER = 1
+    
+    # 幂等：Idempotency-Key请求的结果保留秒数，等待正在执行的相同请求的最长秒数，
+    # 以及执行记录的最长持有秒数（超过后视为执行者已失效，由等待者接手）
+    IDEMPOTENCY_ENABLED = os.environ.get('IDEMPOTENCY_ENABLED', 'true').lower() == 'true'
+    IDEMPOTENCY_RETENTION = float(os.environ.get('IDEMPOTENCY_RETENTION', 86400))
+    IDEMPOTENCY_WAIT_TIMEOUT = float(os.environ.get('IDEMPOTENCY_WAIT_TIMEOUT', 30))
+    IDEMPOTENCY_LEASE_TTL = float(os.environ.get('IDEMPOTENCY_LEASE_TTL', 300))
+    
+    # 异步任务配置（每个工作进程独立的执行线程数和排队上限）
+    AGENT_JOB_WORKERS = int(os.environ.get('AGENT_JOB_WORKERS', 2))
+    AGENT_JOB_QUEUE_SIZE = int(os.environ.get('AGENT_JOB_QUEUE_SIZE', 16))
+    AGENT_JOB_RETRY_AFTER = 5
+    
+    # Agent结果缓存配置：内存层每个工作进程独立，磁盘层在同一主机的工作进程间共享
+    AGENT_CACHE_ENABLED = os.environ.get('AGENT_CACHE_ENABLED', 'true').lower() == 'true'
+    AGENT_CACHE_MAX_ENTRIES = int(os.environ.get('AGENT_CACHE_MAX_ENTRIES', 1024))
+    AGENT_CACHE_DEFAULT_TTL = float(os.environ.get('AGENT_CACHE_DEFAULT_TTL', 300))
+    AGENT_CACHE_TTLS = {}  # 按Agent类型覆盖TTL，例如 {'demo': 60}
+    AGENT_CACHE_DISK_ENABLED = os.environ.get('AGENT_CACHE_DISK_ENABLED', 'false').lower() == 'true'
+    AGENT_CACHE_DISK_PATH = os.environ.get('AGENT_CACHE_DISK_PATH')
+    
+    # 本机共享状态文件目录，默认为应用instance目录
+    LOCAL_STATE_DIR = os.environ.get('LOCAL_STATE_DIR')
+    
+    # 请求指标配置：多进程部署时通过METRICS_DIR汇总所有工作进程的指标（gunicorn.conf.py未指定时创建临时目录）
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1.0))
+    
     @staticmethod
     def init_app(app):
         """初始化应用配置"""
         pass
-
+    
 class DevelopmentConfig(Config):
     """开发环境配置"""
     DEBUG = True
@@ -30,9 +152,19 @@ class DevelopmentConfig(Config):
 class TestingConfig(Config):
     """测试环境配置"""
     TESTING = True
+    # 测试中使用较低的哈希成本以缩短运行时间
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
     SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or \
         'sqlite:///test.db'
     
+    @staticmethod
+    def init_app(app):
+        """每个测试应用把本机共享状态（限流、幂等、缓存）放在独立的临时目录中，退出时删除"""
+        if not app.config.get('LOCAL_STATE_DIR'):
+            state_dir = tempfile.mkdtemp(prefix='app-test-state-')
+            atexit.register(shutil.rmtree, state_dir, True)
+            app.config['LOCAL_STATE_DIR'] = state_dir
+
 class ProductionConfig(Config):
     """生产环境配置"""
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
@@ -0,0 +1,182 @@
+"""
+响应压缩与条件请求模块
+
+客户端通过 Accept-Encoding 接受gzip或deflate时，对可压缩类型且不小于
+COMPRESS_MIN_SIZE 字节的响应体进行编码；流式响应无法预知大小，逐块压缩后
+立即写出。标记了 X-Accel-Buffering: no 的流式响应（例如Agent流式结果）每块
+之后都同步刷新压缩器，保证部分结果不会滞留在压缩缓冲区中。
+
+conditional_get 为可缓存的GET接口生成基于响应体的强ETag，并对命中
+If-None-Match 的请求返回304。压缩后的表示使用带编码后缀的ETag（例如
+"<摘要>-gzip"），使不同编码的表示拥有不同的强校验器。
+"""
+import hashlib
+import zlib
+from functools import wraps
+
+from flask import current_app, request
+
+# 支持的编码及对应的zlib窗口参数（gzip为带gzip头的格式，HTTP中的deflate为zlib格式）
+ENCODINGS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS
+}
+
+DEFAULT_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html')
+
+def compress_body(data, encoding, level=6):
+    """
+    一次性压缩完整的响应体
+    
+    Args:
+        data (bytes): 原始字节
+        encoding (str): gzip 或 deflate
+        level (int): 压缩级别（1-9）
+    
+    Returns:
+        bytes: 压缩后的字节
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, ENCODINGS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+def compress_stream(chunks, encoding, level=6, flush_each=False):
+    """
+    逐块压缩流式响应体
+    
+    Args:
+        chunks: 产生字节块的可迭代对象
+        encoding (str): gzip 或 deflate
+        level (int): 压缩级别（1-9）
+        flush_each (bool): 是否在每块之后同步刷新，使该块立即可被客户端解压
+    
+    Yields:
+        bytes: 压缩后的字节块
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, ENCODINGS[encoding])
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if flush_each:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+class ResponseCompression:
+    """
+    响应压缩中间件
+    """
+    
+    def __init__(self):
+        self.level = 6
+        self.min_size = 1024
+        self.mimetypes = frozenset(DEFAULT_MIMETYPES)
+    
+    def init_app(self, app):
+        """
+        读取配置并注册after_request钩子
+        
+        Args:
+            app: Flask应用实例
+        
+        Raises:
+            ValueError: 压缩级别不在1到9之间
+        """
+        if not app.config.get('COMPRESS_ENABLED', True):
+            return
+        level = app.config.get('COMPRESS_LEVEL', 6)
+        if not 1 <= level <= 9:
+            raise ValueError(f'COMPRESS_LEVEL 必须在1到9之间，实际为 {level}')
+        self.level = level
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+        self.mimetypes = frozenset(app.config.get('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES))
+        app.after_request(self._after_request)
+    
+    def _compressible(self, response):
+        """响应是否可能被压缩（与客户端接受的编码无关）"""
+        if response.mimetype not in self.mimetypes:
+            return False
+        if not 200 <= response.status_code < 300 or response.status_code in (204, 206):
+            return False
+        if 'Content-Encoding' in response.headers or response.direct_passthrough:
+            return False
+        return not response.cache_control.no_transform
+    
+    def _after_request(self, response):
+        if not self._compressible(response):
+            return response
+        # 表示随Accept-Encoding变化，共享缓存需要按该请求头区分
+        response.vary.add('Accept-Encoding')
+        if request.method == 'HEAD':
+            return response
+        encoding = request.accept_encodings.best_match(tuple(ENCODINGS))
+        if encoding is None:
+            return response
+        
+        if response.is_streamed:
+            original = response.response
+            chunks = response.iter_encoded()
+            flush_each = response.headers.get('X-Accel-Buffering') == 'no'
+            
+            def generate():
+                try:
+                    yield from compress_stream(chunks, encoding, self.level, flush_each)
+                finally:
+                    # 客户端断开时关闭原始生成器，使其清理逻辑照常执行
+                    if hasattr(original, 'close'):
+                        original.close()
+            
+            response.response = generate()
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            compressed = compress_body(data, encoding, self.level)
+            if len(compressed) >= len(data):
+                return response
+            response.set_data(compressed)
+        
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f'{etag}-{encoding}')
+        return response
+
+def conditional_get(view):
+    """
+    为GET接口添加强ETag与If-None-Match处理
+    
+    只处理200响应；响应标记为 private, no-cache，客户端可以缓存但每次使用前需要
+    携带ETag重新验证。应放在认证装饰器之内，使未认证的请求不会得到304。
+    
+    Args:
+        view: 视图函数
+    
+    Returns:
+        function: 包装后的视图函数
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = current_app.make_response(view(*args, **kwargs))
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200 or response.is_streamed:
+            return response
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        
+        etag = hashlib.sha256(response.get_data()).hexdigest()[:32]
+        # 客户端可能持有任意编码表示的ETag，它们对应同一份内容
+        for candidate in (etag, *(f'{etag}-{encoding}' for encoding in ENCODINGS)):
+            if request.if_none_match.contains_weak(candidate):
+                response.set_data(b'')
+                response.status_code = 304
+                response.headers.pop('Content-Type', None)
+                response.headers.pop('Content-Length', None)
+                response.set_etag(candidate)
+                return response
+        response.set_etag(etag)
+        return response
+    
+    return wrapper
+
+# 当前应用的响应压缩
+response_compression = ResponseCompression()
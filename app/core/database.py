@@ -0,0 +1,283 @@
+"""
+数据库引擎配置模块
+
+SQLite默认的回滚日志模式下，写事务会阻塞所有读者，多个gunicorn工作进程并发写入时
+很快出现 "database is locked"。这里在引擎的connect事件中为每个新连接设置PRAGMA：
+WAL日志（读写互不阻塞）、busy_timeout（等待写锁而不是立即失败）、synchronous=NORMAL
+（WAL下仍然保证崩溃一致性，只在检查点时fsync）、mmap和页缓存大小，全部可通过配置调整。
+
+读写分离：配置 SQLALCHEMY_READ_REPLICAS 后，每个只读副本注册为一个 replica_N 绑定。
+RoutingSession只在调用方显式声明（use_replica）时把读语句路由到健康的副本，写语句
+（INSERT/UPDATE/DELETE和flush）始终使用主库；同一请求中一旦发生写入，后续读取也
+固定使用主库，保证读到自己的写入。副本连接失败时在一段时间内标记为不可用并回落到主库。
+"""
+import random
+import threading
+import time
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+
+# 允许的取值，防止配置值被拼接进PRAGMA语句时出现意外内容
+_JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+_SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+_TEMP_STORE_MODES = ('DEFAULT', 'FILE', 'MEMORY')
+_BEGIN_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+def sqlite_settings(config):
+    """
+    从配置中读取SQLite性能参数
+    
+    Args:
+        config (dict): 应用配置
+    
+    Returns:
+        dict: PRAGMA设置
+    """
+    return {
+        'journal_mode': config.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'busy_timeout': config.get('SQLITE_BUSY_TIMEOUT_MS', 5000),
+        'synchronous': config.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'mmap_size': config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+        'cache_size': config.get('SQLITE_CACHE_SIZE', -64000),
+        'temp_store': config.get('SQLITE_TEMP_STORE', 'MEMORY'),
+        'begin_mode': config.get('SQLITE_BEGIN_MODE')
+    }
+
+def _checked(value, allowed, name):
+    """校验枚举型PRAGMA取值"""
+    value = str(value).upper()
+    if value not in allowed:
+        raise ValueError(f'{name} 必须是 {", ".join(allowed)} 之一，实际为 {value}')
+    return value
+
+def install_sqlite_pragmas(engine, settings):
+    """
+    在引擎上注册connect事件，为每个新建的SQLite连接设置PRAGMA
+    
+    非SQLite引擎直接忽略。内存数据库不支持WAL，跳过日志模式设置。
+    
+    Args:
+        engine: SQLAlchemy引擎
+        settings (dict): sqlite_settings() 返回的设置
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    
+    database = engine.url.database
+    in_memory = not database or database == ':memory:' or 'mode=memory' in str(engine.url)
+    pragmas = []
+    if settings.get('busy_timeout') is not None:
+        pragmas.append(f"PRAGMA busy_timeout = {int(settings['busy_timeout'])}")
+    if settings.get('journal_mode') and not in_memory:
+        pragmas.append(f"PRAGMA journal_mode = {_checked(settings['journal_mode'], _JOURNAL_MODES, 'SQLITE_JOURNAL_MODE')}")
+    if settings.get('synchronous'):
+        pragmas.append(f"PRAGMA synchronous = {_checked(settings['synchronous'], _SYNCHRONOUS_MODES, 'SQLITE_SYNCHRONOUS')}")
+    if settings.get('mmap_size') is not None:
+        pragmas.append(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
+    if settings.get('cache_size') is not None:
+        pragmas.append(f"PRAGMA cache_size = {int(settings['cache_size'])}")
+    if settings.get('temp_store'):
+        pragmas.append(f"PRAGMA temp_store = {_checked(settings['temp_store'], _TEMP_STORE_MODES, 'SQLITE_TEMP_STORE')}")
+    begin_mode = settings.get('begin_mode')
+    if begin_mode:
+        begin_mode = _checked(begin_mode, _BEGIN_MODES, 'SQLITE_BEGIN_MODE')
+    
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if begin_mode:
+            # 由SQLAlchemy在begin事件中显式发出BEGIN，pysqlite不再自行开启事务
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+    
+    if begin_mode:
+        @event.listens_for(engine, 'begin')
+        def begin_transaction(connection):
+            # IMMEDIATE在事务开始时就获取写锁，避免先读后写的事务在升级写锁时因快照过期而失败
+            connection.exec_driver_sql(f'BEGIN {begin_mode}')
+
+def engine_options(config):
+    """
+    根据配置生成连接池参数
+    
+    内存SQLite数据库使用单连接的StaticPool，不接受连接池大小参数，此时不生成。
+    
+    Args:
+        config (dict): 应用配置
+    
+    Returns:
+        dict: 传给create_engine的参数
+    """
+    uri = config.get('SQLALCHEMY_DATABASE_URI') or ''
+    if uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri:
+        return {}
+    return {
+        'pool_size': config.get('DB_POOL_SIZE', 5),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', False)
+    }
+
+def configure_engines(app, db):
+    """
+    为应用的全部数据库引擎安装SQLite性能设置
+    
+    Args:
+        app: Flask应用实例
+        db: Flask-SQLAlchemy实例
+    """
+    if not app.config.get('SQLITE_PRAGMAS_ENABLED', True):
+        return
+    settings = sqlite_settings(app.config)
+    with app.app_context():
+        for engine in db.engines.values():
+            install_sqlite_pragmas(engine, settings)
+
+def dispose_engines(app, db):
+    """
+    丢弃从父进程继承的连接池，在gunicorn的post_fork钩子中调用
+    
+    preload_app模式下应用在主进程中创建，若主进程已经建立过数据库连接，子进程
+    继续使用这些套接字会与其他进程交错读写。close=False只丢弃池中的连接而不关闭它们，
+    避免影响父进程仍在使用的连接；子进程之后按需重新建立自己的连接。
+    
+    Args:
+        app: Flask应用实例
+        db: Flask-SQLAlchemy实例
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+class ReplicaRouter:
+    """
+    只读副本选择与健康状态
+    """
+    
+    def __init__(self):
+        self.bind_keys = []
+        self.check_interval = 5.0
+        self.retry_interval = 30.0
+        self._checked_at = {}
+        self._down_until = {}
+        self._lock = threading.Lock()
+    
+    def configure_binds(self, app):
+        """
+        把 SQLALCHEMY_READ_REPLICAS 中的副本注册为 replica_N 绑定，需在 db.init_app 之前调用
+        
+        Args:
+            app: Flask应用实例
+        """
+        replicas = app.config.get('SQLALCHEMY_READ_REPLICAS') or []
+        if isinstance(replicas, str):
+            replicas = [uri.strip() for uri in replicas.split(',') if uri.strip()]
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        self.bind_keys = []
+        for index, uri in enumerate(replicas):
+            key = f'replica_{index}'
+            binds[key] = uri
+            self.bind_keys.append(key)
+        app.config['SQLALCHEMY_BINDS'] = binds
+        self.check_interval = app.config.get('DB_REPLICA_CHECK_INTERVAL', 5.0)
+        self.retry_interval = app.config.get('DB_REPLICA_RETRY_INTERVAL', 30.0)
+        with self._lock:
+            self._checked_at.clear()
+            self._down_until.clear()
+    
+    def init_app(self, app, db):
+        """
+        监听副本引擎的错误，连接失败时标记副本不可用，需在 db.init_app 之后调用
+        
+        Args:
+            app: Flask应用实例
+            db: Flask-SQLAlchemy实例
+        """
+        # 副本上没有需要创建的表，移除Flask-SQLAlchemy为绑定生成的空元数据，
+        # 使 db.create_all() 等操作只作用于主库
+        for key in self.bind_keys:
+            db.metadatas.pop(key, None)
+        with app.app_context():
+            engines = db.engines
+            for key in self.bind_keys:
+                event.listen(engines[key], 'handle_error', self._error_handler(key))
+    
+    def _error_handler(self, key):
+        def handle_error(context):
+            # 断线或无法建立连接（connection为None）时标记副本不可用，后续读取回落到主库
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(key)
+        return handle_error
+    
+    def mark_down(self, key):
+        """
+        标记副本在retry_interval秒内不可用
+        
+        Args:
+            key (str): 副本绑定名
+        """
+        with self._lock:
+            self._down_until[key] = time.monotonic() + self.retry_interval
+    
+    def choose(self, engines):
+        """
+        随机选择一个健康的副本引擎
+        
+        距上次检查超过check_interval的副本先执行一次 SELECT 1 探测。
+        
+        Args:
+            engines (dict): 绑定名到引擎的映射
+        
+        Returns:
+            Engine: 副本引擎，没有可用副本时返回None
+        """
+        if not self.bind_keys:
+            return None
+        now = time.monotonic()
+        candidates = [key for key in self.bind_keys if self._down_until.get(key, 0) <= now]
+        random.shuffle(candidates)
+        for key in candidates:
+            engine = engines[key]
+            if now - self._checked_at.get(key, float('-inf')) < self.check_interval:
+                return engine
+            try:
+                with engine.connect() as conn:
+                    conn.exec_driver_sql('SELECT 1')
+            except Exception:
+                self.mark_down(key)
+                continue
+            with self._lock:
+                self._checked_at[key] = now
+            return engine
+        return None
+
+# 当前工作进程的副本路由
+replica_router = ReplicaRouter()
+
+class RoutingSession(Session):
+    """
+    按语句类型在主库与只读副本之间路由的会话
+    
+    session.info中的 replica_reads 计数大于0时，读语句使用副本；wrote 标记表示本会话
+    （即本次请求）已经写入过，此后读取固定使用主库。
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+        primary = super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info['wrote'] = True
+            return primary
+        if self.info.get('replica_reads') and not self.info.get('wrote') and primary is self._db.engines.get(None):
+            replica = replica_router.choose(self._db.engines)
+            if replica is not None:
+                return replica
+        return primary
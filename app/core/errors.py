@@ -4,12 +4,13 @@ class APIError(Exception):
     """API错误基类"""
     status_code = 400
     
-    def __init__(self, message, status_code=None, payload=None):
+    def __init__(self, message, status_code=None, payload=None, headers=None):
         super().__init__()
         self.message = message
         if status_code is not None:
             self.status_code = status_code
         self.payload = payload
+        self.headers = headers
         
     def to_dict(self):
         rv = dict(self.payload or ())
@@ -33,10 +34,22 @@ class NotFoundError(APIError):
     """资源不存在错误"""
     status_code = 404
 
+class ConflictError(APIError):
+    """资源冲突错误"""
+    status_code = 409
+
+class TooManyRequestsError(APIError):
+    """请求过多错误"""
+    status_code = 429
+
 class ServerError(APIError):
     """服务器内部错误"""
     status_code = 500
 
+class ServiceUnavailableError(APIError):
+    """服务暂不可用错误"""
+    status_code = 503
+
 def register_error_handlers(app):
     """
     注册错误处理器到Flask应用
@@ -48,6 +61,8 @@ def register_error_handlers(app):
     def handle_api_error(error):
         response = jsonify(error.to_dict())
         response.status_code = error.status_code
+        if error.headers:
+            response.headers.update(error.headers)
         return response
         
     @app.errorhandler(404)
@@ -1,12 +1,14 @@
 """
 Flask扩展模块，集中管理所有Flask扩展
 """
+from contextlib import ContextDecorator
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_marshmallow import Marshmallow
+from app.core.database import RoutingSession, configure_engines, engine_options, replica_router
 
-# 初始化SQLAlchemy，不绑定特定应用
-db = SQLAlchemy()
+# 初始化SQLAlchemy，不绑定特定应用；会话按语句类型在主库与只读副本之间路由
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # 初始化迁移工具，不绑定特定应用
 migrate = Migrate()
@@ -21,11 +23,38 @@ def init_extensions(app):
     Args:
         app: Flask应用实例
     """
-    # 初始化数据库
+    # 初始化数据库，未显式配置时按DB_POOL_*设置连接池参数；只读副本注册为replica_N绑定
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    replica_router.configure_binds(app)
     db.init_app(app)
+    replica_router.init_app(app, db)
+    
+    # 为SQLite连接设置WAL等性能参数
+    configure_engines(app, db)
+    
+    # 统计每个请求的SQL语句数与耗时，记录慢查询
+    from app.core.query_stats import query_stats
+    query_stats.init_app(app, db)
     
     # 初始化迁移
     migrate.init_app(app, db)
     
     # 初始化序列化
-    ma.init_app(app) 
\ No newline at end of file
+    ma.init_app(app)
+
+class use_replica(ContextDecorator):
+    """
+    声明代码块中的读语句可以使用只读副本，可作为上下文管理器或装饰器使用
+    
+    未配置副本、副本都不可用或本次请求已经写入过时仍然使用主库。
+    """
+    
+    def __enter__(self):
+        info = db.session.info
+        info['replica_reads'] = info.get('replica_reads', 0) + 1
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        info = db.session.info
+        info['replica_reads'] = max(info.get('replica_reads', 0) - 1, 0)
+        return False
@@ -0,0 +1,237 @@
+"""
+幂等键与相同请求合并模块
+
+idempotent 装饰的接口支持 Idempotency-Key 请求头：同一调用者用同一个键发出的
+请求只执行一次，在 IDEMPOTENCY_RETENTION 秒内重放第一次的响应；同一个键用于
+不同的请求体时返回422。未携带该请求头时，同一调用者的相同请求（请求体摘要相同）
+如果正在执行，后到的请求等待并共用这次执行的结果，执行结束后的新请求照常执行。
+
+执行记录保存在本机共享存储（LocalStore）中，因此合并对同一主机上的全部gunicorn
+工作进程生效。执行者所在进程退出或持有时间超过 IDEMPOTENCY_LEASE_TTL 后，
+等待者接手重新执行；执行失败（异常或5xx响应）不保存结果。
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from functools import wraps
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+
+from app.core.errors import APIError, ConflictError, ValidationError
+from app.core.local_store import LocalStore, local_store_path
+from app.utils.digest import stable_digest
+from app.utils.process import is_process_alive
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency_records (
+    key TEXT PRIMARY KEY,
+    request_hash TEXT NOT NULL,
+    token TEXT NOT NULL,
+    state TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    response TEXT,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_idempotency_records_expires_at ON idempotency_records (expires_at);
+"""
+
+# 幂等键的最大长度
+MAX_KEY_LENGTH = 255
+
+# 重放时不复制的响应头
+_SKIPPED_HEADERS = frozenset(('content-length', 'set-cookie'))
+
+class Idempotency:
+    """
+    跨工作进程的幂等执行记录
+    """
+    
+    def __init__(self):
+        self.enabled = True
+        self.retention = 86400.0
+        self.wait_timeout = 30.0
+        self.lease_ttl = 300.0
+        self._store = None
+        self._lock = threading.Lock()
+        self._writes = 0
+    
+    def init_app(self, app):
+        """
+        根据应用配置初始化
+        
+        Args:
+            app: Flask应用实例
+        """
+        self.enabled = app.config.get('IDEMPOTENCY_ENABLED', True)
+        self.retention = app.config.get('IDEMPOTENCY_RETENTION', 86400.0)
+        self.wait_timeout = app.config.get('IDEMPOTENCY_WAIT_TIMEOUT', 30.0)
+        self.lease_ttl = app.config.get('IDEMPOTENCY_LEASE_TTL', 300.0)
+        self._store = None
+        if self.enabled:
+            self._store = LocalStore(local_store_path(app, 'idempotency.db'), _SCHEMA)
+    
+    def execute(self, key, request_hash, func, replay_completed):
+        """
+        执行或合并一次请求
+        
+        Args:
+            key (str): 记录键
+            request_hash (str): 请求体摘要，同一个键的请求体必须一致
+            func (callable): 无参函数，返回Flask响应
+            replay_completed (bool): 是否重放已完成的记录；为False时只合并正在执行的请求
+        
+        Returns:
+            tuple: (响应, 是否为重放的结果)
+        
+        Raises:
+            APIError: 同一个键用于不同的请求体（422）
+            ConflictError: 等待正在执行的相同请求超时
+        """
+        joined = None
+        delay = 0.01
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            state, value = self._claim(key, request_hash, joined, replay_completed)
+            if state == 'done':
+                return self._restore(value), True
+            if state == 'lead':
+                token = value
+                break
+            joined = value
+            if time.monotonic() >= deadline:
+                raise ConflictError(
+                    '相同的请求正在处理中，请稍后重试',
+                    headers={'Retry-After': '1'}
+                )
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+        
+        try:
+            response = func()
+        except BaseException:
+            self._discard(key, token)
+            raise
+        if response.is_streamed or response.status_code >= 500:
+            self._discard(key, token)
+        else:
+            # 只合并正在执行的请求时，结果保留到等待者都能读取为止
+            retention = self.retention if replay_completed else self.wait_timeout
+            self._complete(key, token, self._capture(response), retention)
+        return response, False
+    
+    def _claim(self, key, request_hash, joined, replay_completed):
+        """
+        查询记录并在没有可用记录时成为执行者
+        
+        Returns:
+            tuple: ('done', 保存的响应)、('wait', 正在执行的令牌) 或 ('lead', 本次执行的令牌)
+        """
+        now = time.time()
+        with self._store.transaction() as conn:
+            row = conn.execute(
+                'SELECT request_hash, token, state, pid, response, expires_at FROM idempotency_records WHERE key = ?',
+                (key,)
+            ).fetchone()
+            if row is not None and row[5] > now:
+                stored_hash, stored_token, state, pid, response, _ = row
+                if stored_hash != request_hash:
+                    raise APIError('Idempotency-Key 已用于不同的请求', status_code=422)
+                if state == 'done':
+                    if replay_completed or stored_token == joined:
+                        return 'done', json.loads(response)
+                elif is_process_alive(pid):
+                    return 'wait', stored_token
+            token = uuid.uuid4().hex
+            conn.execute(
+                'INSERT OR REPLACE INTO idempotency_records '
+                '(key, request_hash, token, state, pid, response, expires_at) VALUES (?, ?, ?, ?, ?, NULL, ?)',
+                (key, request_hash, token, 'pending', os.getpid(), now + self.lease_ttl)
+            )
+        self._maybe_purge(now)
+        return 'lead', token
+    
+    def _complete(self, key, token, response, retention):
+        """保存执行结果"""
+        with self._store.transaction() as conn:
+            conn.execute(
+                "UPDATE idempotency_records SET state = 'done', response = ?, expires_at = ? WHERE key = ? AND token = ?",
+                (json.dumps(response), time.time() + retention, key, token)
+            )
+    
+    def _discard(self, key, token):
+        """删除未成功的执行记录，使等待者接手重新执行"""
+        with self._store.transaction() as conn:
+            conn.execute('DELETE FROM idempotency_records WHERE key = ? AND token = ?', (key, token))
+    
+    def _maybe_purge(self, now):
+        """每写入一定次数清理一次过期记录"""
+        with self._lock:
+            self._writes += 1
+            if self._writes % 1000:
+                return
+        with self._store.transaction() as conn:
+            conn.execute('DELETE FROM idempotency_records WHERE expires_at <= ?', (now,))
+    
+    @staticmethod
+    def _capture(response):
+        """把响应转换为可保存的字典"""
+        return {
+            'status': response.status_code,
+            'headers': [[name, value] for name, value in response.headers if name.lower() not in _SKIPPED_HEADERS],
+            'body': response.get_data(as_text=True)
+        }
+    
+    @staticmethod
+    def _restore(saved):
+        """从保存的字典重建响应"""
+        response = current_app.response_class(saved['body'], status=saved['status'], headers=saved['headers'])
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+
+def idempotent(view):
+    """
+    为接口添加幂等键与相同请求合并
+    
+    应放在认证装饰器之内，记录按JWT主体区分。
+    
+    Args:
+        view: 视图函数
+    
+    Returns:
+        function: 包装后的视图函数
+    
+    Raises:
+        ValidationError: Idempotency-Key 为空或过长
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not idempotency.enabled:
+            return view(*args, **kwargs)
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_KEY_LENGTH:
+            raise ValidationError(f'Idempotency-Key 长度必须在1到{MAX_KEY_LENGTH}之间')
+        
+        payload = request.get_json(silent=True)
+        if payload is None:
+            payload = request.get_data(as_text=True)
+        request_hash = stable_digest([request.method, request.path, payload])
+        caller = get_jwt_identity()
+        if idempotency_key is not None:
+            key = stable_digest(['key', caller, request.path, idempotency_key])
+        else:
+            key = stable_digest(['payload', caller, request_hash])
+        
+        response, _ = idempotency.execute(
+            key, request_hash,
+            lambda: current_app.make_response(view(*args, **kwargs)),
+            replay_completed=idempotency_key is not None
+        )
+        return response
+    
+    return wrapper
+
+# 当前工作进程的幂等记录
+idempotency = Idempotency()
@@ -0,0 +1,122 @@
+"""
+JWT管理模块
+
+CachingJWTManager在每个工作进程内缓存已验证过签名的令牌解码结果，
+同一令牌的后续请求不再重复解码和HMAC校验。缓存键为令牌的摘要，
+条目在令牌过期时刻失效，过期令牌总是回落到完整校验并按原有方式报错。
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask_jwt_extended import JWTManager
+
+class VerifiedTokenCache:
+    """
+    已验证令牌的LRU缓存
+    """
+    
+    def __init__(self, max_size=10000, default_ttl=300.0):
+        """
+        初始化缓存
+        
+        Args:
+            max_size (int): 最多缓存的令牌数
+            default_ttl (float): 令牌没有exp声明时的缓存秒数
+        """
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(encoded_token):
+        """计算令牌摘要，避免在内存中长期保存原始令牌"""
+        return hashlib.blake2b(encoded_token.encode('utf-8'), digest_size=20).digest()
+    
+    def get(self, key):
+        """
+        查询未过期的解码结果
+        
+        Args:
+            key (bytes): 令牌摘要
+        
+        Returns:
+            dict: 解码结果，不存在或已过期时返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+    
+    def set(self, key, claims):
+        """
+        缓存解码结果，过期时间取令牌的exp声明
+        
+        Args:
+            key (bytes): 令牌摘要
+            claims (dict): 解码后的声明
+        """
+        now = time.time()
+        expires_at = claims.get('exp') or now + self.default_ttl
+        if expires_at <= now or claims.get('nbf', 0) > now:
+            return
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+class CachingJWTManager(JWTManager):
+    """
+    带已验证令牌缓存的JWTManager
+    """
+    
+    def __init__(self, app=None, add_context_processor=False):
+        self.verified_tokens = VerifiedTokenCache()
+        self.cache_enabled = True
+        super().__init__(app, add_context_processor)
+    
+    def init_app(self, app, add_context_processor=False):
+        """
+        注册到应用并读取缓存配置
+        
+        Args:
+            app: Flask应用实例
+            add_context_processor (bool): 是否注册模板上下文处理器
+        """
+        super().init_app(app, add_context_processor)
+        self.cache_enabled = app.config.get('JWT_VERIFY_CACHE_ENABLED', True)
+        self.verified_tokens.max_size = app.config.get('JWT_VERIFY_CACHE_SIZE', 10000)
+        self.verified_tokens.clear()
+    
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        # CSRF校验和允许过期的解码依赖调用参数，不走缓存
+        if not self.cache_enabled or csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        
+        key = self.verified_tokens.make_key(encoded_token)
+        claims = self.verified_tokens.get(key)
+        if claims is not None:
+            return dict(claims)
+        
+        claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        self.verified_tokens.set(key, dict(claims))
+        return claims
@@ -0,0 +1,90 @@
+"""
+本机共享存储
+
+基于SQLite文件的轻量存储，供同一主机上的多个gunicorn工作进程共享状态
+（结果缓存、限流、幂等等）。每个线程持有独立连接，fork之后自动重连。
+"""
+import os
+import sqlite3
+import threading
+
+class LocalStore:
+    """
+    进程间共享的SQLite存储
+    """
+    
+    def __init__(self, path, schema, busy_timeout=5.0):
+        """
+        初始化存储
+        
+        Args:
+            path (str): SQLite文件路径
+            schema (str): 建表SQL，首次连接时执行
+            busy_timeout (float): 等待其他进程释放写锁的最长秒数
+        """
+        self.path = path
+        self.schema = schema
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+    
+    def connect(self):
+        """
+        获取当前线程的连接
+        
+        Returns:
+            sqlite3.Connection: 自动提交模式的连接，事务需显式BEGIN
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(self.schema)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+    
+    def transaction(self):
+        """
+        开启写事务，立即获取写锁以避免多进程下的锁升级冲突
+        
+        Returns:
+            ContextManager[sqlite3.Connection]: 退出时提交，异常时回滚
+        """
+        return _ImmediateTransaction(self.connect())
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE事务上下文"""
+    
+    def __init__(self, conn):
+        self.conn = conn
+    
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute('COMMIT')
+        else:
+            self.conn.execute('ROLLBACK')
+        return False
+
+def local_store_path(app, name):
+    """
+    计算本机共享存储文件路径
+    
+    Args:
+        app: Flask应用实例
+        name (str): 存储文件名
+    
+    Returns:
+        str: 位于LOCAL_STATE_DIR（默认为应用instance目录）下的文件路径
+    """
+    directory = app.config.get('LOCAL_STATE_DIR') or app.instance_path
+    return os.path.join(directory, name)
@@ -0,0 +1,322 @@
+"""
+请求指标模块
+
+按端点记录请求延迟直方图、状态码计数和进行中的请求数，并在 /metrics 以
+Prometheus文本格式输出。
+
+多进程部署时，每个工作进程定期把自己的累计值写入 METRICS_DIR 下以pid命名的
+快照文件；抓取时合并目录中所有快照（本进程使用内存中的实时数据），因此无论
+抓取请求落到哪个工作进程，得到的都是全部工作进程的汇总值。进行中请求数只统计
+仍存活的进程。
+
+gunicorn主进程回收工作进程后调用 fold_worker_snapshot，把已退出进程的计数合并进
+同目录下的汇总文件并删除其快照文件，快照文件数量不会随工作进程重启无限增长，
+pid被新进程复用时计数也不会倒退。
+"""
+import atexit
+import bisect
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from flask import Response, g, request
+
+from app.utils.process import is_process_alive
+
+# 延迟直方图的桶上界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 已退出工作进程的累计值，文件名不匹配快照文件的 metrics_*.json
+EXITED_FILE = 'exited_workers.json'
+
+# 汇总文件保留最近合并的快照标识数，供合并与删除之间的抓取跳过已合并的快照
+FOLDED_TOKENS = 64
+
+class RequestMetrics:
+    """
+    请求指标收集器
+    """
+    
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        初始化收集器
+        
+        Args:
+            buckets (tuple): 直方图桶上界（秒），不含+Inf
+        """
+        self.buckets = tuple(buckets)
+        self.directory = None
+        self.flush_interval = 1.0
+        self._atexit_registered = False
+        self._lock = threading.Lock()
+        self._reset()
+    
+    def _reset(self):
+        """清空当前进程的累计值"""
+        self._pid = os.getpid()
+        # 区分同一pid先后的不同进程
+        self._token = uuid.uuid4().hex
+        # (endpoint, method) -> [各桶计数..., +Inf桶计数]
+        self._histograms = {}
+        # (endpoint, method) -> [总耗时, 总次数]
+        self._sums = {}
+        # (endpoint, method, status) -> 次数
+        self._statuses = {}
+        # endpoint -> 进行中请求数
+        self._in_flight = {}
+        self._last_flush = 0.0
+    
+    def init_app(self, app):
+        """
+        注册请求钩子与 /metrics 端点
+        
+        Args:
+            app: Flask应用实例
+        """
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        self.directory = app.config.get('METRICS_DIR')
+        self.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 1.0)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            if not self._atexit_registered:
+                atexit.register(self.flush)
+                self._atexit_registered = True
+        
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self._metrics_view)
+    
+    @staticmethod
+    def _endpoint_label():
+        """使用路由规则而不是实际路径作为标签，避免标签基数失控"""
+        rule = request.url_rule
+        return rule.rule if rule is not None else '<unmatched>'
+    
+    def _before_request(self):
+        endpoint = self._endpoint_label()
+        g._metrics_start = time.perf_counter()
+        g._metrics_endpoint = endpoint
+        with self._lock:
+            if self._pid != os.getpid():
+                # gunicorn preload模式下fork出的子进程不继承父进程的计数
+                self._reset()
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+    
+    def _after_request(self, response):
+        self._record(response.status_code)
+        return response
+    
+    def _teardown_request(self, exc):
+        # 未经过after_request（例如未处理的异常）的请求按500记录
+        if '_metrics_start' in g:
+            self._record(500)
+    
+    def _record(self, status_code):
+        """记录一次请求的耗时与状态码"""
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        endpoint = g._metrics_endpoint
+        key = (endpoint, request.method)
+        index = bisect.bisect_left(self.buckets, elapsed)
+        
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = [0.0, 0]
+            histogram[index] += 1
+            totals = self._sums[key]
+            totals[0] += elapsed
+            totals[1] += 1
+            status_key = (endpoint, request.method, status_code)
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+            self._in_flight[endpoint] -= 1
+            
+            should_flush = self.directory and (time.monotonic() - self._last_flush) >= self.flush_interval
+            if should_flush:
+                self._last_flush = time.monotonic()
+                snapshot = self._snapshot_locked()
+        if should_flush:
+            self._write_snapshot(snapshot)
+    
+    def _snapshot_locked(self):
+        """生成当前进程累计值的可序列化快照"""
+        snapshot = _serialize(self._histograms, self._sums, self._statuses, self._in_flight)
+        snapshot['pid'] = self._pid
+        snapshot['token'] = self._token
+        return snapshot
+    
+    def _write_snapshot(self, snapshot):
+        """原子地写入快照文件，避免抓取时读到半个文件"""
+        try:
+            _write_json(self.directory, f"metrics_{snapshot['pid']}.json", snapshot)
+        except OSError:
+            # 指标写入失败不能影响请求处理
+            pass
+    
+    def flush(self):
+        """立即把当前进程的累计值写入快照文件"""
+        if not self.directory or self._pid != os.getpid():
+            return
+        with self._lock:
+            snapshot = self._snapshot_locked()
+        self._write_snapshot(snapshot)
+    
+    def collect(self):
+        """
+        汇总所有工作进程的指标
+        
+        Returns:
+            dict: 与快照结构相同的汇总数据
+        """
+        with self._lock:
+            snapshots = [self._snapshot_locked()]
+        own_pid = snapshots[0]['pid']
+        if self.directory:
+            others = []
+            for path in glob.glob(os.path.join(self.directory, 'metrics_*.json')):
+                snapshot = _load_json(path)
+                if snapshot is None or snapshot.get('pid') == own_pid:
+                    continue
+                if not is_process_alive(snapshot.get('pid')):
+                    snapshot['in_flight'] = {}
+                others.append(snapshot)
+            # 汇总文件在快照文件之后读取：合并时先写汇总文件再删除快照，
+            # 读到仍未删除的快照时，汇总文件中一定已有它的标识
+            exited = _load_json(os.path.join(self.directory, EXITED_FILE))
+            if exited is not None:
+                folded = set(exited.get('folded', ()))
+                others = [snapshot for snapshot in others if snapshot.get('token') not in folded]
+                snapshots.append(exited)
+            snapshots.extend(others)
+        return _merge_snapshots(snapshots)
+    
+    def render(self):
+        """
+        以Prometheus文本格式输出汇总指标
+        
+        Returns:
+            str: Prometheus exposition格式文本
+        """
+        data = self.collect()
+        lines = [
+            '# HELP http_request_duration_seconds Request latency by endpoint.',
+            '# TYPE http_request_duration_seconds histogram'
+        ]
+        bounds = [_format_bound(b) for b in self.buckets] + ['+Inf']
+        for (endpoint, method), counts in sorted(data['histograms'].items()):
+            labels = f'endpoint="{_escape(endpoint)}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            total, count = data['sums'][(endpoint, method)]
+            lines.append(f'http_request_duration_seconds_sum{{{labels}}} {total}')
+            lines.append(f'http_request_duration_seconds_count{{{labels}}} {count}')
+        
+        lines.append('# HELP http_requests_total Requests by endpoint and status code.')
+        lines.append('# TYPE http_requests_total counter')
+        for (endpoint, method, status), count in sorted(data['statuses'].items()):
+            lines.append(
+                f'http_requests_total{{endpoint="{_escape(endpoint)}",method="{method}",status="{status}"}} {count}'
+            )
+        
+        lines.append('# HELP http_requests_in_flight Requests currently being processed.')
+        lines.append('# TYPE http_requests_in_flight gauge')
+        for endpoint, count in sorted(data['in_flight'].items()):
+            lines.append(f'http_requests_in_flight{{endpoint="{_escape(endpoint)}"}} {count}')
+        return '\n'.join(lines) + '\n'
+    
+    def _metrics_view(self):
+        """Prometheus抓取端点"""
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+def fold_worker_snapshot(directory, pid):
+    """
+    把已退出工作进程的快照合并进汇总文件，然后删除快照文件
+    
+    只能由gunicorn主进程在回收工作进程之后调用（此时pid尚未被复用），
+    同一时刻只有一个调用方写汇总文件。
+    
+    Args:
+        directory (str): 指标目录
+        pid (int): 已退出的工作进程pid
+    """
+    path = os.path.join(directory, f'metrics_{pid}.json')
+    snapshot = _load_json(path)
+    if snapshot is not None:
+        exited = _load_json(os.path.join(directory, EXITED_FILE)) or {}
+        snapshot['in_flight'] = {}
+        merged = _merge_snapshots([{**exited, 'in_flight': {}}, snapshot])
+        aggregate = _serialize(merged['histograms'], merged['sums'], merged['statuses'], {})
+        aggregate['folded'] = (exited.get('folded', []) + [snapshot.get('token')])[-FOLDED_TOKENS:]
+        _write_json(directory, EXITED_FILE, aggregate)
+    if os.path.exists(path):
+        os.unlink(path)
+
+def _serialize(histograms, sums, statuses, in_flight):
+    """把累计值转换为可序列化的快照结构"""
+    return {
+        'histograms': [[k[0], k[1], list(v)] for k, v in histograms.items()],
+        'sums': [[k[0], k[1], v[0], v[1]] for k, v in sums.items()],
+        'statuses': [[k[0], k[1], k[2], v] for k, v in statuses.items()],
+        'in_flight': dict(in_flight)
+    }
+
+def _write_json(directory, name, data):
+    """通过临时文件加重命名原子地写入JSON文件"""
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics_')
+    try:
+        with os.fdopen(fd, 'w') as file:
+            json.dump(data, file, separators=(',', ':'))
+        os.replace(tmp_path, os.path.join(directory, name))
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def _load_json(path):
+    """读取快照或汇总文件，文件不存在或内容损坏时返回None"""
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+def _merge_snapshots(snapshots):
+    """合并多个进程的快照"""
+    histograms, sums, statuses, in_flight = {}, {}, {}, {}
+    for snapshot in snapshots:
+        for endpoint, method, counts in snapshot.get('histograms', ()):
+            merged = histograms.setdefault((endpoint, method), [0] * len(counts))
+            for i, count in enumerate(counts):
+                merged[i] += count
+        for endpoint, method, total, count in snapshot.get('sums', ()):
+            merged = sums.setdefault((endpoint, method), [0.0, 0])
+            merged[0] += total
+            merged[1] += count
+        for endpoint, method, status, count in snapshot.get('statuses', ()):
+            key = (endpoint, method, status)
+            statuses[key] = statuses.get(key, 0) + count
+        for endpoint, count in snapshot.get('in_flight', {}).items():
+            in_flight[endpoint] = in_flight.get(endpoint, 0) + count
+    return {'histograms': histograms, 'sums': sums, 'statuses': statuses, 'in_flight': in_flight}
+
+def _format_bound(bound):
+    """格式化桶上界"""
+    return repr(float(bound))
+
+def _escape(value):
+    """转义Prometheus标签值"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# 当前工作进程的指标收集器
+request_metrics = RequestMetrics()
@@ -0,0 +1,207 @@
+"""
+密码哈希模块
+
+PBKDF2等密码哈希算法刻意消耗大量CPU。PasswordHasher把哈希计算放到专用的
+有界线程池中执行（hashlib在计算期间释放GIL，多个线程可以真正并行），并对
+等待中的哈希请求做准入控制：排队名额用尽时在 PASSWORD_HASH_QUEUE_TIMEOUT
+内等待，仍无名额则快速失败返回503，避免登录洪峰拖垮同一工作进程的其他接口。
+
+每个工作进程同时只处理一个请求时（gunicorn的sync工作进程，PASSWORD_HASH_INLINE），
+交给线程池再阻塞等待只会增加线程切换开销，此时在请求线程中直接计算，只保留准入控制。
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.core.errors import ServiceUnavailableError
+
+# 与werkzeug的默认方法一致，已有的密码哈希无需迁移
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+def parse_method(method):
+    """
+    解析werkzeug哈希方法字符串
+    
+    Args:
+        method (str): 哈希方法，例如 'scrypt:32768:8:1' 或 'pbkdf2:sha256:600000'
+    
+    Returns:
+        tuple: (算法标识, 强度参数元组)；无法解析时返回None
+    """
+    parts = method.split(':')
+    try:
+        if parts[0] == 'scrypt' and len(parts) == 4:
+            return ('scrypt',), tuple(int(part) for part in parts[1:])
+        if parts[0] == 'pbkdf2' and len(parts) == 3:
+            return ('pbkdf2', parts[1]), (int(parts[2]),)
+    except ValueError:
+        pass
+    return None
+
+class PasswordHasher:
+    """
+    带并发上限和准入控制的密码哈希执行器
+    """
+    
+    def __init__(self, method=DEFAULT_METHOD, salt_length=16, max_workers=2,
+                 max_pending=32, queue_timeout=2.0, inline=False):
+        """
+        初始化执行器
+        
+        Args:
+            method (str): werkzeug哈希方法，需写明全部参数（例如 'scrypt:32768:8:1'），
+                以便与已存储哈希的参数比较
+            salt_length (int): 盐长度
+            max_workers (int): 同时进行的哈希计算数
+            max_pending (int): 包括计算中在内的最大排队数
+            queue_timeout (float): 等待排队名额的最长秒数
+            inline (bool): 在调用线程中直接计算，不使用线程池
+        """
+        self.method = method
+        self.salt_length = salt_length
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.inline = inline
+        self.retry_after = 1
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        """
+        根据应用配置设置哈希参数
+        
+        Args:
+            app: Flask应用实例
+        """
+        self.method = app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+        self.salt_length = app.config.get('PASSWORD_HASH_SALT_LENGTH', 16)
+        self.max_workers = app.config.get('PASSWORD_HASH_WORKERS') or min(os.cpu_count() or 1, 4)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', 32)
+        self.queue_timeout = app.config.get('PASSWORD_HASH_QUEUE_TIMEOUT', 2.0)
+        self.retry_after = app.config.get('PASSWORD_HASH_RETRY_AFTER', 1)
+        self.inline = app.config.get('PASSWORD_HASH_INLINE', False)
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
+            self._slots = None
+    
+    def _ensure_executor(self):
+        """按需创建线程池（直接计算时为None）和排队名额，fork之后在子进程中重新创建"""
+        with self._lock:
+            if self._slots is None or self._pid != os.getpid():
+                self._executor = None if self.inline else ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='password-hash'
+                )
+                self._slots = threading.BoundedSemaphore(max(self.max_pending, self.max_workers))
+                self._pid = os.getpid()
+            return self._executor, self._slots
+    
+    def _run(self, func, *args):
+        """在准入控制下执行哈希计算，使用线程池时提交后等待结果"""
+        executor, slots = self._ensure_executor()
+        if not slots.acquire(timeout=self.queue_timeout):
+            raise ServiceUnavailableError(
+                '认证服务繁忙，请稍后重试',
+                headers={'Retry-After': str(self.retry_after)}
+            )
+        try:
+            if executor is None:
+                return func(*args)
+            return executor.submit(func, *args).result()
+        finally:
+            slots.release()
+    
+    def hash(self, password):
+        """
+        计算密码哈希
+        
+        Args:
+            password (str): 明文密码
+        
+        Returns:
+            str: 密码哈希
+        
+        Raises:
+            ServiceUnavailableError: 排队已满
+        """
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+    
+    def verify(self, password_hash, password):
+        """
+        校验密码
+        
+        Args:
+            password_hash (str): 存储的密码哈希
+            password (str): 明文密码
+        
+        Returns:
+            bool: 密码正确返回True
+        
+        Raises:
+            ServiceUnavailableError: 排队已满
+        """
+        return self._run(check_password_hash, password_hash, password)
+    
+    def hash_many(self, passwords):
+        """
+        计算一批密码哈希，用于批量导入等后台操作
+        
+        每次最多提交max_workers个哈希并占用同样多的排队名额，这一小段完成后再提交下一段，
+        登录请求仍能拿到其余名额并插队到下一段之前执行；等待名额不受排队超时限制。
+        
+        Args:
+            passwords (list): 明文密码列表
+        
+        Returns:
+            list: 与输入顺序一致的密码哈希列表
+        """
+        executor, slots = self._ensure_executor()
+        if executor is None:
+            password_hashes = []
+            for password in passwords:
+                with slots:
+                    password_hashes.append(generate_password_hash(password, self.method, self.salt_length))
+            return password_hashes
+        password_hashes = []
+        for start in range(0, len(passwords), self.max_workers):
+            futures = []
+            for password in passwords[start:start + self.max_workers]:
+                slots.acquire()
+                try:
+                    future = executor.submit(generate_password_hash, password, self.method, self.salt_length)
+                except Exception:
+                    slots.release()
+                    raise
+                future.add_done_callback(lambda _: slots.release())
+                futures.append(future)
+            password_hashes.extend(future.result() for future in futures)
+        return password_hashes
+    
+    def needs_rehash(self, password_hash):
+        """
+        判断哈希是否使用了比当前配置更弱的参数
+        
+        只在算法相同（pbkdf2还要求摘要算法相同）且存储的参数低于当前配置时重新哈希；
+        算法不同的哈希保持原样，避免把scrypt哈希降级为配置中的其他算法。
+        
+        Args:
+            password_hash (str): 存储的密码哈希
+        
+        Returns:
+            bool: 需要按当前配置重新哈希时返回True
+        """
+        stored = parse_method(password_hash.split('$', 1)[0])
+        current = parse_method(self.method)
+        if stored is None or current is None or stored[0] != current[0]:
+            return False
+        return any(old < new for old, new in zip(stored[1], current[1]))
+
+# 当前工作进程的密码哈希执行器
+password_hasher = PasswordHasher()
@@ -0,0 +1,169 @@
+"""
+SQL查询统计模块
+
+在数据库引擎的cursor执行事件上统计每个请求发出的SQL语句数和数据库总耗时，
+超过 SQL_SLOW_QUERY_THRESHOLD 的语句写入慢查询日志（只记录参数的结构和类型，
+不记录参数值，避免把密码哈希等敏感数据写进日志）。调试和测试模式下通过
+X-DB-Query-Count、X-DB-Query-Time 响应头暴露统计结果。
+
+capture() 可以在请求之外收集任意代码块发出的语句，供测试中的查询预算断言使用。
+"""
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# 当前上下文中正在收集语句的收集器
+_collectors = contextvars.ContextVar('query_stats_collectors', default=())
+
+class QueryCollector:
+    """
+    一段代码内的SQL统计
+    """
+    
+    def __init__(self, keep_statements=False):
+        """
+        初始化收集器
+        
+        Args:
+            keep_statements (bool): 是否保留每条语句的文本和耗时
+        """
+        self.count = 0
+        self.duration = 0.0
+        self.keep_statements = keep_statements
+        self.statements = []
+    
+    def record(self, statement, duration):
+        """记录一条语句"""
+        self.count += 1
+        self.duration += duration
+        if self.keep_statements:
+            self.statements.append((statement, duration))
+
+class QueryStats:
+    """
+    请求级SQL统计与慢查询日志
+    """
+    
+    def __init__(self):
+        self.slow_threshold = 0.5
+        self.expose_headers = False
+    
+    def init_app(self, app, db):
+        """
+        在应用的全部数据库引擎上注册事件，并注册请求钩子
+        
+        Args:
+            app: Flask应用实例
+            db: Flask-SQLAlchemy实例
+        """
+        if not app.config.get('SQL_STATS_ENABLED', True):
+            return
+        self.slow_threshold = app.config.get('SQL_SLOW_QUERY_THRESHOLD', 0.5)
+        expose = app.config.get('SQL_STATS_HEADERS')
+        self.expose_headers = (app.debug or app.testing) if expose is None else expose
+        
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+    
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # 开始时间保存在本次执行的上下文上，语句出错时随上下文一起丢弃，不会残留在连接上
+        if context is not None:
+            context._query_stats_start = time.perf_counter()
+    
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_query_stats_start', None)
+        if start is None:
+            return
+        duration = time.perf_counter() - start
+        for collector in _collectors.get():
+            collector.record(statement, duration)
+        if self.slow_threshold is not None and duration >= self.slow_threshold:
+            logger.warning(
+                '慢查询 %.1fms: %s 参数结构: %s',
+                duration * 1000, statement, parameters_shape(parameters, executemany)
+            )
+    
+    def _before_request(self):
+        collector = QueryCollector()
+        g._query_stats = collector
+        g._query_stats_token = _collectors.set(_collectors.get() + (collector,))
+    
+    def _after_request(self, response):
+        collector = g.get('_query_stats')
+        if collector is not None and self.expose_headers:
+            response.headers['X-DB-Query-Count'] = str(collector.count)
+            response.headers['X-DB-Query-Time'] = f'{collector.duration * 1000:.2f}'
+        return response
+    
+    @staticmethod
+    def _teardown_request(exc):
+        token = g.pop('_query_stats_token', None)
+        if token is not None:
+            try:
+                _collectors.reset(token)
+            except ValueError:
+                # 钩子在不同的上下文中执行（例如流式响应），直接移除本请求的收集器
+                collector = g.get('_query_stats')
+                _collectors.set(tuple(c for c in _collectors.get() if c is not collector))
+    
+    @staticmethod
+    def current():
+        """
+        获取当前请求的统计
+        
+        Returns:
+            QueryCollector: 不在请求中时返回None
+        """
+        return g.get('_query_stats') if has_request_context() else None
+
+@contextmanager
+def capture():
+    """
+    收集代码块中发出的全部SQL语句（包括其中的请求）
+    
+    Yields:
+        QueryCollector: 保留语句文本的收集器
+    """
+    collector = QueryCollector(keep_statements=True)
+    token = _collectors.set(_collectors.get() + (collector,))
+    try:
+        yield collector
+    finally:
+        _collectors.reset(token)
+
+def parameters_shape(parameters, executemany=False):
+    """
+    描述参数的结构和类型，不包含参数值
+    
+    Args:
+        parameters: DBAPI参数（序列或字典）
+        executemany (bool): 是否为批量执行
+    
+    Returns:
+        str: 例如 "(int, str)"、"{username: str}" 或 "100 x (str, str)"
+    """
+    if executemany:
+        if not parameters:
+            return '0 x ()'
+        return f'{len(parameters)} x {parameters_shape(parameters[0])}'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in parameters.items()) + '}'
+    if isinstance(parameters, (list, tuple)):
+        return '(' + ', '.join(type(value).__name__ for value in parameters) + ')'
+    return type(parameters).__name__
+
+# 当前工作进程的SQL统计
+query_stats = QueryStats()
@@ -0,0 +1,290 @@
+"""
+限流与准入控制模块
+
+RateLimiter 为 RATE_LIMITS 中声明的每个端点维护按调用者计的令牌桶：桶容量为
+周期内允许的请求数，令牌按固定速率补充，调用者为JWT主体（未携带有效令牌时为
+客户端IP）。AgentConcurrencyLimiter 按 AGENT_CONCURRENCY_LIMITS 限制每种Agent
+同时处理的请求数。
+
+两者的状态都保存在本机共享存储（LocalStore）中，同一主机上的所有gunicorn工作
+进程共用一份额度。被拒绝的请求返回429，并通过 Retry-After 告知客户端何时重试。
+"""
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+
+from app.core.errors import TooManyRequestsError
+from app.core.local_store import LocalStore, local_store_path
+from app.utils.process import is_process_alive
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    full_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_rate_buckets_full_at ON rate_buckets (full_at);
+CREATE TABLE IF NOT EXISTS agent_leases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    agent_type TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_agent_leases_agent_type ON agent_leases (agent_type);
+"""
+
+# 限流周期名称对应的秒数
+PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400
+}
+
+def parse_rate(spec):
+    """
+    解析限流声明
+    
+    Args:
+        spec (str): 形如 "60/minute" 的声明，周期为 second、minute、hour 或 day
+    
+    Returns:
+        tuple: (桶容量, 每秒补充的令牌数)
+    
+    Raises:
+        ValueError: 声明格式无效
+    """
+    count, _, period = str(spec).partition('/')
+    try:
+        count = int(count)
+    except ValueError:
+        count = 0
+    if count <= 0 or period not in PERIODS:
+        raise ValueError(f'无效的限流声明: {spec}，格式应为 "次数/second|minute|hour|day"')
+    return count, count / PERIODS[period]
+
+def _store_for(app):
+    """获取应用的限流共享存储"""
+    return LocalStore(local_store_path(app, 'rate_limit.db'), _SCHEMA)
+
+class RateLimiter:
+    """
+    跨工作进程共享的令牌桶限流器
+    """
+    
+    def __init__(self):
+        self.enabled = True
+        # 端点 -> (桶容量, 每秒补充的令牌数)
+        self.limits = {}
+        self._store = None
+        self._lock = threading.Lock()
+        self._writes = 0
+    
+    def init_app(self, app):
+        """
+        解析端点限流声明并注册before_request钩子
+        
+        Args:
+            app: Flask应用实例
+        
+        Raises:
+            ValueError: 限流声明格式无效
+        """
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', True)
+        self.limits = {
+            endpoint: parse_rate(spec) for endpoint, spec in (app.config.get('RATE_LIMITS') or {}).items()
+        }
+        self._store = None
+        if not self.enabled or not self.limits:
+            return
+        self._store = _store_for(app)
+        app.before_request(self._before_request)
+    
+    def _before_request(self):
+        limit = self.limits.get(request.endpoint)
+        if limit is None:
+            return
+        retry_after = self.hit(f'{request.endpoint}:{self._caller()}', *limit)
+        if retry_after:
+            raise TooManyRequestsError(
+                '请求过于频繁，请稍后重试',
+                headers={'Retry-After': str(retry_after)}
+            )
+    
+    @staticmethod
+    def _caller():
+        """识别调用者：有效JWT的主体，否则为客户端IP（令牌无效的请求由视图的认证装饰器拒绝）"""
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+        except (JWTExtendedException, PyJWTError):
+            identity = None
+        if identity is not None:
+            return f'user:{identity}'
+        return f'ip:{request.remote_addr}'
+    
+    def hit(self, key, capacity, rate):
+        """
+        从令牌桶中取出一个令牌
+        
+        Args:
+            key (str): 桶的键
+            capacity (int): 桶容量
+            rate (float): 每秒补充的令牌数
+        
+        Returns:
+            int: 允许时返回0，否则返回建议的重试等待秒数
+        """
+        now = time.time()
+        with self._store.transaction() as conn:
+            row = conn.execute('SELECT tokens, updated_at FROM rate_buckets WHERE key = ?', (key,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # 桶补满之后的记录与不存在等价，可以被清理
+            full_at = now + (capacity - tokens) / rate
+            conn.execute(
+                'INSERT OR REPLACE INTO rate_buckets (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?)',
+                (key, tokens, now, full_at)
+            )
+        self._maybe_purge(now)
+        if allowed:
+            return 0
+        return max(1, math.ceil((1 - tokens) / rate))
+    
+    def _maybe_purge(self, now):
+        """每写入一定次数清理一次已补满的桶"""
+        with self._lock:
+            self._writes += 1
+            if self._writes % 1000:
+                return
+        with self._store.transaction() as conn:
+            conn.execute('DELETE FROM rate_buckets WHERE full_at <= ?', (now,))
+    
+    def reset(self):
+        """清空全部令牌桶"""
+        if self._store is not None:
+            with self._store.transaction() as conn:
+                conn.execute('DELETE FROM rate_buckets')
+
+class AgentConcurrencyLimiter:
+    """
+    按Agent类型限制本机所有工作进程的同时处理数
+    """
+    
+    def __init__(self):
+        self.limits = {}
+        self.default_limit = None
+        self.lease_ttl = 300.0
+        self.retry_after = 1
+        self._store = None
+    
+    def init_app(self, app):
+        """
+        根据应用配置初始化限制
+        
+        Args:
+            app: Flask应用实例
+        """
+        self.limits = dict(app.config.get('AGENT_CONCURRENCY_LIMITS') or {})
+        self.default_limit = app.config.get('AGENT_CONCURRENCY_DEFAULT')
+        self.lease_ttl = app.config.get('AGENT_CONCURRENCY_LEASE_TTL', 300.0)
+        self.retry_after = app.config.get('AGENT_CONCURRENCY_RETRY_AFTER', 1)
+        self._store = None
+        if app.config.get('RATE_LIMIT_ENABLED', True) and (self.limits or self.default_limit):
+            self._store = _store_for(app)
+    
+    def limit_for(self, agent_type):
+        """
+        获取Agent类型的并发上限
+        
+        Args:
+            agent_type (str): Agent类型
+        
+        Returns:
+            int: 并发上限，None表示不限制
+        """
+        return self.limits.get(agent_type, self.default_limit)
+    
+    def acquire(self, agent_type):
+        """
+        占用一个处理名额
+        
+        超过 AGENT_CONCURRENCY_LEASE_TTL 的名额和已退出进程持有的名额视为已释放，
+        避免工作进程崩溃后名额永久丢失。
+        
+        Args:
+            agent_type (str): Agent类型
+        
+        Returns:
+            int: 名额ID，不限制时返回None
+        
+        Raises:
+            TooManyRequestsError: 名额已满
+        """
+        limit = self.limit_for(agent_type)
+        if self._store is None or not limit:
+            return None
+        now = time.time()
+        with self._store.transaction() as conn:
+            conn.execute('DELETE FROM agent_leases WHERE expires_at <= ?', (now,))
+            leases = conn.execute('SELECT id, pid FROM agent_leases WHERE agent_type = ?', (agent_type,)).fetchall()
+            if len(leases) >= limit:
+                dead = [(lease_id,) for lease_id, pid in leases if not is_process_alive(pid)]
+                conn.executemany('DELETE FROM agent_leases WHERE id = ?', dead)
+                full = len(leases) - len(dead) >= limit
+            else:
+                full = False
+            if not full:
+                lease_id = conn.execute(
+                    'INSERT INTO agent_leases (agent_type, pid, expires_at) VALUES (?, ?, ?)',
+                    (agent_type, os.getpid(), now + self.lease_ttl)
+                ).lastrowid
+        if full:
+            raise TooManyRequestsError(
+                f'Agent {agent_type} 的并发处理数已达上限，请稍后重试',
+                headers={'Retry-After': str(self.retry_after)}
+            )
+        return lease_id
+    
+    def release(self, lease_id):
+        """
+        释放处理名额
+        
+        Args:
+            lease_id (int): acquire返回的名额ID，None时忽略
+        """
+        if lease_id is None or self._store is None:
+            return
+        with self._store.transaction() as conn:
+            conn.execute('DELETE FROM agent_leases WHERE id = ?', (lease_id,))
+    
+    @contextmanager
+    def slot(self, agent_type):
+        """
+        在代码块执行期间占用一个处理名额
+        
+        Args:
+            agent_type (str): Agent类型
+        
+        Raises:
+            TooManyRequestsError: 名额已满
+        """
+        lease_id = self.acquire(agent_type)
+        try:
+            yield
+        finally:
+            self.release(lease_id)
+
+# 当前工作进程的限流器与Agent并发限制
+rate_limiter = RateLimiter()
+agent_concurrency = AgentConcurrencyLimiter()
@@ -0,0 +1,221 @@
+"""
+令牌吊销模块
+
+吊销记录持久化在 revoked_tokens 表中，作为精确判定的依据；每个工作进程在内存中
+维护一个布隆过滤器，绝大多数未被吊销的令牌在过滤器中即可判定为"未吊销"，
+无需访问数据库，检查耗时与吊销列表的规模无关。过滤器判定"可能已吊销"时再按jti
+主键精确查询。
+
+各工作进程按 JWT_BLOCKLIST_SYNC_INTERVAL 从数据库增量同步其他进程新增的吊销记录，
+因此在其他工作进程中吊销的令牌最迟在一个同步周期后失效。
+
+过期令牌本身已无法通过校验，各工作进程每隔 JWT_BLOCKLIST_PURGE_INTERVAL 删除
+过期的吊销记录并重建过滤器（布隆过滤器不支持删除元素），吊销表和过滤器的规模
+只取决于未过期的吊销令牌数。
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core.extensions import db
+from app.models.revoked_token_model import RevokedToken
+
+class BloomFilter:
+    """
+    布隆过滤器，只会误报不会漏报
+    """
+    
+    def __init__(self, capacity, error_rate=0.001):
+        """
+        按预期容量和误报率分配位数组
+        
+        Args:
+            capacity (int): 预期元素数量
+            error_rate (float): 达到容量时的目标误报率
+        """
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+    
+    def _positions(self, item):
+        """使用双重哈希计算k个位置"""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hash_count)]
+    
+    def add(self, item):
+        """
+        加入元素
+        
+        Args:
+            item (str): 元素
+        """
+        bits = self.bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    
+    def __contains__(self, item):
+        bits = self.bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+class TokenBlocklist:
+    """
+    基于布隆过滤器和数据库精确回退的令牌吊销列表
+    """
+    
+    def __init__(self):
+        self.enabled = True
+        self.capacity = 1000000
+        self.error_rate = 0.001
+        self.sync_interval = 1.0
+        self.purge_interval = 3600.0
+        self._lock = threading.Lock()
+        self._reset()
+    
+    def _reset(self):
+        """重建空的过滤器，下一次检查时从数据库全量同步"""
+        self._filter = BloomFilter(self.capacity, self.error_rate)
+        self._last_id = 0
+        self._last_sync = 0.0
+        # 工作进程的第一次同步即清理过期记录，定期重启的工作进程同样会清理
+        self._last_purge = float('-inf')
+    
+    def init_app(self, app, jwt):
+        """
+        读取配置并注册到JWTManager的吊销检查回调
+        
+        Args:
+            app: Flask应用实例
+            jwt: JWTManager实例
+        """
+        self.enabled = app.config.get('JWT_BLOCKLIST_ENABLED', True)
+        self.capacity = app.config.get('JWT_BLOCKLIST_CAPACITY', 1000000)
+        self.error_rate = app.config.get('JWT_BLOCKLIST_ERROR_RATE', 0.001)
+        self.sync_interval = app.config.get('JWT_BLOCKLIST_SYNC_INTERVAL', 1.0)
+        self.purge_interval = app.config.get('JWT_BLOCKLIST_PURGE_INTERVAL', 3600.0)
+        with self._lock:
+            self._reset()
+        if self.enabled:
+            jwt.token_in_blocklist_loader(self._token_in_blocklist)
+    
+    def _token_in_blocklist(self, jwt_header, jwt_payload):
+        """JWTManager的吊销检查回调"""
+        jti = jwt_payload.get('jti')
+        return jti is not None and self.is_revoked(jti)
+    
+    def sync(self, force=False):
+        """
+        从数据库增量加载其他工作进程新增的吊销记录
+        
+        Args:
+            force (bool): 忽略同步间隔立即同步
+        """
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        with self._lock:
+            if now - self._last_purge >= self.purge_interval:
+                self._last_purge = now
+                self.purge_expired()
+                self._rebuild()
+            else:
+                rows = db.session.execute(
+                    db.select(RevokedToken.id, RevokedToken.jti)
+                    .where(RevokedToken.id > self._last_id)
+                    .order_by(RevokedToken.id)
+                ).all()
+                for row_id, jti in rows:
+                    self._filter.add(jti)
+                    self._last_id = row_id
+            # 元素数远超设计容量时误报率上升，重建为更大的过滤器
+            if self._filter.count > self.capacity * 2:
+                self.capacity = self._filter.count * 2
+                self._rebuild()
+            self._last_sync = now
+    
+    def _rebuild(self):
+        """
+        从数据库全量加载吊销记录到新的过滤器，加载完成后再替换，
+        检查时不会看到未加载完的过滤器而放行已吊销的令牌；调用方持有锁
+        """
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        last_id = 0
+        rows = db.session.execute(
+            db.select(RevokedToken.id, RevokedToken.jti).order_by(RevokedToken.id)
+        ).all()
+        for row_id, jti in rows:
+            bloom.add(jti)
+            last_id = row_id
+        self._filter, self._last_id = bloom, last_id
+    
+    def is_revoked(self, jti):
+        """
+        判断令牌是否已被吊销
+        
+        Args:
+            jti (str): 令牌ID
+        
+        Returns:
+            bool: 已吊销返回True
+        """
+        self.sync()
+        if jti not in self._filter:
+            return False
+        # 过滤器可能误报，按主键精确确认
+        return db.session.execute(
+            db.select(RevokedToken.id).where(RevokedToken.jti == jti)
+        ).first() is not None
+    
+    def revoke(self, jwt_payload):
+        """
+        吊销令牌
+        
+        Args:
+            jwt_payload (dict): 令牌的声明
+        """
+        jti = jwt_payload['jti']
+        exp = jwt_payload.get('exp')
+        expires_at = datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None) if exp else None
+        db.session.add(RevokedToken(
+            jti=jti,
+            token_type=jwt_payload.get('type'),
+            identity=str(jwt_payload.get('sub')),
+            expires_at=expires_at
+        ))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # jti唯一：令牌已被吊销（包括同一令牌的并发注销）
+            db.session.rollback()
+        with self._lock:
+            self._filter.add(jti)
+    
+    def purge_expired(self):
+        """
+        删除已过期令牌的吊销记录，这些令牌本身已无法通过校验
+        
+        Returns:
+            int: 删除的记录数
+        """
+        result = db.session.execute(
+            db.delete(RevokedToken).where(RevokedToken.expires_at < datetime.utcnow())
+        )
+        db.session.commit()
+        return result.rowcount
+
+# 当前工作进程的令牌吊销列表
+token_blocklist = TokenBlocklist()
@@ -0,0 +1,195 @@
+"""
+快速序列化模块
+
+为每个模型类或marshmallow模式编译一次专用的dump函数（字段列表、日期时间格式化
+在编译时确定），之后重复使用，避免marshmallow逐字段分派和逐对象构造字典的开销。
+FastJSONProvider把编译后的dump函数接入Flask的JSON序列化，视图可以直接jsonify
+模型对象或模型对象列表。
+"""
+import datetime
+import keyword
+import threading
+
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import fields as ma_fields
+from sqlalchemy import inspect as sa_inspect
+
+# 直接读取属性即可序列化的marshmallow字段类型
+_PLAIN_FIELDS = (ma_fields.String, ma_fields.Integer, ma_fields.Boolean, ma_fields.Float)
+# 按ISO 8601格式序列化的字段类型
+_ISO_FIELDS = (ma_fields.DateTime, ma_fields.Date, ma_fields.Time)
+
+# 模型类或 (模式类, only, exclude, load_only) -> 编译后的dump函数
+_dumpers = {}
+_dumpers_lock = threading.Lock()
+
+def _build_function(name, entries, namespace):
+    """
+    根据字段描述生成dump函数源码并编译
+    
+    生成的函数优先直接读取实例的 __dict__（SQLAlchemy已加载的列值就在其中，
+    可以绕过属性描述符），缺少某个键（例如属性已过期或是property）时回退到
+    普通属性访问。
+    
+    Args:
+        name (str): 函数名
+        entries (list): (输出键, 属性名, 类型) 列表，类型为 'plain'、'iso' 或marshmallow字段
+        namespace (dict): 生成代码可引用的外部对象
+    
+    Returns:
+        function: dump(obj) -> dict
+    """
+    fast_items = []
+    slow_items = []
+    for index, (key, attr, kind) in enumerate(entries):
+        if attr.isidentifier() and not keyword.iskeyword(attr):
+            slow = f'obj.{attr}'
+        else:
+            slow = f'getattr(obj, {attr!r})'
+        fast = f'd[{attr!r}]'
+        if kind == 'plain':
+            fast_items.append(f'{key!r}: {fast}')
+            slow_items.append(f'{key!r}: {slow}')
+        elif kind == 'iso':
+            fast_items.append(f'{key!r}: None if (v{index} := {fast}) is None else v{index}.isoformat()')
+            slow_items.append(f'{key!r}: None if (v{index} := {slow}) is None else v{index}.isoformat()')
+        else:
+            namespace[f'_field_{index}'] = kind
+            item = f'{key!r}: _field_{index}.serialize({attr!r}, obj)'
+            fast_items.append(item)
+            slow_items.append(item)
+    source = '\n'.join([
+        f'def {name}(obj):',
+        '    try:',
+        '        d = obj.__dict__',
+        '        return {' + ', '.join(fast_items) + '}',
+        '    except (AttributeError, KeyError):',
+        '        return {' + ', '.join(slow_items) + '}'
+    ])
+    exec(compile(source, f'<dumper {name}>', 'exec'), namespace)
+    return namespace[name]
+
+def compile_model_dumper(model_class, field_names=None):
+    """
+    为SQLAlchemy模型编译dump函数
+    
+    Args:
+        model_class: 模型类
+        field_names (list, optional): 输出字段，默认使用模型的 __json_fields__，
+            未声明时使用全部列
+    
+    Returns:
+        function: dump(obj) -> dict
+    """
+    columns = {column.key: column for column in sa_inspect(model_class).column_attrs}
+    if field_names is None:
+        field_names = getattr(model_class, '__json_fields__', None) or list(columns.keys())
+    
+    entries = []
+    for field_name in field_names:
+        column = columns[field_name].columns[0]
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            python_type = None
+        kind = 'iso' if python_type in (datetime.datetime, datetime.date, datetime.time) else 'plain'
+        entries.append((field_name, field_name, kind))
+    return _build_function(f'dump_{model_class.__name__}', entries, {})
+
+def compile_schema_dumper(schema):
+    """
+    为marshmallow模式编译dump函数，输出与 schema.dump(obj) 一致
+    
+    简单字段直接读取属性，日期时间字段使用isoformat，其余字段回退到字段自身的serialize。
+    
+    Args:
+        schema: marshmallow模式实例
+    
+    Returns:
+        function: dump(obj) -> dict
+    """
+    entries = []
+    for name, field in schema.dump_fields.items():
+        key = field.data_key or name
+        attr = field.attribute or name
+        if '.' in attr:
+            # 点号路径等嵌套属性交给字段自身处理
+            kind = field
+        elif isinstance(field, _ISO_FIELDS) and getattr(field, 'format', None) in (None, 'iso'):
+            kind = 'iso'
+        elif type(field) in _PLAIN_FIELDS:
+            kind = 'plain'
+        else:
+            kind = field
+        entries.append((key, attr, kind))
+    return _build_function(f'dump_{type(schema).__name__}', entries, {})
+
+def get_model_dumper(model_class):
+    """
+    获取模型类的dump函数，首次调用时编译并缓存
+    
+    Args:
+        model_class: 模型类
+    
+    Returns:
+        function: dump(obj) -> dict
+    """
+    dumper = _dumpers.get(model_class)
+    if dumper is None:
+        with _dumpers_lock:
+            dumper = _dumpers.get(model_class)
+            if dumper is None:
+                dumper = _dumpers[model_class] = compile_model_dumper(model_class)
+    return dumper
+
+def get_schema_dumper(schema):
+    """
+    获取marshmallow模式的dump函数，同一模式类和相同的 only/exclude/load_only 选项只编译一次
+    
+    回退到字段自身serialize的字段绑定在首次编译时的模式实例上。
+    
+    Args:
+        schema: marshmallow模式实例
+    
+    Returns:
+        function: dump(obj) -> dict
+    """
+    key = (
+        type(schema),
+        None if schema.only is None else frozenset(schema.only),
+        frozenset(schema.exclude),
+        frozenset(schema.load_only)
+    )
+    dumper = _dumpers.get(key)
+    if dumper is None:
+        with _dumpers_lock:
+            dumper = _dumpers.get(key)
+            if dumper is None:
+                dumper = _dumpers[key] = compile_schema_dumper(schema)
+    return dumper
+
+def dump_many(objects):
+    """
+    使用编译后的dump函数序列化模型对象列表
+    
+    Args:
+        objects (list): 同一模型类的对象列表
+    
+    Returns:
+        list: 字典列表
+    """
+    if not objects:
+        return []
+    dumper = get_model_dumper(type(objects[0]))
+    return [dumper(obj) for obj in objects]
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    支持直接序列化模型对象的JSON Provider
+    """
+    
+    def default(self, o):
+        """序列化模型对象，其他类型交给默认实现"""
+        if hasattr(type(o), '__mapper__'):
+            return get_model_dumper(type(o))(o)
+        return DefaultJSONProvider.default(o)
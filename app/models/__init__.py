@@ -2,4 +2,6 @@
 数据模型模块，包含所有数据库模型
 """
 
-from .user_model import User 
\ No newline at end of file
+from .user_model import User
+from .agent_job_model import AgentJob
+from .revoked_token_model import RevokedToken
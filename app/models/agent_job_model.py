@@ -0,0 +1,54 @@
+"""
+Agent异步任务模型
+"""
+import uuid
+from datetime import datetime
+from app.core.extensions import db
+
+class AgentJob(db.Model):
+    """Agent异步任务模型"""
+    __tablename__ = 'agent_jobs'
+    
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    
+    # 序列化输出的字段
+    __json_fields__ = ('id', 'agent_type', 'status', 'result', 'error', 'created_at', 'started_at', 'finished_at')
+    
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    owner = db.Column(db.String(128), index=True)
+    agent_type = db.Column(db.String(64), nullable=False)
+    config = db.Column(db.JSON)
+    input = db.Column(db.JSON)
+    status = db.Column(db.String(16), nullable=False, default=STATUS_QUEUED, index=True)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    # 执行该任务的主机与进程，用于识别工作进程重启后遗留的任务
+    worker_host = db.Column(db.String(255))
+    worker_pid = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    @property
+    def is_finished(self):
+        """任务是否已结束"""
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
+        
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'agent_type': self.agent_type,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        
+    def __repr__(self):
+        return f'<AgentJob {self.id} {self.status}>'
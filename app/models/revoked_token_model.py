@@ -0,0 +1,20 @@
+"""
+已吊销令牌模型
+"""
+from datetime import datetime
+from app.core.extensions import db
+
+class RevokedToken(db.Model):
+    """已吊销令牌模型"""
+    __tablename__ = 'revoked_tokens'
+    
+    # 自增ID用于各工作进程增量同步吊销列表
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), unique=True, index=True, nullable=False)
+    token_type = db.Column(db.String(16))
+    identity = db.Column(db.String(128))
+    expires_at = db.Column(db.DateTime, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
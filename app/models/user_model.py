@@ -2,12 +2,20 @@
 用户模型
 """
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from app.core.extensions import db
+from app.core.passwords import password_hasher
 
 class User(db.Model):
     """用户模型"""
     __tablename__ = 'users'
+    # 列表接口按 (created_at, id) 做键集分页，按is_active过滤时使用第二个索引
+    __table_args__ = (
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+        db.Index('ix_users_is_active_created_at_id', 'is_active', 'created_at', 'id'),
+    )
+    
+    # 序列化输出的字段，不包含password_hash
+    __json_fields__ = ('id', 'username', 'email', 'is_active', 'created_at', 'updated_at')
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, index=True, nullable=False)
@@ -23,12 +31,16 @@ class User(db.Model):
         self.set_password(password)
     
     def set_password(self, password):
-        """设置密码"""
-        self.password_hash = generate_password_hash(password)
+        """设置密码（在密码哈希执行器中计算）"""
+        self.password_hash = password_hasher.hash(password)
         
     def check_password(self, password):
-        """验证密码"""
-        return check_password_hash(self.password_hash, password)
+        """验证密码（在密码哈希执行器中计算）"""
+        return password_hasher.verify(self.password_hash, password)
+        
+    def password_needs_rehash(self):
+        """密码哈希是否使用了过时的参数"""
+        return password_hasher.needs_rehash(self.password_hash)
         
     def to_dict(self):
         """转换为字典"""
@@ -27,7 +27,4 @@ class UserSchema(ma.SQLAlchemySchema):
     )
     is_active = ma.auto_field(dump_only=True)
     created_at = ma.auto_field(dump_only=True)
-    updated_at = ma.auto_field(dump_only=True)
-    
-    # 用于创建用户的模式
-    user_create = ma.auto_field(exclude=("id", "created_at", "updated_at")) 
\ No newline at end of file
+    updated_at = ma.auto_field(dump_only=True)
\ No newline at end of file
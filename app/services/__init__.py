@@ -2,4 +2,7 @@
 服务模块，包含业务逻辑处理
 """
 
-from .user_service import UserService 
\ No newline at end of file
+from .user_service import UserService
+from .agent_job_service import AgentJobService, job_runner
+
+from .user_cache import user_cache
\ No newline at end of file
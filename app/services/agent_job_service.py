@@ -0,0 +1,198 @@
+"""
+Agent异步任务服务
+"""
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from app.models.agent_job_model import AgentJob
+from app.core.extensions import db
+from app.core.errors import APIError, NotFoundError, ServiceUnavailableError
+from app.utils.process import is_process_alive
+
+class JobRunner:
+    """
+    每个工作进程内的有界任务执行器
+    
+    同时运行的任务数不超过max_workers，排队任务数不超过queue_size，
+    超出时立即拒绝而不是无限堆积。
+    """
+    
+    def __init__(self):
+        self.app = None
+        self.max_workers = 2
+        self.queue_size = 16
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        """
+        绑定应用并读取配置
+        
+        Args:
+            app: Flask应用实例
+        """
+        self.app = app
+        self.max_workers = app.config.get('AGENT_JOB_WORKERS', 2)
+        self.queue_size = app.config.get('AGENT_JOB_QUEUE_SIZE', 16)
+    
+    def _ensure_executor(self):
+        """首次提交时创建线程池，避免在gunicorn fork之前启动线程"""
+        with self._lock:
+            if self._executor is None:
+                self._slots = threading.BoundedSemaphore(self.max_workers + self.queue_size)
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='agent-job'
+                )
+            return self._executor
+    
+    def try_reserve(self):
+        """
+        尝试占用一个排队名额
+        
+        Returns:
+            bool: 成功占用返回True，队列已满返回False
+        """
+        self._ensure_executor()
+        return self._slots.acquire(blocking=False)
+    
+    def release(self):
+        """释放一个排队名额"""
+        self._slots.release()
+    
+    def submit(self, job_id):
+        """
+        提交已占用名额的任务
+        
+        Args:
+            job_id (str): 任务ID
+        """
+        self._ensure_executor().submit(self._run, job_id)
+    
+    def _run(self, job_id):
+        """在工作线程中执行任务并持久化结果"""
+        from app.agents import acquire_agent
+        
+        try:
+            with self.app.app_context():
+                job = db.session.get(AgentJob, job_id)
+                if job is None or job.status != AgentJob.STATUS_QUEUED:
+                    return
+                job.status = AgentJob.STATUS_RUNNING
+                job.started_at = datetime.utcnow()
+                db.session.commit()
+                
+                try:
+                    with acquire_agent(job.agent_type, job.config) as agent:
+                        result = agent.process(job.input)
+                    job.result = result
+                    job.status = AgentJob.STATUS_SUCCEEDED
+                except Exception as e:
+                    self.app.logger.exception('Agent任务执行失败: %s', job_id)
+                    # 错误信息会通过任务查询接口返回，非预期异常不暴露内部细节
+                    job.error = e.message if isinstance(e, APIError) else '服务器内部错误'
+                    job.status = AgentJob.STATUS_FAILED
+                job.finished_at = datetime.utcnow()
+                
+                try:
+                    db.session.commit()
+                except Exception:
+                    # 结果无法持久化（例如不可JSON序列化）时记录为失败
+                    self.app.logger.exception('保存Agent任务结果失败: %s', job_id)
+                    db.session.rollback()
+                    job = db.session.get(AgentJob, job_id)
+                    job.result = None
+                    job.error = '保存任务结果失败'
+                    job.status = AgentJob.STATUS_FAILED
+                    db.session.commit()
+                finally:
+                    db.session.remove()
+        finally:
+            self.release()
+
+# 当前工作进程的任务执行器
+job_runner = JobRunner()
+
+def _is_worker_alive(job):
+    """判断任务所属的工作进程是否仍然存活（仅能判断本机进程）"""
+    if job.worker_host != socket.gethostname() or not job.worker_pid:
+        return True
+    return is_process_alive(job.worker_pid)
+
+class AgentJobService:
+    """Agent异步任务服务类"""
+    
+    @staticmethod
+    def submit_job(agent_type, config, input_data, owner=None):
+        """
+        创建并排队一个Agent任务
+        
+        Args:
+            agent_type: Agent类型
+            config: Agent配置
+            input_data: 输入数据
+            owner: 任务所属用户
+        
+        Returns:
+            AgentJob: 已排队的任务
+        
+        Raises:
+            ValidationError: 无效的Agent类型
+            ServiceUnavailableError: 任务队列已满
+        """
+        from app.agents.agent_factory import validate_agent_type
+        
+        validate_agent_type(agent_type)
+        
+        if not job_runner.try_reserve():
+            raise ServiceUnavailableError(
+                "任务队列已满，请稍后重试",
+                headers={'Retry-After': str(job_runner.app.config.get('AGENT_JOB_RETRY_AFTER', 5))}
+            )
+        
+        try:
+            job = AgentJob(
+                owner=owner,
+                agent_type=agent_type,
+                config=config or {},
+                input=input_data,
+                worker_host=socket.gethostname(),
+                worker_pid=os.getpid()
+            )
+            db.session.add(job)
+            db.session.commit()
+            job_runner.submit(job.id)
+            return job
+        except Exception:
+            db.session.rollback()
+            job_runner.release()
+            raise
+    
+    @staticmethod
+    def get_job(job_id, owner=None):
+        """
+        获取任务状态，所属工作进程已退出的未完成任务会被标记为失败
+        
+        Args:
+            job_id: 任务ID
+            owner: 任务所属用户，不匹配时视为不存在
+        
+        Returns:
+            AgentJob: 任务对象
+        
+        Raises:
+            NotFoundError: 任务不存在
+        """
+        job = db.session.get(AgentJob, job_id)
+        if not job or (owner is not None and job.owner != owner):
+            raise NotFoundError(f"任务 {job_id} 不存在")
+        
+        if not job.is_finished and not _is_worker_alive(job):
+            job.status = AgentJob.STATUS_FAILED
+            job.error = '执行任务的工作进程已退出，任务被中断'
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+        return job
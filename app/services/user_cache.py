@@ -0,0 +1,299 @@
+"""
+用户读穿缓存
+
+在 UserService 的按ID、用户名、邮箱查询前面加一层每个工作进程独享的LRU缓存。
+缓存的是整行列值而不是ORM对象，命中时重建为已持久化的User实例并合并进当前会话，
+不发出SQL。未知的用户名、邮箱和ID也会被缓存（负缓存），避免重复查询不存在的用户。
+
+跨工作进程失效：写操作提交后把失效键追加到本机共享存储（LocalStore）的失效日志中，
+各工作进程在查询缓存前按 USER_CACHE_SYNC_INTERVAL 增量读取日志并删除对应条目，
+因此在一个工作进程中修改的用户不会被其他工作进程以旧值返回。
+
+只读副本：查询可能路由到尚未同步最新写入的副本，失效后的 replica_lag 秒内读到的
+用户只返回不缓存，避免把副本上的旧值重新写入缓存并保留到TTL过期。
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.extensions import db
+from app.core.local_store import LocalStore, local_store_path
+from app.models.user_model import User
+
+_INVALIDATION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_cache_invalidations (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+# 可作为缓存键的查询字段
+LOOKUP_FIELDS = ('id', 'username', 'email')
+
+# 失效全部条目的特殊字段
+ALL = '*'
+
+class UserCache:
+    """
+    带负缓存和跨进程失效的用户缓存
+    """
+    
+    def __init__(self, max_entries=10000, ttl=60.0, sync_interval=0.0):
+        """
+        初始化缓存
+        
+        Args:
+            max_entries (int): 最多缓存的条目数（用户行与用户名/邮箱别名分别计数）
+            ttl (float): 条目过期秒数
+            sync_interval (float): 读取跨进程失效日志的最小间隔（秒），0表示每次查询前都读取
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self.replica_lag = 0.0
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._columns = None
+        self._store = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._last_seq = 0
+        self._last_sync = 0.0
+        self._writes = 0
+        # 复制延迟窗口内失效过的键 -> 失效时间，按时间顺序排列
+        self._invalidated = OrderedDict()
+        self._invalidated_all = float('-inf')
+    
+    def init_app(self, app):
+        """
+        根据应用配置初始化缓存
+        
+        Args:
+            app: Flask应用实例
+        """
+        self.enabled = app.config.get('USER_CACHE_ENABLED', True)
+        self.max_entries = app.config.get('USER_CACHE_MAX_ENTRIES', 10000)
+        self.ttl = app.config.get('USER_CACHE_TTL', 60.0)
+        self.sync_interval = app.config.get('USER_CACHE_SYNC_INTERVAL', 0.0)
+        # 未配置副本时读取都走主库，不需要延迟窗口
+        self.replica_lag = app.config.get('USER_CACHE_REPLICA_LAG', 5.0) if app.config.get('SQLALCHEMY_READ_REPLICAS') else 0.0
+        self._store = None
+        if self.enabled:
+            self._store = LocalStore(local_store_path(app, 'user_cache.db'), _INVALIDATION_SCHEMA)
+            # 只关心启动之后的失效记录
+            row = self._store.connect().execute('SELECT MAX(seq) FROM user_cache_invalidations').fetchone()
+            self._last_seq = row[0] or 0
+        self.clear()
+    
+    def clear(self):
+        """清空当前进程的缓存条目"""
+        with self._lock:
+            self._entries.clear()
+            self._invalidated.clear()
+            self._invalidated_all = float('-inf')
+            self._generation += 1
+            self.hits = 0
+            self.misses = 0
+    
+    def get_or_load(self, field, value, loader):
+        """
+        读穿查询：命中时返回缓存的用户，未命中时调用loader查询数据库并缓存结果
+        
+        Args:
+            field (str): 查询字段，'id'、'username' 或 'email'
+            value: 字段值
+            loader (callable): 无参函数，返回User或None
+        
+        Returns:
+            User: 用户对象，不存在时返回None
+        """
+        if not self.enabled or value is None:
+            return loader()
+        self.sync()
+        
+        key = (field, str(value))
+        hit, values = self._lookup(key)
+        if hit:
+            return self._to_user(values) if values is not None else None
+        
+        generation = self._generation
+        user = loader()
+        self._remember(key, user, generation)
+        return user
+    
+    def _lookup(self, key):
+        """查询缓存条目，返回 (是否命中, 列值字典或None)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            target = entry[0]
+            if key[0] == 'id' or target is None:
+                self.hits += 1
+                return True, target
+            
+            # 用户名/邮箱别名指向用户ID，再读取用户行；行已失效或字段已变化时视为未命中
+            row = self._entries.get(('id', target))
+            if row is None or row[1] <= now or row[0] is None or str(row[0][key[0]]) != key[1]:
+                del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(('id', target))
+            self.hits += 1
+            return True, row[0]
+    
+    def _remember(self, key, user, generation):
+        """
+        缓存查询结果；查询期间有失效发生，或结果可能来自尚未同步失效前写入的副本时
+        放弃写入，避免缓存旧值
+        """
+        values = None
+        if user is not None:
+            if self._columns is None:
+                self._columns = [attr.key for attr in sa_inspect(User).column_attrs]
+            values = {name: getattr(user, name) for name in self._columns}
+        now = time.monotonic()
+        expires_at = now + self.ttl
+        
+        with self._lock:
+            if generation != self._generation:
+                return
+            if self.replica_lag > 0:
+                since = now - self.replica_lag
+                keys = [key] if values is None else [key, ('id', str(values['id']))]
+                if self._invalidated_all > since or any(self._invalidated.get(k, since) > since for k in keys):
+                    return
+            if values is None:
+                self._entries[key] = (None, expires_at)
+                self._entries.move_to_end(key)
+            else:
+                user_id = str(values['id'])
+                self._entries[('id', user_id)] = (values, expires_at)
+                self._entries.move_to_end(('id', user_id))
+                for field in ('username', 'email'):
+                    alias = (field, str(values[field]))
+                    self._entries[alias] = (user_id, expires_at)
+                    self._entries.move_to_end(alias)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    @staticmethod
+    def _to_user(values):
+        """把缓存的列值重建为已持久化的User并合并进当前会话，不发出SQL"""
+        user = User.__mapper__.class_manager.new_instance()
+        for name, value in values.items():
+            set_committed_value(user, name, value)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+    
+    def invalidate(self, *keys):
+        """
+        使条目失效并通知本机其他工作进程，应在写操作提交之后调用
+        
+        Args:
+            *keys: (字段, 值) 元组；字段为 'id'、'username'、'email'，或 '*' 表示全部
+        """
+        if not self.enabled:
+            return
+        keys = [(field, str(value)) for field, value in keys if value is not None]
+        if not keys:
+            return
+        self._apply(keys)
+        
+        now = time.time()
+        with self._store.transaction() as conn:
+            conn.executemany(
+                'INSERT INTO user_cache_invalidations (field, value, created_at) VALUES (?, ?, ?)',
+                [(field, value, now) for field, value in keys]
+            )
+            # 早于TTL的失效记录对应的条目已自然过期，定期清理
+            self._writes += 1
+            if self._writes % 256 == 0:
+                conn.execute(
+                    'DELETE FROM user_cache_invalidations WHERE created_at < ?',
+                    (now - self.ttl * 2 - self.sync_interval,)
+                )
+    
+    def sync(self, force=False):
+        """
+        读取其他工作进程写入的失效记录
+        
+        Args:
+            force (bool): 忽略同步间隔立即读取
+        """
+        now = time.monotonic()
+        if self._store is None or (not force and now - self._last_sync < self.sync_interval):
+            return
+        self._last_sync = now
+        rows = self._store.connect().execute(
+            'SELECT seq, field, value FROM user_cache_invalidations WHERE seq > ? ORDER BY seq',
+            (self._last_seq,)
+        ).fetchall()
+        if not rows:
+            return
+        # 本进程写入的记录已在invalidate中应用，重复应用无副作用
+        self._apply([(field, value) for _, field, value in rows])
+        self._last_seq = max(self._last_seq, rows[-1][0])
+    
+    def _apply(self, keys):
+        """删除条目；用户行失效时一并删除指向它的别名"""
+        with self._lock:
+            self._generation += 1
+            if self.replica_lag > 0:
+                self._track_invalidated(keys)
+            for key in keys:
+                if key[0] == ALL:
+                    self._entries.clear()
+                    return
+                entry = self._entries.pop(key, None)
+                if key[0] == 'id' and entry is not None and entry[0] is not None:
+                    for field in ('username', 'email'):
+                        alias = (field, str(entry[0][field]))
+                        if self._entries.get(alias, (None,))[0] == key[1]:
+                            del self._entries[alias]
+    
+    def _track_invalidated(self, keys):
+        """记录失效时间并清理超出复制延迟窗口的记录，调用方持有锁"""
+        now = time.monotonic()
+        for key in keys:
+            if key[0] == ALL:
+                self._invalidated_all = now
+            else:
+                self._invalidated[key] = now
+                self._invalidated.move_to_end(key)
+        since = now - self.replica_lag
+        while self._invalidated and next(iter(self._invalidated.values())) <= since:
+            self._invalidated.popitem(last=False)
+
+def user_keys(*users):
+    """
+    生成用户的全部失效键
+    
+    Args:
+        *users: User对象或包含id/username/email的字典
+    
+    Returns:
+        list: (字段, 值) 元组列表
+    """
+    keys = []
+    for user in users:
+        for field in LOOKUP_FIELDS:
+            value = user.get(field) if isinstance(user, dict) else getattr(user, field, None)
+            keys.append((field, value))
+    return keys
+
+# 当前工作进程的用户缓存
+user_cache = UserCache()
@@ -1,14 +1,36 @@
 """
 用户服务
 """
+import base64
+import json
+import re
+import sys
+from datetime import datetime
+from sqlalchemy import and_, delete, func, insert, or_, select, text, update
+from sqlalchemy.exc import IntegrityError
 from app.models.user_model import User
-from app.core.extensions import db
+from app.core.extensions import db, use_replica
 from app.core.errors import ValidationError, NotFoundError, ServerError
+from app.core.passwords import password_hasher
+from app.services.user_cache import ALL, user_cache, user_keys
+
+# 批量导入校验规则，与UserSchema保持一致
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+# 批量导入时is_active可接受的取值
+IMPORT_BOOLEANS = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}
+
+# 导出的列
+EXPORT_COLUMNS = ('id', 'username', 'email', 'is_active', 'created_at', 'updated_at')
+
+# 列表接口可投影的列
+LIST_FIELDS = EXPORT_COLUMNS
 
 class UserService:
     """用户服务类"""
     
     @staticmethod
+    @use_replica()
     def get_user_by_id(user_id):
         """
         通过ID获取用户
@@ -22,12 +44,13 @@ class UserService:
         Raises:
             NotFoundError: 用户不存在
         """
-        user = User.query.get(user_id)
+        user = user_cache.get_or_load('id', user_id, lambda: User.query.get(user_id))
         if not user:
             raise NotFoundError(f"用户ID {user_id} 不存在")
         return user
     
     @staticmethod
+    @use_replica()
     def get_user_by_username(username):
         """
         通过用户名获取用户
@@ -38,9 +61,12 @@ class UserService:
         Returns:
             User: 用户对象，如果不存在则返回None
         """
-        return User.query.filter_by(username=username).first()
+        return user_cache.get_or_load(
+            'username', username, lambda: User.query.filter_by(username=username).first()
+        )
     
     @staticmethod
+    @use_replica()
     def get_user_by_email(email):
         """
         通过邮箱获取用户
@@ -51,13 +77,38 @@ class UserService:
         Returns:
             User: 用户对象，如果不存在则返回None
         """
-        return User.query.filter_by(email=email).first()
+        return user_cache.get_or_load(
+            'email', email, lambda: User.query.filter_by(email=email).first()
+        )
+    
+    @staticmethod
+    def _raise_integrity_error(error):
+        """
+        把唯一约束冲突转换为与原有检查一致的ValidationError
+            
+        各数据库在错误信息中都会带上冲突的列名或索引名（ix_users_username等），
+        据此判断是用户名还是邮箱冲突；只匹配列名标记，避免被错误信息中的字段值误导。
+            
+        Args:
+            error (IntegrityError): 数据库抛出的约束错误
+        
+        Raises:
+            ValidationError: 用户名或邮箱已存在
+        """
+        message = str(getattr(error, 'orig', error)).lower()
+        for column, error_message in (('email', "邮箱已存在"), ('username', "用户名已存在")):
+            # SQLite: users.email；PostgreSQL: (email)=...；MySQL/索引名: ix_users_email
+            if any(token in message for token in (f'users.{column}', f'({column})', f'ix_users_{column}')):
+                raise ValidationError(error_message)
+        raise ValidationError("用户名或邮箱已存在")
     
     @staticmethod
     def create_user(username, email, password):
         """
         创建新用户
         
+        直接插入并依赖用户名和邮箱的唯一索引判断冲突，只需一次数据库往返。
+        
         Args:
             username: 用户名
             email: 邮箱
@@ -70,28 +121,31 @@ class UserService:
             ValidationError: 用户名或邮箱已存在
             ServerError: 创建用户失败
         """
-        # 检查用户名是否已存在
-        if UserService.get_user_by_username(username):
-            raise ValidationError("用户名已存在")
-            
-        # 检查邮箱是否已存在
-        if UserService.get_user_by_email(email):
-            raise ValidationError("邮箱已存在")
-            
         try:
             # 创建新用户
             user = User(username=username, email=email, password=password)
             db.session.add(user)
+            db.session.flush()
+            user_id = user.id
             db.session.commit()
-            return user
+        except IntegrityError as e:
+            db.session.rollback()
+            UserService._raise_integrity_error(e)
         except Exception as e:
             db.session.rollback()
             raise ServerError(f"创建用户失败: {str(e)}")
+            
+        # 清除该用户名/邮箱/ID的负缓存
+        user_cache.invalidate(*user_keys({'id': user_id, 'username': username, 'email': email}))
+        return user
     
     @staticmethod
     def update_user(user_id, **kwargs):
         """
         更新用户信息
+            
+        使用单条 UPDATE ... RETURNING 语句更新并取回整行，不预先加载用户；
+        数据库不支持RETURNING时退化为UPDATE后按主键查询。
         
         Args:
             user_id: 用户ID
@@ -102,33 +156,50 @@ class UserService:
             
         Raises:
             NotFoundError: 用户不存在
-            ValidationError: 无效的更新字段
+            ValidationError: 用户名或邮箱已存在
             ServerError: 更新用户失败
         """
-        user = UserService.get_user_by_id(user_id)
+        # 只更新允许的字段，忽略其他字段
+        values = {key: value for key, value in kwargs.items() if key in ('username', 'email', 'is_active')}
+        if 'password' in kwargs:
+            values['password_hash'] = password_hasher.hash(kwargs['password'])
+        if not values:
+            return UserService.get_user_by_id(user_id)
         
+        statement = update(User).where(User.id == user_id).values(**values)
         try:
-            # 更新允许的字段
-            for key, value in kwargs.items():
-                if key == 'password':
-                    user.set_password(value)
-                elif key in ['username', 'email', 'is_active']:
-                    setattr(user, key, value)
-                else:
-                    # 忽略不允许更新的字段
-                    pass
-                    
+            if db.engine.dialect.update_returning:
+                user = db.session.execute(
+                    statement.returning(User),
+                    execution_options={'synchronize_session': False, 'populate_existing': True}
+                ).scalar_one_or_none()
+                found = user is not None
+            else:
+                found = db.session.execute(
+                    statement, execution_options={'synchronize_session': 'evaluate'}
+                ).rowcount > 0
+                user = None
             db.session.commit()
-            return user
+        except IntegrityError as e:
+            db.session.rollback()
+            UserService._raise_integrity_error(e)
         except Exception as e:
             db.session.rollback()
             raise ServerError(f"更新用户失败: {str(e)}")
+        
+        if not found:
+            raise NotFoundError(f"用户ID {user_id} 不存在")
+        # 旧用户名/邮箱的别名随用户行一起失效，新用户名/邮箱可能存在负缓存
+        user_cache.invalidate(('id', user_id), ('username', values.get('username')), ('email', values.get('email')))
+        return user if user is not None else UserService.get_user_by_id(user_id)
     
     @staticmethod
     def delete_user(user_id):
         """
         删除用户
         
+        使用单条DELETE语句按主键删除，根据影响行数判断用户是否存在。
+        
         Args:
             user_id: 用户ID
             
@@ -139,15 +210,20 @@ class UserService:
             NotFoundError: 用户不存在
             ServerError: 删除用户失败
         """
-        user = UserService.get_user_by_id(user_id)
-        
         try:
-            db.session.delete(user)
+            result = db.session.execute(
+                delete(User).where(User.id == user_id),
+                execution_options={'synchronize_session': 'evaluate'}
+            )
             db.session.commit()
-            return True
         except Exception as e:
             db.session.rollback()
             raise ServerError(f"删除用户失败: {str(e)}")
+        
+        if result.rowcount == 0:
+            raise NotFoundError(f"用户ID {user_id} 不存在")
+        user_cache.invalidate(('id', user_id))
+        return True
     
     @staticmethod
     def authenticate(username, password):
@@ -163,5 +239,342 @@ class UserService:
         """
         user = UserService.get_user_by_username(username)
         if user and user.check_password(password) and user.is_active:
+            # 使用旧参数存储的密码在登录成功时透明地重新哈希
+            if user.password_needs_rehash():
+                try:
+                    user_id = user.id
+                    user.set_password(password)
+                    db.session.commit()
+                    user_cache.invalidate(('id', user_id))
+                except Exception:
+                    db.session.rollback()
             return user
-        return None 
\ No newline at end of file
+        return None     
+    
+    @staticmethod
+    def _validate_import_record(record):
+        """
+        校验单条导入记录
+        
+        Returns:
+            str: 错误信息，合法时返回None
+        """
+        if not isinstance(record, dict):
+            return "记录格式无效"
+        username = record.get('username')
+        email = record.get('email')
+        password = record.get('password')
+        if not isinstance(username, str) or not 3 <= len(username) <= 64:
+            return "用户名长度必须在3到64之间"
+        if not isinstance(email, str) or len(email) > 120 or not EMAIL_PATTERN.match(email):
+            return "邮箱格式无效"
+        if not isinstance(password, str) or len(password) < 6:
+            return "密码长度不能少于6位"
+        if UserService._parse_is_active(record.get('is_active')) is None:
+            return "is_active必须是true或false"
+        return None
+    
+    @staticmethod
+    def _parse_is_active(value):
+        """
+        解析导入记录的is_active，未提供时默认启用
+        
+        Args:
+            value: 布尔值，或true/false等字符串
+        
+        Returns:
+            bool: 解析结果，无法识别时返回None
+        """
+        if value is None:
+            return True
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str):
+            return IMPORT_BOOLEANS.get(value.strip().lower())
+        return None
+    
+    @staticmethod
+    def _import_chunk(chunk, seen_usernames, seen_emails, skipped):
+        """
+        导入一批记录：集合查询已存在的用户名和邮箱，并行哈希密码，多行插入后提交
+        
+        Args:
+            chunk (list): (行号, 记录) 列表
+            seen_usernames (set): 本次导入中已接受的用户名，提交成功后原地更新
+            seen_emails (set): 本次导入中已接受的邮箱，提交成功后原地更新
+            skipped (list): 跳过的记录，提交成功后原地追加
+        
+        Returns:
+            int: 插入的用户数
+        """
+        usernames = [record['username'] for _, record in chunk]
+        emails = [record['email'] for _, record in chunk]
+        taken_usernames = seen_usernames | set(db.session.scalars(
+            select(User.username).where(User.username.in_(usernames))
+        ))
+        taken_emails = seen_emails | set(db.session.scalars(
+            select(User.email).where(User.email.in_(emails))
+        ))
+        
+        accepted = []
+        chunk_skipped = []
+        for row, record in chunk:
+            username, email = record['username'], record['email']
+            if username in taken_usernames:
+                chunk_skipped.append({'row': row, 'username': username, 'message': "用户名已存在"})
+            elif email in taken_emails:
+                chunk_skipped.append({'row': row, 'username': username, 'message': "邮箱已存在"})
+            else:
+                taken_usernames.add(username)
+                taken_emails.add(email)
+                accepted.append(record)
+        
+        if accepted:
+            password_hashes = password_hasher.hash_many([record['password'] for record in accepted])
+            rows = [{
+                'username': record['username'],
+                'email': record['email'],
+                'password_hash': password_hash,
+                'is_active': UserService._parse_is_active(record.get('is_active'))
+            } for record, password_hash in zip(accepted, password_hashes)]
+            db.session.execute(insert(User), rows)
+            db.session.commit()
+        
+        seen_usernames.update(record['username'] for record in accepted)
+        seen_emails.update(record['email'] for record in accepted)
+        skipped.extend(chunk_skipped)
+        return len(accepted)
+    
+    @staticmethod
+    def bulk_import_users(records, batch_size=1000):
+        """
+        批量导入用户
+        
+        每批记录只做两次集合查询检查唯一性，密码在哈希执行器中并行计算，
+        使用多行INSERT写入并按批提交。重复或不合法的记录被跳过并在结果中报告。
+        
+        Args:
+            records: 可迭代的用户记录（dict，包含username、email、password，可选is_active）
+            batch_size (int): 每批处理的记录数
+        
+        Returns:
+            dict: 导入结果，包含total、created和skipped明细
+        
+        Raises:
+            ServerError: 导入失败（已提交的批次不会回滚）
+        """
+        total = 0
+        created = 0
+        skipped = []
+        seen_usernames = set()
+        seen_emails = set()
+        chunk = []
+        
+        def flush(chunk):
+            try:
+                return UserService._import_chunk(chunk, seen_usernames, seen_emails, skipped)
+            except IntegrityError:
+                # 与并发写入冲突时回滚本批，重新检查唯一性后再导入一次
+                db.session.rollback()
+                return UserService._import_chunk(chunk, seen_usernames, seen_emails, skipped)
+        
+        try:
+            for row, record in enumerate(records, start=1):
+                total += 1
+                error = UserService._validate_import_record(record)
+                if error:
+                    username = record.get('username') if isinstance(record, dict) else None
+                    skipped.append({'row': row, 'username': username, 'message': error})
+                    continue
+                chunk.append((row, record))
+                if len(chunk) >= batch_size:
+                    created += flush(chunk)
+                    chunk = []
+            if chunk:
+                created += flush(chunk)
+        except ValidationError:
+            db.session.rollback()
+            raise
+        except Exception as e:
+            db.session.rollback()
+            raise ServerError(f"批量导入用户失败（已导入{created}个）: {str(e)}")
+        finally:
+            # 新用户可能命中各工作进程中的负缓存，批量导入后整体失效
+            if created:
+                user_cache.invalidate((ALL, ALL))
+        
+        return {
+            'total': total,
+            'created': created,
+            'skipped': skipped
+        }
+    
+    @staticmethod
+    def iter_users(batch_size=1000):
+        """
+        按ID顺序逐批遍历全部用户，使用服务端游标，内存占用与用户总数无关
+        
+        Args:
+            batch_size (int): 每次从数据库获取的行数
+        
+        Yields:
+            dict: 用户数据（不包含密码哈希）
+        """
+        columns = [getattr(User, name) for name in EXPORT_COLUMNS]
+        with use_replica():
+            result = db.session.execute(
+                select(*columns)
+                .order_by(User.id)
+                .execution_options(stream_results=True, yield_per=batch_size)
+            )
+            try:
+                for row in result:
+                    yield dict(zip(EXPORT_COLUMNS, row))
+            finally:
+                result.close()
+    
+    @staticmethod
+    def _encode_cursor(created_at, user_id):
+        """把分页位置编码为不透明的游标字符串"""
+        raw = json.dumps([created_at.isoformat(), user_id], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def _decode_cursor(cursor):
+        """
+        解析游标
+        
+        Raises:
+            ValidationError: 游标无效
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            created_at, user_id = json.loads(raw)
+            return datetime.fromisoformat(created_at), int(user_id)
+        except (ValueError, TypeError):
+            raise ValidationError("无效的分页游标")
+    
+    @staticmethod
+    def _list_filters(is_active=None, username_prefix=None):
+        """构造列表过滤条件；用户名前缀转换为范围条件以便使用用户名索引"""
+        filters = []
+        if is_active is not None:
+            filters.append(User.is_active == is_active)
+        if username_prefix:
+            filters.append(User.username >= username_prefix)
+            # 上界为去掉末尾最大码位后，最后一个字符加一；全部是最大码位时只保留下界
+            stem = username_prefix.rstrip(chr(sys.maxunicode))
+            if stem:
+                code = ord(stem[-1]) + 1
+                if 0xD800 <= code <= 0xDFFF:
+                    # 跳过代理码位，它们无法编码为UTF-8
+                    code = 0xE000
+                filters.append(User.username < stem[:-1] + chr(code))
+        return filters
+    
+    @staticmethod
+    @use_replica()
+    def list_users(limit=20, cursor=None, is_active=None, username_prefix=None, fields=None):
+        """
+        按创建时间倒序分页列出用户
+        
+        使用 (created_at, id) 键集分页：每页从上一页最后一行的位置继续向后读取，
+        不使用OFFSET，翻到任意深度的代价都与第一页相同。只查询请求的列。
+        
+        Args:
+            limit (int): 每页条数
+            cursor (str, optional): 上一页返回的next_cursor
+            is_active (bool, optional): 按是否启用过滤
+            username_prefix (str, optional): 按用户名前缀过滤
+            fields (list, optional): 返回的字段，默认全部可投影字段
+        
+        Returns:
+            tuple: (用户字典列表, 下一页游标；没有下一页时为None)
+        
+        Raises:
+            ValidationError: 字段或游标无效
+        """
+        fields = list(fields or LIST_FIELDS)
+        unknown = [name for name in fields if name not in LIST_FIELDS]
+        if unknown:
+            raise ValidationError(f"不支持的字段: {', '.join(unknown)}")
+        
+        # 游标需要created_at和id，未请求时也一并查询但不返回
+        columns = list(dict.fromkeys(fields + ['created_at', 'id']))
+        statement = (
+            select(*[getattr(User, name) for name in columns])
+            .where(*UserService._list_filters(is_active, username_prefix))
+            .order_by(User.created_at.desc(), User.id.desc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            created_at, user_id = UserService._decode_cursor(cursor)
+            statement = statement.where(or_(
+                User.created_at < created_at,
+                and_(User.created_at == created_at, User.id < user_id)
+            ))
+        
+        rows = db.session.execute(statement).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]._mapping
+            next_cursor = UserService._encode_cursor(last['created_at'], last['id'])
+        
+        items = []
+        for row in rows:
+            mapping = row._mapping
+            item = {}
+            for name in fields:
+                value = mapping[name]
+                item[name] = value.isoformat() if isinstance(value, datetime) else value
+            items.append(item)
+        return items, next_cursor
+    
+    @staticmethod
+    @use_replica()
+    def count_users(is_active=None, username_prefix=None):
+        """
+        精确统计满足条件的用户数（COUNT(*)，大表上代价与行数成正比）
+        
+        Args:
+            is_active (bool, optional): 按是否启用过滤
+            username_prefix (str, optional): 按用户名前缀过滤
+        
+        Returns:
+            int: 用户数
+        """
+        return db.session.scalar(
+            select(func.count()).select_from(User)
+            .where(*UserService._list_filters(is_active, username_prefix))
+        )
+    
+    @staticmethod
+    @use_replica()
+    def estimate_user_count():
+        """
+        估算用户表总行数，不扫描全表
+        
+        PostgreSQL读取planner统计（pg_class.reltuples），MySQL读取information_schema，
+        SQLite在执行过ANALYZE时读取sqlite_stat1；都不可用时以最大ID近似（有删除时偏大）。
+        
+        Returns:
+            int: 估算的用户数
+        """
+        dialect = db.engine.dialect.name
+        query = None
+        if dialect == 'postgresql':
+            query = "SELECT reltuples::bigint FROM pg_class WHERE relname = 'users'"
+        elif dialect in ('mysql', 'mariadb'):
+            query = ("SELECT table_rows FROM information_schema.tables "
+                     "WHERE table_schema = DATABASE() AND table_name = 'users'")
+        elif dialect == 'sqlite' and db.session.scalar(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")):
+            # stat列的第一个数字是表的行数
+            query = "SELECT CAST(stat AS INTEGER) FROM sqlite_stat1 WHERE tbl = 'users' LIMIT 1"
+        if query is not None:
+            estimate = db.session.scalar(text(query))
+            if estimate is not None and estimate >= 0:
+                return int(estimate)
+        # 统计信息不可用（例如SQLite未执行过ANALYZE）时以最大ID近似
+        return db.session.scalar(select(func.max(User.id))) or 0
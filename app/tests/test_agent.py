@@ -1,8 +1,15 @@
 """
 Agent测试
 """
+import os
+import tempfile
+import time
 import unittest
+from unittest import mock
 from app.agents import get_agent
+from app.agents.agent_pool import AgentPool
+from app.agents.demo_agent import DemoAgent
+from app.agents.result_cache import ResultCache
 from app.core.errors import ValidationError
 
 class AgentTestCase(unittest.TestCase):
@@ -24,5 +31,76 @@ class AgentTestCase(unittest.TestCase):
         with self.assertRaises(ValidationError):
             get_agent('invalid_type')
             
+    def test_process_batch_isolates_errors(self):
+        """测试批量处理中单个输入失败不影响其他输入"""
+        class FlakyAgent(DemoAgent):
+            def process(self, input_data, **kwargs):
+                if input_data == 'bad':
+                    raise ValueError('bad input')
+                return super().process(input_data, **kwargs)
+                
+        results = FlakyAgent().process_batch(['a', 'bad', 'c'])
+        self.assertEqual(results[0]['output'], 'Echo: a')
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2]['output'], 'Echo: c')
+        
+    def test_agent_pool_reuse(self):
+        """测试Agent池复用相同配置的实例"""
+        pool = AgentPool(get_agent, max_size=4)
+        first = pool.checkout('demo', {'name': 'Pooled'})
+        pool.checkin(first)
+        second = pool.checkout('demo', {'name': 'Pooled'})
+        self.assertIs(first, second)
+        
+        # 借出期间的实例不会被其他请求共享
+        third = pool.checkout('demo', {'name': 'Pooled'})
+        self.assertIsNot(second, third)
+        
+        stats = pool.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['checked_out'], 2)
+        
+    def test_agent_pool_eviction(self):
+        """测试Agent池的LRU淘汰与空闲过期"""
+        pool = AgentPool(get_agent, max_size=1)
+        old = pool.checkout('demo', {'name': 'A'})
+        new = pool.checkout('demo', {'name': 'B'})
+        pool.checkin(old)
+        pool.checkin(new)
+        self.assertEqual(pool.stats()['evictions'], 1)
+        self.assertTrue(old._closed)
+        self.assertIs(pool.checkout('demo', {'name': 'B'}), new)
+        
+        pool = AgentPool(get_agent, max_size=4, idle_ttl=0.001)
+        agent = pool.checkout('demo')
+        pool.checkin(agent)
+        time.sleep(0.01)
+        self.assertIsNot(pool.checkout('demo'), agent)
+        self.assertEqual(pool.stats()['expirations'], 1)
+        
+    def test_result_cache_disk_tier_shared(self):
+        """测试磁盘层在不同缓存实例（模拟不同工作进程）之间共享"""
+        with tempfile.TemporaryDirectory() as directory:
+            app = mock.Mock()
+            app.config = {
+                'AGENT_CACHE_DISK_ENABLED': True,
+                'AGENT_CACHE_DISK_PATH': os.path.join(directory, 'cache.db'),
+                'AGENT_CACHE_TTLS': {'demo': 60}
+            }
+            writer, reader = ResultCache(), ResultCache()
+            writer.init_app(app)
+            reader.init_app(app)
+            
+            key = ResultCache.make_key('demo', {}, 'input')
+            self.assertEqual(reader.get(key), (False, None))
+            writer.set(key, {'output': 'cached'}, writer.ttl_for('demo', DemoAgent))
+            self.assertEqual(reader.get(key), (True, {'output': 'cached'}))
+            
+            writer.set(key, {'output': 'expired'}, 0.001)
+            time.sleep(0.01)
+            writer.clear_memory()
+            self.assertFalse(writer.get(key)[0])
+            
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
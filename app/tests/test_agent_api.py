@@ -0,0 +1,196 @@
+"""
+Agent API测试
+"""
+import json
+import socket
+import subprocess
+import sys
+import time
+import unittest
+from unittest import mock
+from app import create_app
+from app.agents import agent_pool
+from app.agents.demo_agent import DemoAgent
+from app.models import AgentJob
+from app.services.agent_job_service import job_runner
+from app.core.extensions import db
+
+class AgentAPITestCase(unittest.TestCase):
+    """Agent API测试类"""
+    
+    def setUp(self):
+        """测试前置设置"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        response = self.client.post('/api/v1/auth/login', json={
+            'username': 'admin',
+            'password': 'password'
+        })
+        self.headers = {'Authorization': f"Bearer {response.json['access_token']}"}
+        
+    def tearDown(self):
+        """测试后置清理"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        
+    def test_list_agent_types(self):
+        """测试列出可用的Agent类型"""
+        response = self.client.get('/api/v1/agents', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['status'], 'success')
+        self.assertIn('demo', response.json['agent_types'])
+        
+    def test_process(self):
+        """测试单个输入处理"""
+        response = self.client.post('/api/v1/agents/process', headers=self.headers, json={
+            'agent_type': 'demo',
+            'input': 'hello'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['result']['output'], 'Echo: hello')
+        
+    def test_process_result_cache(self):
+        """测试可缓存Agent的结果缓存与X-Cache响应头"""
+        payload = {'agent_type': 'demo', 'config': {'name': 'Cached'}, 'input': 'same'}
+        first = self.client.post('/api/v1/agents/process', headers=self.headers, json=payload)
+        second = self.client.post('/api/v1/agents/process', headers=self.headers, json=payload)
+        self.assertEqual(first.headers['X-Cache'], 'MISS')
+        self.assertEqual(second.headers['X-Cache'], 'HIT')
+        self.assertEqual(first.json['result'], second.json['result'])
+        
+    def test_process_batch(self):
+        """测试批量处理按顺序返回结果"""
+        response = self.client.post('/api/v1/agents/process/batch', headers=self.headers, json={
+            'agent_type': 'demo',
+            'inputs': ['a', 'b', 'c']
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['total'], 3)
+        self.assertEqual(response.json['failed'], 0)
+        self.assertEqual(
+            [item['result']['output'] for item in response.json['results']],
+            ['Echo: a', 'Echo: b', 'Echo: c']
+        )
+        
+    def test_process_batch_requires_list(self):
+        """测试批量处理的输入校验"""
+        response = self.client.post('/api/v1/agents/process/batch', headers=self.headers, json={
+            'agent_type': 'demo',
+            'inputs': 'a'
+        })
+        self.assertEqual(response.status_code, 400)
+        
+    def test_process_stream_sse(self):
+        """测试SSE流式处理"""
+        response = self.client.post('/api/v1/agents/process/stream', headers=self.headers, json={
+            'agent_type': 'demo',
+            'input': 'hello world'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        events = [block for block in response.get_data(as_text=True).split('\n\n') if block]
+        self.assertEqual(events[-1].split('\n')[0], 'event: end')
+        self.assertEqual(len(events), 4)
+        
+    def test_process_stream_ndjson_releases_agent(self):
+        """测试NDJSON流式处理，提前关闭时Agent被归还"""
+        response = self.client.post('/api/v1/agents/process/stream?format=ndjson', headers=self.headers, json={
+            'agent_type': 'demo',
+            'input': 'hello world'
+        }, buffered=False)
+        first = json.loads(next(response.response))
+        self.assertEqual(first['result']['delta'], 'Echo:')
+        response.close()
+        self.assertEqual(agent_pool.stats()['checked_out'], 0)
+        
+    def test_unexpected_errors_not_exposed(self):
+        """测试批量和流式处理中的非预期异常不向客户端返回异常内容"""
+        error = RuntimeError('connect to db://user:secret@internal failed')
+        with mock.patch.object(DemoAgent, 'process', side_effect=error), \
+                self.assertLogs(self.app.logger, 'ERROR'):
+            response = self.client.post('/api/v1/agents/process/batch', headers=self.headers, json={
+                'agent_type': 'demo',
+                'inputs': ['a']
+            })
+        self.assertEqual(response.json['failed'], 1)
+        self.assertEqual(response.json['results'][0]['message'], '服务器内部错误')
+        
+        def failing_stream(self, input_data, **kwargs):
+            yield {'delta': 'Echo:'}
+            raise error
+            
+        with mock.patch.object(DemoAgent, 'process_stream', failing_stream), \
+                self.assertLogs(self.app.logger, 'ERROR'):
+            response = self.client.post('/api/v1/agents/process/stream?format=ndjson', headers=self.headers, json={
+                'agent_type': 'demo',
+                'input': 'hello'
+            })
+            body = response.get_data(as_text=True)
+        self.assertNotIn('secret', body)
+        self.assertEqual(json.loads(body.splitlines()[-1])['message'], '服务器内部错误')
+        
+    def test_agent_job_lifecycle(self):
+        """测试异步任务提交与轮询"""
+        response = self.client.post('/api/v1/agents/jobs', headers=self.headers, json={
+            'agent_type': 'demo',
+            'input': 'later'
+        })
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json['job']['id']
+        
+        deadline = time.time() + 5
+        while True:
+            job = self.client.get(f'/api/v1/agents/jobs/{job_id}', headers=self.headers).json['job']
+            if job['status'] in ('succeeded', 'failed') or time.time() > deadline:
+                break
+            time.sleep(0.02)
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['result']['output'], 'Echo: later')
+        
+    def test_agent_job_error_not_exposed(self):
+        """测试失败任务的错误信息不包含异常内容"""
+        error = RuntimeError('connect to db://user:secret@internal failed')
+        with mock.patch.object(DemoAgent, 'process', side_effect=error), \
+                self.assertLogs(self.app.logger, 'ERROR'):
+            response = self.client.post('/api/v1/agents/jobs', headers=self.headers, json={
+                'agent_type': 'demo',
+                'input': 'later'
+            })
+            job_id = response.json['job']['id']
+            deadline = time.time() + 5
+            while True:
+                job = self.client.get(f'/api/v1/agents/jobs/{job_id}', headers=self.headers).json['job']
+                if job['status'] in ('succeeded', 'failed') or time.time() > deadline:
+                    break
+                time.sleep(0.02)
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['error'], '服务器内部错误')
+        
+    def test_agent_job_queue_full(self):
+        """测试任务队列已满时快速拒绝"""
+        with mock.patch.object(job_runner, 'try_reserve', return_value=False):
+            response = self.client.post('/api/v1/agents/jobs', headers=self.headers, json={
+                'agent_type': 'demo',
+                'input': 'later'
+            })
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+        
+    def test_agent_job_interrupted(self):
+        """测试所属工作进程退出后的未完成任务被标记为失败"""
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        job = AgentJob(agent_type='demo', owner='admin', input='x',
+                       worker_host=socket.gethostname(), worker_pid=process.pid)
+        db.session.add(job)
+        db.session.commit()
+        
+        response = self.client.get(f'/api/v1/agents/jobs/{job.id}', headers=self.headers)
+        self.assertEqual(response.json['job']['status'], 'failed')
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+认证测试
+"""
+import time
+import unittest
+from unittest import mock
+from app import create_app
+from flask_jwt_extended import jwt_manager as jwt_manager_module
+from app.core.extensions import db
+from app.core.jwt_manager import VerifiedTokenCache
+from app.core.revocation import BloomFilter, TokenBlocklist, token_blocklist
+from app.models.revoked_token_model import RevokedToken
+
+class AuthTestCase(unittest.TestCase):
+    """认证测试类"""
+    
+    def setUp(self):
+        """测试前置设置"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        response = self.client.post('/api/v1/auth/login', json={
+            'username': 'admin',
+            'password': 'password'
+        })
+        self.headers = {'Authorization': f"Bearer {response.json['access_token']}"}
+        self.jwt = self.app.extensions['flask-jwt-extended']
+        
+    def tearDown(self):
+        """测试后置清理"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        
+    def test_verified_token_cache(self):
+        """测试同一令牌只做一次完整校验"""
+        with mock.patch.object(jwt_manager_module, '_decode_jwt', wraps=jwt_manager_module._decode_jwt) as decode:
+            for _ in range(3):
+                response = self.client.get('/api/v1/auth/profile', headers=self.headers)
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(self.jwt.verified_tokens.hits, 2)
+        
+    def test_cached_token_expires(self):
+        """测试缓存条目在令牌过期时刻失效"""
+        cache = VerifiedTokenCache()
+        key = cache.make_key('token')
+        cache.set(key, {'sub': 'admin', 'exp': time.time() + 60})
+        self.assertEqual(cache.get(key)['sub'], 'admin')
+        with mock.patch('app.core.jwt_manager.time.time', return_value=time.time() + 61):
+            self.assertIsNone(cache.get(key))
+            
+        # 已过期的令牌不会被缓存
+        cache.set(key, {'sub': 'admin', 'exp': time.time() - 1})
+        self.assertIsNone(cache.get(key))
+        
+    def test_logout_revokes_token(self):
+        """测试吊销后的令牌无法再使用"""
+        self.assertEqual(self.client.get('/api/v1/auth/profile', headers=self.headers).status_code, 200)
+        self.assertEqual(self.client.post('/api/v1/auth/logout', headers=self.headers).status_code, 200)
+        self.assertEqual(self.client.get('/api/v1/auth/profile', headers=self.headers).status_code, 401)
+        
+    def test_revocation_visible_to_other_workers(self):
+        """测试其他工作进程的吊销列表通过增量同步得知吊销"""
+        other_worker = TokenBlocklist()
+        other_worker.sync_interval = 0
+        token_blocklist.revoke({'jti': 'revoked-jti', 'type': 'access', 'sub': 'admin'})
+        self.assertTrue(other_worker.is_revoked('revoked-jti'))
+        self.assertFalse(other_worker.is_revoked('active-jti'))
+        
+    def test_blocklist_rebuild_keeps_revoked_tokens(self):
+        """测试吊销记录超过容量重建过滤器后，已吊销的令牌仍被拒绝"""
+        for i in range(5):
+            token_blocklist.revoke({'jti': f'revoked-{i}', 'type': 'access', 'sub': 'admin'})
+        other_worker = TokenBlocklist()
+        other_worker.capacity = 2
+        other_worker.sync_interval = float('inf')
+        other_worker.sync(force=True)
+        self.assertGreater(other_worker.capacity, 2)
+        self.assertTrue(all(other_worker.is_revoked(f'revoked-{i}') for i in range(5)))
+        self.assertFalse(other_worker.is_revoked('active-jti'))
+        
+    def test_revoke_same_token_twice(self):
+        """测试重复吊销同一令牌（例如并发注销）不报错"""
+        payload = {'jti': 'revoked-jti', 'type': 'access', 'sub': 'admin', 'exp': time.time() + 60}
+        token_blocklist.revoke(payload)
+        token_blocklist.revoke(payload)
+        self.assertEqual(db.session.query(RevokedToken).filter_by(jti='revoked-jti').count(), 1)
+        self.assertTrue(token_blocklist.is_revoked('revoked-jti'))
+        
+    def test_blocklist_purges_expired_tokens(self):
+        """测试定期清理过期的吊销记录并重建过滤器"""
+        token_blocklist.revoke({'jti': 'expired-jti', 'type': 'access', 'sub': 'admin', 'exp': time.time() - 60})
+        token_blocklist.revoke({'jti': 'active-jti', 'type': 'access', 'sub': 'admin', 'exp': time.time() + 60})
+        other_worker = TokenBlocklist()
+        other_worker.purge_interval = 3600
+        other_worker.sync(force=True)
+        self.assertEqual([row.jti for row in db.session.query(RevokedToken)], ['active-jti'])
+        self.assertNotIn('expired-jti', other_worker._filter)
+        self.assertTrue(other_worker.is_revoked('active-jti'))
+        
+        # 间隔内只做增量同步
+        token_blocklist.revoke({'jti': 'expired-2', 'type': 'access', 'sub': 'admin', 'exp': time.time() - 60})
+        other_worker.sync(force=True)
+        self.assertIn('expired-2', other_worker._filter)
+        self.assertEqual(db.session.query(RevokedToken).count(), 2)
+        
+    def test_bloom_filter(self):
+        """测试布隆过滤器无漏报且误报率接近设计值"""
+        bloom = BloomFilter(10000, 0.01)
+        for i in range(10000):
+            bloom.add(f'jti-{i}')
+        self.assertTrue(all(f'jti-{i}' in bloom for i in range(10000)))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+        
+if __name__ == '__main__':
+    unittest.main()
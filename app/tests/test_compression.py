@@ -0,0 +1,136 @@
+"""
+响应压缩与条件请求测试
+"""
+import gzip
+import json
+import unittest
+import zlib
+from unittest import mock
+from app import create_app
+from app.core.compression import compress_stream, response_compression
+from app.core.extensions import db
+from app.services import UserService
+
+class CompressionTestCase(unittest.TestCase):
+    """响应压缩与条件请求测试类"""
+    
+    def setUp(self):
+        """测试前置设置"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        response = self.client.post('/api/v1/auth/login', json={
+            'username': 'admin',
+            'password': 'password'
+        })
+        self.headers = {'Authorization': f"Bearer {response.json['access_token']}"}
+        for i in range(30):
+            UserService.create_user(f'user{i:02d}', f'user{i:02d}@example.com', 'secret123')
+    
+    def tearDown(self):
+        """测试后置清理"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+    
+    def test_gzip_large_response(self):
+        """测试超过阈值的响应按客户端接受的编码压缩"""
+        plain = self.client.get('/api/v1/users?limit=30', headers=self.headers)
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertIn('Accept-Encoding', plain.headers['Vary'])
+        
+        response = self.client.get(
+            '/api/v1/users?limit=30', headers={**self.headers, 'Accept-Encoding': 'gzip, deflate'}
+        )
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertLess(int(response.headers['Content-Length']), len(plain.data))
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+        
+        response = self.client.get(
+            '/api/v1/users?limit=30', headers={**self.headers, 'Accept-Encoding': 'gzip;q=0, deflate'}
+        )
+        self.assertEqual(response.headers['Content-Encoding'], 'deflate')
+        self.assertEqual(zlib.decompress(response.data), plain.data)
+    
+    def test_small_response_not_compressed(self):
+        """测试小于阈值的响应不压缩"""
+        response = self.client.get('/api/v1/users?limit=1', headers={**self.headers, 'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.json['status'], 'success')
+        
+        with mock.patch.object(response_compression, 'min_size', 0):
+            response = self.client.get('/api/v1/users?limit=1', headers={**self.headers, 'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+    
+    def test_streamed_export_compressed(self):
+        """测试流式导出逐块压缩"""
+        response = self.client.get('/api/v1/users/export', headers={**self.headers, 'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        lines = gzip.decompress(response.data).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 30)
+        self.assertEqual(json.loads(lines[0])['username'], 'user00')
+    
+    def test_unbuffered_stream_flushes_each_chunk(self):
+        """测试禁止缓冲的流式响应每块都可立即解压"""
+        response = self.client.post(
+            '/api/v1/agents/process/stream?format=ndjson',
+            headers={**self.headers, 'Accept-Encoding': 'gzip'},
+            json={'agent_type': 'demo', 'input': 'hello world'},
+            buffered=False
+        )
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        first = decompressor.decompress(next(response.response))
+        self.assertEqual(json.loads(first)['status'], 'success')
+        response.close()
+    
+    def test_compress_stream_roundtrip(self):
+        """测试逐块压缩的结果可以完整解压"""
+        chunks = [f'line {i}\n'.encode() for i in range(100)]
+        for flush_each in (False, True):
+            data = b''.join(compress_stream(chunks, 'deflate', flush_each=flush_each))
+            self.assertEqual(zlib.decompress(data), b''.join(chunks))
+    
+    def test_conditional_get(self):
+        """测试强ETag与If-None-Match返回304"""
+        for url in ('/api/v1/agents', '/api/v1/auth/profile'):
+            response = self.client.get(url, headers=self.headers)
+            etag = response.headers['ETag']
+            self.assertFalse(etag.startswith('W/'))
+            self.assertIn('no-cache', response.headers['Cache-Control'])
+            
+            response = self.client.get(url, headers={**self.headers, 'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
+            self.assertEqual(response.headers['ETag'], etag)
+            
+            response = self.client.get(url, headers={**self.headers, 'If-None-Match': '"stale"'})
+            self.assertEqual(response.status_code, 200)
+        
+        # 未认证的请求不会得到304
+        response = self.client.get('/api/v1/agents', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 401)
+    
+    def test_conditional_get_with_compression(self):
+        """测试压缩表示使用带编码后缀的ETag并可用于重新验证"""
+        headers = {**self.headers, 'Accept-Encoding': 'gzip'}
+        agent_types = [{'type': f'agent{i}', 'description': '示例Agent'} for i in range(100)]
+        with mock.patch('app.api.v1.agent_routes.available_agent_types', return_value=agent_types):
+            response = self.client.get('/api/v1/agents', headers=headers)
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            etag = response.headers['ETag']
+            self.assertTrue(etag.endswith('-gzip"'))
+            
+            response = self.client.get('/api/v1/agents', headers={**headers, 'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.headers['ETag'], etag)
+            
+            # 未压缩表示的ETag同样可以重新验证
+            response = self.client.get('/api/v1/agents', headers={**self.headers, 'If-None-Match': etag[:-6] + '"'})
+            self.assertEqual(response.status_code, 304)
+
+if __name__ == '__main__':
+    unittest.main()
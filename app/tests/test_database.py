@@ -0,0 +1,133 @@
+"""
+数据库引擎配置测试
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+from sqlalchemy import create_engine, insert, text
+from app import create_app
+from app.config.config import TestingConfig
+from app.core.database import engine_options, install_sqlite_pragmas, replica_router, sqlite_settings
+from app.core.extensions import db
+from app.models import User
+from app.services import UserService
+
+class DatabaseTestCase(unittest.TestCase):
+    """数据库引擎配置测试类"""
+    
+    def setUp(self):
+        """测试前置设置"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'test.db')
+    
+    def tearDown(self):
+        """测试后置清理"""
+        self.directory.cleanup()
+    
+    def test_app_engine_pragmas(self):
+        """测试应用引擎的连接使用WAL和配置的PRAGMA"""
+        app = create_app('testing')
+        with app.app_context():
+            with db.engine.connect() as conn:
+                self.assertEqual(conn.exec_driver_sql('PRAGMA journal_mode').scalar(), 'wal')
+                self.assertEqual(conn.exec_driver_sql('PRAGMA busy_timeout').scalar(), 5000)
+                self.assertEqual(conn.exec_driver_sql('PRAGMA synchronous').scalar(), 1)
+                self.assertEqual(conn.exec_driver_sql('PRAGMA cache_size').scalar(), -64000)
+            self.assertEqual(db.engine.pool.size(), app.config['DB_POOL_SIZE'])
+    
+    def test_custom_settings(self):
+        """测试自定义PRAGMA和IMMEDIATE事务"""
+        settings = sqlite_settings({
+            'SQLITE_BUSY_TIMEOUT_MS': 1234,
+            'SQLITE_SYNCHRONOUS': 'full',
+            'SQLITE_BEGIN_MODE': 'immediate'
+        })
+        engine = create_engine(f'sqlite:///{self.path}')
+        install_sqlite_pragmas(engine, settings)
+        with engine.connect() as conn:
+            self.assertEqual(conn.exec_driver_sql('PRAGMA busy_timeout').scalar(), 1234)
+            self.assertEqual(conn.exec_driver_sql('PRAGMA synchronous').scalar(), 2)
+        with engine.begin() as conn:
+            conn.execute(text('CREATE TABLE t (x INTEGER)'))
+            conn.execute(text('INSERT INTO t VALUES (1)'))
+            self.assertTrue(conn.connection.dbapi_connection.in_transaction)
+        with engine.connect() as conn:
+            self.assertEqual(conn.execute(text('SELECT COUNT(*) FROM t')).scalar(), 1)
+        engine.dispose()
+    
+    def test_invalid_setting_rejected(self):
+        """测试非法枚举值被拒绝"""
+        engine = create_engine(f'sqlite:///{self.path}')
+        with self.assertRaises(ValueError):
+            install_sqlite_pragmas(engine, {'journal_mode': 'wal; DROP TABLE users'})
+    
+    def test_memory_database_engine_options(self):
+        """测试内存数据库不设置连接池大小"""
+        self.assertEqual(engine_options({'SQLALCHEMY_DATABASE_URI': 'sqlite://'}), {})
+        self.assertEqual(engine_options({'SQLALCHEMY_DATABASE_URI': 'sqlite:///x.db', 'DB_POOL_SIZE': 3})['pool_size'], 3)
+
+class ReplicaRoutingTestCase(unittest.TestCase):
+    """读写分离测试类"""
+    
+    def setUp(self):
+        """使用两个SQLite文件分别作为主库和只读副本"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.primary = os.path.join(self.directory.name, 'primary.db')
+        self.replica = os.path.join(self.directory.name, 'replica.db')
+    
+    def tearDown(self):
+        """测试后置清理"""
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+        self.app_context.pop()
+        self.directory.cleanup()
+    
+    def create_app(self, replicas):
+        with mock.patch.multiple(
+            TestingConfig,
+            SQLALCHEMY_DATABASE_URI=f'sqlite:///{self.primary}',
+            SQLALCHEMY_READ_REPLICAS=replicas,
+            USER_CACHE_ENABLED=False
+        ):
+            self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+    
+    def test_reads_routed_to_replica(self):
+        """测试读取使用副本，写入使用主库"""
+        self.create_app([f'sqlite:///{self.replica}'])
+        replica = db.engines['replica_0']
+        db.metadata.create_all(replica)
+        with replica.begin() as conn:
+            conn.execute(insert(User), [{'username': 'bob', 'email': 'bob@example.com', 'password_hash': 'x'}])
+        
+        UserService.create_user('alice', 'alice@example.com', 'secret123')
+        db.session.remove()
+        
+        # 新的请求：读取落到副本（副本中只有bob）
+        self.assertIsNone(UserService.get_user_by_username('alice'))
+        self.assertEqual(UserService.get_user_by_username('bob').email, 'bob@example.com')
+        self.assertEqual([user['username'] for user in UserService.list_users()[0]], ['bob'])
+    
+    def test_read_your_writes(self):
+        """测试同一请求写入后的读取固定使用主库"""
+        self.create_app([f'sqlite:///{self.replica}'])
+        db.metadata.create_all(db.engines['replica_0'])
+        UserService.create_user('alice', 'alice@example.com', 'secret123')
+        self.assertIsNotNone(UserService.get_user_by_username('alice'))
+        db.session.remove()
+        self.assertIsNone(UserService.get_user_by_username('alice'))
+    
+    def test_unhealthy_replica_falls_back_to_primary(self):
+        """测试副本不可用时回落到主库"""
+        self.create_app([f'sqlite:///{self.directory.name}/missing/replica.db'])
+        UserService.create_user('alice', 'alice@example.com', 'secret123')
+        db.session.remove()
+        self.assertIsNotNone(UserService.get_user_by_username('alice'))
+        self.assertIn('replica_0', replica_router._down_until)
+
+if __name__ == '__main__':
+    unittest.main()
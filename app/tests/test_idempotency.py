@@ -0,0 +1,147 @@
+"""
+幂等键与相同请求合并测试
+"""
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from flask import jsonify
+from app import create_app
+from app.config.config import TestingConfig
+from app.core.extensions import db
+from app.core.idempotency import Idempotency, idempotency
+from app.models import AgentJob
+
+class IdempotencyTestCase(unittest.TestCase):
+    """幂等键与相同请求合并测试类"""
+    
+    def setUp(self):
+        """测试前置设置"""
+        self.state_dir = tempfile.mkdtemp()
+        self.config_patch = mock.patch.object(TestingConfig, 'LOCAL_STATE_DIR', self.state_dir)
+        self.config_patch.start()
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        response = self.client.post('/api/v1/auth/login', json={
+            'username': 'admin',
+            'password': 'password'
+        })
+        self.headers = {'Authorization': f"Bearer {response.json['access_token']}"}
+    
+    def tearDown(self):
+        """测试后置清理"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        self.config_patch.stop()
+        shutil.rmtree(self.state_dir, ignore_errors=True)
+    
+    def submit_job(self, key=None, input_data='later'):
+        """提交一个异步任务"""
+        headers = dict(self.headers)
+        if key is not None:
+            headers['Idempotency-Key'] = key
+        with mock.patch('app.services.agent_job_service.job_runner.submit'):
+            return self.client.post('/api/v1/agents/jobs', headers=headers, json={
+                'agent_type': 'demo',
+                'input': input_data
+            })
+    
+    def test_idempotency_key_replay(self):
+        """测试相同幂等键的请求只执行一次并重放响应"""
+        first = self.submit_job('key-1')
+        self.assertEqual(first.status_code, 202)
+        self.assertNotIn('Idempotent-Replayed', first.headers)
+        
+        second = self.submit_job('key-1')
+        self.assertEqual(second.status_code, 202)
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json['job']['id'], first.json['job']['id'])
+        self.assertEqual(second.headers['Location'], first.headers['Location'])
+        self.assertEqual(AgentJob.query.count(), 1)
+        
+        # 不同的键照常执行
+        self.assertNotEqual(self.submit_job('key-2').json['job']['id'], first.json['job']['id'])
+    
+    def test_idempotency_key_reused_with_different_body(self):
+        """测试同一个幂等键用于不同请求体时返回422"""
+        self.submit_job('key-1')
+        response = self.submit_job('key-1', input_data='other')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(AgentJob.query.count(), 1)
+    
+    def test_invalid_idempotency_key(self):
+        """测试过长的幂等键"""
+        self.assertEqual(self.submit_job('x' * 256).status_code, 400)
+    
+    def test_identical_requests_not_replayed_after_completion(self):
+        """测试未携带幂等键的相同请求在执行结束后照常执行"""
+        first = self.submit_job()
+        second = self.submit_job()
+        self.assertNotIn('Idempotent-Replayed', second.headers)
+        self.assertNotEqual(second.json['job']['id'], first.json['job']['id'])
+    
+    def test_concurrent_identical_requests_coalesce(self):
+        """测试正在执行的相同请求被合并为一次执行"""
+        calls = []
+        results = []
+        
+        def slow_view():
+            calls.append(1)
+            time.sleep(0.3)
+            return jsonify({'value': len(calls)})
+        
+        def request_once():
+            with self.app.test_request_context():
+                response, replayed = idempotency.execute('k', 'h', slow_view, replay_completed=False)
+                results.append((response.get_json()['value'], replayed))
+        
+        threads = [threading.Thread(target=request_once) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.05)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [(1, False), (1, True), (1, True)])
+    
+    def test_shared_across_workers(self):
+        """测试其他工作进程重放已完成的结果"""
+        other_worker = Idempotency()
+        other_worker.init_app(self.app)
+        with self.app.test_request_context():
+            idempotency.execute('k', 'h', lambda: jsonify({'value': 1}), replay_completed=True)
+            response, replayed = other_worker.execute('k', 'h', lambda: jsonify({'value': 2}), replay_completed=True)
+        self.assertTrue(replayed)
+        self.assertEqual(response.get_json(), {'value': 1})
+    
+    def test_dead_leader_taken_over(self):
+        """测试执行者所在进程退出后等待者接手执行"""
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        with mock.patch('app.core.idempotency.os.getpid', return_value=process.pid):
+            idempotency._claim('k', 'h', None, True)
+        with self.app.test_request_context():
+            response, replayed = idempotency.execute('k', 'h', lambda: jsonify({'value': 1}), replay_completed=True)
+        self.assertFalse(replayed)
+    
+    def test_failed_execution_not_saved(self):
+        """测试执行失败不保存结果"""
+        def failing_view():
+            raise RuntimeError('boom')
+        
+        with self.app.test_request_context():
+            with self.assertRaises(RuntimeError):
+                idempotency.execute('k', 'h', failing_view, replay_completed=True)
+            response, replayed = idempotency.execute('k', 'h', lambda: jsonify({'value': 1}), replay_completed=True)
+        self.assertFalse(replayed)
+
+if __name__ == '__main__':
+    unittest.main()
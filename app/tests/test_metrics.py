@@ -0,0 +1,109 @@
+"""
+请求指标测试
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from app import create_app
+from app.core.metrics import fold_worker_snapshot, request_metrics
+
+class MetricsTestCase(unittest.TestCase):
+    """请求指标测试类"""
+    
+    def setUp(self):
+        """测试前置设置"""
+        self.metrics_dir = tempfile.TemporaryDirectory()
+        self.app = create_app('testing')
+        self.app.config['METRICS_DIR'] = self.metrics_dir.name
+        request_metrics.directory = self.metrics_dir.name
+        request_metrics._reset()
+        self.client = self.app.test_client()
+        
+    def tearDown(self):
+        """测试后置清理"""
+        request_metrics.directory = None
+        self.metrics_dir.cleanup()
+        
+    def test_metrics_exposition(self):
+        """测试按端点记录延迟直方图与状态码"""
+        self.client.get('/api/v1/ping')
+        self.client.get('/api/v1/ping')
+        self.client.get('/missing')
+        
+        body = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('http_request_duration_seconds_count{endpoint="/api/v1/ping",method="GET"} 2', body)
+        self.assertIn('http_request_duration_seconds_bucket{endpoint="/api/v1/ping",method="GET",le="+Inf"} 2', body)
+        self.assertIn('http_requests_total{endpoint="/api/v1/ping",method="GET",status="200"} 2', body)
+        self.assertIn('http_requests_total{endpoint="<unmatched>",method="GET",status="404"} 1', body)
+        
+    def test_metrics_aggregate_worker_snapshots(self):
+        """测试汇总其他工作进程写入的快照，已退出进程不计入进行中请求数"""
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        buckets = [0] * (len(request_metrics.buckets) + 1)
+        buckets[0] = 5
+        snapshot = {
+            'pid': process.pid,
+            'histograms': [['/api/v1/ping', 'GET', buckets]],
+            'sums': [['/api/v1/ping', 'GET', 0.01, 5]],
+            'statuses': [['/api/v1/ping', 'GET', 200, 5]],
+            'in_flight': {'/api/v1/ping': 3}
+        }
+        with open(os.path.join(self.metrics_dir.name, f'metrics_{process.pid}.json'), 'w') as file:
+            json.dump(snapshot, file)
+            
+        self.client.get('/api/v1/ping')
+        data = request_metrics.collect()
+        self.assertEqual(data['statuses'][('/api/v1/ping', 'GET', 200)], 6)
+        self.assertEqual(data['sums'][('/api/v1/ping', 'GET')][1], 6)
+        self.assertEqual(data['in_flight'].get('/api/v1/ping', 0), 0)
+        
+        # 本进程的快照写入后不会被重复计数
+        request_metrics.flush()
+        self.assertEqual(request_metrics.collect()['statuses'][('/api/v1/ping', 'GET', 200)], 6)
+        
+    def test_metrics_fold_exited_worker(self):
+        """测试退出的工作进程计入汇总文件并删除快照，pid复用后计数不倒退"""
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        path = os.path.join(self.metrics_dir.name, f'metrics_{process.pid}.json')
+        
+        def write_snapshot(token, count):
+            buckets = [0] * (len(request_metrics.buckets) + 1)
+            buckets[0] = count
+            with open(path, 'w') as file:
+                json.dump({
+                    'pid': process.pid,
+                    'token': token,
+                    'histograms': [['/api/v1/ping', 'GET', buckets]],
+                    'sums': [['/api/v1/ping', 'GET', 0.01, count]],
+                    'statuses': [['/api/v1/ping', 'GET', 200, count]],
+                    'in_flight': {'/api/v1/ping': 1}
+                }, file)
+                
+        def ping_count():
+            return request_metrics.collect()['statuses'][('/api/v1/ping', 'GET', 200)]
+            
+        write_snapshot('first', 5)
+        fold_worker_snapshot(self.metrics_dir.name, process.pid)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(ping_count(), 5)
+        
+        # 合并后、删除前被抓取到的快照不重复计数
+        write_snapshot('first', 5)
+        self.assertEqual(ping_count(), 5)
+        
+        # 复用同一pid的新进程从0开始计数，汇总值不倒退
+        write_snapshot('second', 2)
+        self.assertEqual(ping_count(), 7)
+        fold_worker_snapshot(self.metrics_dir.name, process.pid)
+        self.assertEqual(ping_count(), 7)
+        self.assertEqual(request_metrics.collect()['sums'][('/api/v1/ping', 'GET')][1], 7)
+        self.assertEqual(request_metrics.collect()['in_flight'].get('/api/v1/ping', 0), 0)
+        self.assertEqual(os.listdir(self.metrics_dir.name), ['exited_workers.json'])
+        
+if __name__ == '__main__':
+    unittest.main()
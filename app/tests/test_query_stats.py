@@ -0,0 +1,101 @@
+"""
+SQL查询统计测试
+"""
+import unittest
+from unittest import mock
+from sqlalchemy.exc import OperationalError
+from app import create_app
+from app.core.extensions import db
+from app.core.query_stats import capture, parameters_shape, query_stats
+from app.core.revocation import token_blocklist
+from app.services import UserService
+from app.utils.testing import QueryBudgetMixin
+
+class QueryStatsTestCase(QueryBudgetMixin, unittest.TestCase):
+    """SQL查询统计测试类"""
+    
+    def setUp(self):
+        """测试前置设置"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        response = self.client.post('/api/v1/auth/login', json={
+            'username': 'admin',
+            'password': 'password'
+        })
+        self.headers = {'Authorization': f"Bearer {response.json['access_token']}"}
+        for i in range(20):
+            UserService.create_user(f'user{i:02d}', f'user{i:02d}@example.com', 'secret123')
+        db.session.remove()
+        # 吊销列表按间隔从数据库同步，固定为已同步状态使各接口的语句数确定
+        token_blocklist.sync(force=True)
+        token_blocklist.sync_interval = float('inf')
+    
+    def tearDown(self):
+        """测试后置清理"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+    
+    def test_response_headers(self):
+        """测试测试模式下输出查询数和耗时响应头"""
+        response = self.client.get('/api/v1/users?count=exact', headers=self.headers)
+        self.assertEqual(response.headers['X-DB-Query-Count'], '2')
+        self.assertGreaterEqual(float(response.headers['X-DB-Query-Time']), 0)
+        
+        response = self.client.get('/health')
+        self.assertEqual(response.headers['X-DB-Query-Count'], '0')
+    
+    def test_slow_query_log(self):
+        """测试慢查询日志只包含参数结构"""
+        with mock.patch.object(query_stats, 'slow_threshold', 0):
+            with self.assertLogs('app.core.query_stats', level='WARNING') as logs:
+                UserService.count_users(username_prefix='user1')
+        self.assertIn('SELECT count(*)', logs.output[0])
+        self.assertIn('(str, str)', logs.output[0])
+        self.assertNotIn('user1', logs.output[0].split('参数结构')[1])
+    
+    def test_failed_statement_leaves_no_state(self):
+        """测试出错的语句不在连接上残留开始时间，之后的语句正常统计"""
+        with capture() as collector, db.engine.connect() as conn:
+            with self.assertRaises(OperationalError):
+                conn.exec_driver_sql('SELECT * FROM missing_table')
+            conn.exec_driver_sql('SELECT 1')
+            self.assertNotIn('query_stats_start', conn.info)
+        self.assertEqual([statement for statement, _ in collector.statements], ['SELECT 1'])
+        
+    def test_parameters_shape(self):
+        """测试参数结构描述"""
+        self.assertEqual(parameters_shape((1, 'a', None)), '(int, str, NoneType)')
+        self.assertEqual(parameters_shape({'id': 1}), '{id: int}')
+        self.assertEqual(parameters_shape([(1,), (2,)], executemany=True), '2 x (int)')
+    
+    def test_user_endpoint_query_budgets(self):
+        """测试用户接口的查询预算，防止N+1查询"""
+        self.assertEndpointQueryBudget(self.client, 'GET', '/api/v1/users?limit=20', 1, headers=self.headers)
+        self.assertEndpointQueryBudget(self.client, 'GET', '/api/v1/users?count=exact', 2, headers=self.headers)
+        self.assertEndpointQueryBudget(self.client, 'GET', '/api/v1/users/export', 1, headers=self.headers)
+        
+        body = ''.join(
+            f'{{"username": "new{i}", "email": "new{i}@example.com", "password": "secret123"}}\n'
+            for i in range(10)
+        )
+        # 每批两次唯一性查询加一次多行插入
+        self.assertEndpointQueryBudget(
+            self.client, 'POST', '/api/v1/users/import', 3,
+            headers=self.headers, data=body, content_type='application/x-ndjson'
+        )
+    
+    def test_budget_failure_lists_statements(self):
+        """测试超出预算时测试失败并列出语句"""
+        with self.assertRaises(AssertionError) as context:
+            with self.assertQueryBudget(1):
+                for i in range(3):
+                    UserService.get_user_by_username(f'user{i:02d}')
+        self.assertIn('超出预算1条', str(context.exception))
+        self.assertIn('3. SELECT', str(context.exception))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+限流与准入控制测试
+"""
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+from flask import Flask
+from app import create_app
+from app.config.config import TestingConfig
+from app.core.errors import TooManyRequestsError
+from app.core.extensions import db
+from app.core.rate_limit import AgentConcurrencyLimiter, RateLimiter, agent_concurrency, parse_rate
+
+class RateLimitTestCase(unittest.TestCase):
+    """限流与准入控制测试类"""
+    
+    def setUp(self):
+        """测试前置设置"""
+        self.state_dir = tempfile.mkdtemp()
+        self.config_patch = mock.patch.multiple(
+            TestingConfig,
+            RATE_LIMIT_ENABLED=True,
+            RATE_LIMITS={'api_v1.process_with_agent': '2/minute'},
+            AGENT_CONCURRENCY_LIMITS={'demo': 1},
+            LOCAL_STATE_DIR=self.state_dir,
+            AGENT_CACHE_ENABLED=False,
+            create=True
+        )
+        self.config_patch.start()
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        response = self.client.post('/api/v1/auth/login', json={
+            'username': 'admin',
+            'password': 'password'
+        })
+        self.headers = {'Authorization': f"Bearer {response.json['access_token']}"}
+    
+    def tearDown(self):
+        """测试后置清理"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        self.config_patch.stop()
+        shutil.rmtree(self.state_dir, ignore_errors=True)
+    
+    def process(self, headers=None):
+        """发起一次Agent处理请求"""
+        return self.client.post('/api/v1/agents/process', headers=headers or self.headers, json={
+            'agent_type': 'demo',
+            'input': 'hello'
+        })
+    
+    def test_parse_rate(self):
+        """测试限流声明解析"""
+        self.assertEqual(parse_rate('60/minute'), (60, 1.0))
+        self.assertEqual(parse_rate('10/second'), (10, 10.0))
+        for spec in ('60', 'x/minute', '0/second', '5/week'):
+            with self.assertRaises(ValueError):
+                parse_rate(spec)
+    
+    def test_token_bucket_per_identity(self):
+        """测试超出额度后返回429和Retry-After，其他调用者不受影响"""
+        self.assertEqual(self.process().status_code, 200)
+        self.assertEqual(self.process().status_code, 200)
+        response = self.process()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers['Retry-After'], '30')
+        self.assertEqual(response.json['status'], 'error')
+        
+        # 未认证的请求按IP计，不消耗该用户的额度，仍由认证装饰器拒绝
+        self.assertEqual(self.client.post('/api/v1/agents/process', json={}).status_code, 401)
+        # 未声明限流的端点不受影响
+        self.assertEqual(self.client.get('/api/v1/agents', headers=self.headers).status_code, 200)
+    
+    def test_token_bucket_refill(self):
+        """测试令牌按速率补充"""
+        limiter = self._other_worker()
+        self.assertEqual(limiter.hit('k', 1, 20.0), 0)
+        self.assertGreater(limiter.hit('k', 1, 20.0), 0)
+        time.sleep(0.06)
+        self.assertEqual(limiter.hit('k', 1, 20.0), 0)
+    
+    def _other_worker(self):
+        """模拟同一主机上的另一个工作进程"""
+        other_app = Flask(__name__)
+        other_app.config.update(self.app.config)
+        limiter = RateLimiter()
+        limiter.init_app(other_app)
+        return limiter
+    
+    def test_limit_shared_across_workers(self):
+        """测试额度在工作进程间共享"""
+        other_worker = self._other_worker()
+        key = 'api_v1.process_with_agent:user:admin'
+        self.assertEqual(other_worker.hit(key, 2, 2 / 60), 0)
+        self.assertEqual(other_worker.hit(key, 2, 2 / 60), 0)
+        self.assertEqual(self.process().status_code, 429)
+    
+    def test_agent_concurrency_cap(self):
+        """测试Agent并发名额已满时返回429"""
+        with agent_concurrency.slot('demo'):
+            response = self.process()
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response.headers['Retry-After'], '1')
+            # 未设置上限的Agent类型不受影响
+            self.assertIsNone(agent_concurrency.acquire('other'))
+        self.assertEqual(self.process().status_code, 200)
+    
+    def test_stream_holds_slot_until_closed(self):
+        """测试流式响应在结束前一直占用名额"""
+        response = self.client.post(
+            '/api/v1/agents/process/stream?format=ndjson', headers=self.headers,
+            json={'agent_type': 'demo', 'input': 'hello world'}, buffered=False
+        )
+        next(response.response)
+        with self.assertRaises(TooManyRequestsError):
+            agent_concurrency.acquire('demo')
+        response.close()
+        agent_concurrency.release(agent_concurrency.acquire('demo'))
+    
+    def test_dead_worker_lease_reclaimed(self):
+        """测试已退出进程持有的名额被回收"""
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        other_worker = AgentConcurrencyLimiter()
+        other_worker.init_app(self.app)
+        with mock.patch('app.core.rate_limit.os.getpid', return_value=process.pid):
+            other_worker.acquire('demo')
+        lease_id = agent_concurrency.acquire('demo')
+        self.assertIsNotNone(lease_id)
+        agent_concurrency.release(lease_id)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+快速序列化测试
+"""
+import unittest
+from datetime import datetime
+from flask import json
+from app import create_app
+from app.core.extensions import db
+from app.core.serialization import compile_schema_dumper, dump_many, get_model_dumper, get_schema_dumper
+from app.models import User
+
+class SerializationTestCase(unittest.TestCase):
+    """快速序列化测试类"""
+    
+    def setUp(self):
+        """测试前置设置"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.user = User(username='alice', email='alice@example.com', password='secret123')
+        db.session.add(self.user)
+        db.session.commit()
+        
+    def tearDown(self):
+        """测试后置清理"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        
+    def test_model_dumper_matches_to_dict(self):
+        """测试编译后的模型dump函数与to_dict输出一致且不包含密码哈希"""
+        dumped = get_model_dumper(User)(self.user)
+        self.assertEqual(dumped, self.user.to_dict())
+        self.assertNotIn('password_hash', dumped)
+        
+    def test_schema_dumper_matches_marshmallow(self):
+        """测试编译后的模式dump函数与marshmallow输出一致"""
+        from app.schemas import UserSchema
+        schema = UserSchema()
+        self.assertEqual(compile_schema_dumper(schema)(self.user), schema.dump(self.user))
+        
+        self.user.updated_at = None
+        self.assertEqual(compile_schema_dumper(schema)(self.user), schema.dump(self.user))
+        
+    def test_schema_dumper_cached_per_options(self):
+        """测试同一模式类和选项只编译一次，选项不同时分别编译"""
+        from app.schemas import UserSchema
+        self.assertIs(get_schema_dumper(UserSchema()), get_schema_dumper(UserSchema()))
+        
+        schema = UserSchema(only=('id', 'username'))
+        dumper = get_schema_dumper(schema)
+        self.assertIsNot(dumper, get_schema_dumper(UserSchema()))
+        self.assertIs(dumper, get_schema_dumper(UserSchema(only=('username', 'id'))))
+        self.assertEqual(dumper(self.user), schema.dump(self.user))
+        
+    def test_json_provider_serializes_models(self):
+        """测试JSON Provider直接序列化模型对象列表"""
+        body = json.loads(self.app.json.dumps({'users': [self.user]}))
+        self.assertEqual(body['users'], dump_many([self.user]))
+        self.assertEqual(body['users'][0]['created_at'], self.user.created_at.isoformat())
+        
+        # 非模型对象仍使用默认序列化规则
+        moment = datetime(2025, 1, 1)
+        self.assertEqual(json.loads(self.app.json.dumps({'at': moment}))['at'], 'Wed, 01 Jan 2025 00:00:00 GMT')
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""
+启动耗时测试
+"""
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+# create_app() 的耗时预算（秒），可通过环境变量调整
+STARTUP_BUDGET = float(os.environ.get('STARTUP_BUDGET', 2.0))
+
+# 在全新解释器中测量，避免被当前测试进程已导入的模块影响
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+app = create_app('testing')
+elapsed = time.perf_counter() - start
+with app.test_request_context():
+    from app.agents import list_agent_types
+    agent_types = list_agent_types()
+print(json.dumps({
+    'elapsed': elapsed,
+    'agent_types': agent_types,
+    'agent_modules': sorted(m for m in sys.modules if m == 'app.agents.demo_agent')
+}))
+"""
+
+class StartupTestCase(unittest.TestCase):
+    """启动耗时测试类"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """在子进程中启动应用一次，各测试共享测量结果"""
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        output = subprocess.check_output([sys.executable, '-c', PROBE], cwd=root)
+        cls.result = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+        
+    def test_create_app_within_budget(self):
+        """测试create_app在预算时间内完成"""
+        self.assertLess(self.result['elapsed'], STARTUP_BUDGET)
+        
+    def test_agent_modules_imported_lazily(self):
+        """测试启动和列出Agent类型时不导入Agent模块"""
+        self.assertIn('demo', self.result['agent_types'])
+        self.assertEqual(self.result['agent_modules'], [])
+        
+if __name__ == '__main__':
+    unittest.main()
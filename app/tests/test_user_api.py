@@ -0,0 +1,120 @@
+"""
+用户API测试
+"""
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event, insert
+from app import create_app
+from app.core.extensions import db
+from app.models import User
+
+class UserAPITestCase(unittest.TestCase):
+    """用户API测试类"""
+    
+    def setUp(self):
+        """测试前置设置"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        response = self.client.post('/api/v1/auth/login', json={
+            'username': 'admin',
+            'password': 'password'
+        })
+        self.headers = {'Authorization': f"Bearer {response.json['access_token']}"}
+        
+        # 每两个用户共享同一个created_at，验证按id打破平局
+        base = datetime(2024, 1, 1)
+        db.session.execute(insert(User), [{
+            'username': f'user{i:02d}',
+            'email': f'user{i:02d}@example.com',
+            'password_hash': 'x',
+            'is_active': i % 3 != 0,
+            'created_at': base + timedelta(minutes=i // 2)
+        } for i in range(25)])
+        db.session.commit()
+    
+    def tearDown(self):
+        """测试后置清理"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+    
+    def _list(self, **params):
+        response = self.client.get('/api/v1/users', query_string=params, headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.json)
+        return response.json
+    
+    def test_keyset_pagination(self):
+        """测试游标分页遍历全部用户且顺序稳定"""
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 7}
+            if cursor:
+                params['cursor'] = cursor
+            data = self._list(**params)
+            seen.extend(user['username'] for user in data['users'])
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        expected = [f'user{i:02d}' for i in range(24, -1, -1)]
+        self.assertEqual(seen, expected)
+    
+    def test_filters_and_projection(self):
+        """测试过滤条件和字段投影只查询请求的列"""
+        statements = []
+        
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            data = self._list(fields='username', is_active='true', username_prefix='user1')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        
+        self.assertEqual(
+            [user['username'] for user in data['users']],
+            ['user19', 'user17', 'user16', 'user14', 'user13', 'user11', 'user10']
+        )
+        self.assertEqual(set(data['users'][0]), {'username'})
+        select_statement = [s for s in statements if 'FROM users' in s][-1]
+        self.assertNotIn('email', select_statement)
+        self.assertNotIn('password_hash', select_statement)
+    
+    def test_counts(self):
+        """测试精确计数和估算计数"""
+        data = self._list(count='exact', is_active='false')
+        self.assertEqual(data['total'], 9)
+        data = self._list(count='approx')
+        self.assertEqual(data['total_estimate'], 25)
+        
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+        self.assertEqual(self._list(count='approx')['total_estimate'], 25)
+    
+    def test_invalid_parameters(self):
+        """测试无效参数"""
+        for params in ({'limit': 0}, {'fields': 'password_hash'}, {'cursor': 'bogus'}, {'count': 'all'},
+                       {'username_prefix': 'u' * 65}):
+            response = self.client.get('/api/v1/users', query_string=params, headers=self.headers)
+            self.assertEqual(response.status_code, 400, params)
+    
+    def test_prefix_ending_with_max_code_point(self):
+        """测试以最大码位或代理区之前的码位结尾的用户名前缀"""
+        usernames = ['max' + chr(0x10FFFF) + 'a', chr(0x10FFFF) * 3, 'sur' + chr(0xD7FF) + 'b']
+        db.session.execute(insert(User), [{
+            'username': username,
+            'email': f'max{i}@example.com',
+            'password_hash': 'x'
+        } for i, username in enumerate(usernames)])
+        db.session.commit()
+        cases = [('max' + chr(0x10FFFF), 1), (chr(0x10FFFF), 1), ('sur' + chr(0xD7FF), 1), ('user1' + chr(0x10FFFF), 0)]
+        for prefix, expected in cases:
+            data = self._list(count='exact', username_prefix=prefix)
+            self.assertEqual((len(data['users']), data['total']), (expected, expected), prefix)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,341 @@
+"""
+用户服务测试
+"""
+import json
+import threading
+import time
+import unittest
+from contextlib import contextmanager
+from unittest import mock
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from app import create_app
+from app.core.errors import NotFoundError, ServiceUnavailableError, ValidationError
+from app.core.extensions import db
+from app.core.passwords import PasswordHasher, password_hasher
+from app.models import User
+from app.services import UserService
+from app.services.user_cache import UserCache, user_cache
+
+class UserServiceTestCase(unittest.TestCase):
+    """用户服务测试类"""
+    
+    def setUp(self):
+        """测试前置设置"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        
+    def tearDown(self):
+        """测试后置清理"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        
+    @contextmanager
+    def count_statements(self):
+        """统计代码块中发出的SQL语句"""
+        statements = []
+        
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+            
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+            
+    def test_authenticate(self):
+        """测试用户认证"""
+        UserService.create_user('alice', 'alice@example.com', 'secret123')
+        self.assertIsNotNone(UserService.authenticate('alice', 'secret123'))
+        self.assertIsNone(UserService.authenticate('alice', 'wrong'))
+        self.assertIsNone(UserService.authenticate('nobody', 'secret123'))
+        
+    def test_rehash_outdated_password_on_login(self):
+        """测试使用旧参数存储的密码在登录成功时被重新哈希"""
+        current_method = password_hasher.method
+        password_hasher.method = 'pbkdf2:sha256:500'
+        try:
+            user = UserService.create_user('bob', 'bob@example.com', 'secret123')
+        finally:
+            password_hasher.method = current_method
+        self.assertTrue(user.password_hash.startswith('pbkdf2:sha256:500$'))
+        
+        user = UserService.authenticate('bob', 'secret123')
+        self.assertTrue(user.password_hash.startswith(f'{current_method}$'))
+        self.assertIsNotNone(UserService.authenticate('bob', 'secret123'))
+        
+    def test_rehash_never_downgrades(self):
+        """测试算法不同或参数更强的哈希不会被重新哈希"""
+        hasher = PasswordHasher(method='pbkdf2:sha256:1000')
+        self.assertTrue(hasher.needs_rehash('pbkdf2:sha256:500$salt$hash'))
+        self.assertFalse(hasher.needs_rehash('pbkdf2:sha256:1000$salt$hash'))
+        self.assertFalse(hasher.needs_rehash('pbkdf2:sha256:600000$salt$hash'))
+        self.assertFalse(hasher.needs_rehash('pbkdf2:sha512:500$salt$hash'))
+        self.assertFalse(hasher.needs_rehash('scrypt:32768:8:1$salt$hash'))
+        
+        hasher = PasswordHasher()
+        self.assertFalse(hasher.needs_rehash(generate_password_hash('secret123')))
+        self.assertTrue(hasher.needs_rehash('scrypt:16384:8:1$salt$hash'))
+        self.assertFalse(hasher.needs_rehash('pbkdf2:sha256:600000$salt$hash'))
+        
+    def test_password_hasher_admission_control(self):
+        """测试哈希排队名额用尽时快速失败"""
+        hasher = PasswordHasher(method='pbkdf2:sha256:1000', max_workers=1, max_pending=1, queue_timeout=0.01)
+        release = threading.Event()
+        started = threading.Event()
+        
+        def slow(_):
+            started.set()
+            release.wait(5)
+            
+        worker = threading.Thread(target=hasher._run, args=(slow, None))
+        worker.start()
+        started.wait(5)
+        try:
+            with self.assertRaises(ServiceUnavailableError) as context:
+                hasher.hash('secret123')
+            self.assertIn('Retry-After', context.exception.headers)
+        finally:
+            release.set()
+            worker.join()
+        self.assertTrue(hasher.verify(hasher.hash('secret123'), 'secret123'))
+        
+    def test_hash_many_uses_admission_slots(self):
+        """测试批量哈希分段提交，占用的排队名额不超过并发计算数"""
+        hasher = PasswordHasher(method='pbkdf2:sha256:1000', max_workers=2, max_pending=4)
+        free_slots = []
+        
+        def record_slots(password, method, salt_length):
+            free_slots.append(hasher._slots._value)
+            return f'hash-{password}'
+            
+        with mock.patch('app.core.passwords.generate_password_hash', side_effect=record_slots):
+            password_hashes = hasher.hash_many([str(i) for i in range(7)])
+        self.assertEqual(password_hashes, [f'hash-{i}' for i in range(7)])
+        self.assertGreaterEqual(min(free_slots), 2)
+        self.assertLessEqual(max(free_slots), 3)
+        self.assertEqual(hasher._slots._value, 4)
+        
+    def test_password_hasher_inline(self):
+        """测试直接计算模式在调用线程中哈希，不创建线程池，仍做准入控制"""
+        hasher = PasswordHasher(method='pbkdf2:sha256:1000', max_workers=1, max_pending=1, queue_timeout=0.01, inline=True)
+        threads = []
+        
+        def record_thread(password, method, salt_length):
+            threads.append(threading.current_thread())
+            return generate_password_hash(password, method, salt_length)
+            
+        with mock.patch('app.core.passwords.generate_password_hash', side_effect=record_thread):
+            password_hash = hasher.hash('secret123')
+            hasher.hash_many(['a', 'b'])
+        self.assertEqual(threads, [threading.current_thread()] * 3)
+        self.assertIsNone(hasher._executor)
+        self.assertTrue(hasher.verify(password_hash, 'secret123'))
+        
+        hasher._slots.acquire()
+        try:
+            with self.assertRaises(ServiceUnavailableError):
+                hasher.hash('secret123')
+        finally:
+            hasher._slots.release()
+            
+    def test_create_user_single_statement(self):
+        """测试创建用户只发出一条INSERT，冲突由唯一索引报告"""
+        with self.count_statements() as statements:
+            user = UserService.create_user('alice', 'alice@example.com', 'secret123')
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('INSERT'))
+        self.assertIsNotNone(user.id)
+        
+        with self.count_statements() as statements:
+            with self.assertRaises(ValidationError) as context:
+                UserService.create_user('alice', 'other@example.com', 'secret123')
+            self.assertEqual(context.exception.message, '用户名已存在')
+        self.assertEqual(len(statements), 1)
+        with self.assertRaises(ValidationError) as context:
+            UserService.create_user('bob', 'alice@example.com', 'secret123')
+        self.assertEqual(context.exception.message, '邮箱已存在')
+            
+    def test_update_user_single_statement(self):
+        """测试更新用户只发出一条UPDATE"""
+        user_id = UserService.create_user('alice', 'alice@example.com', 'secret123').id
+        UserService.create_user('bob', 'bob@example.com', 'secret123')
+        db.session.expunge_all()
+        
+        with self.count_statements() as statements:
+            user = UserService.update_user(user_id, email='alice@new.example.com', is_active=False, role='admin')
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('UPDATE'))
+        self.assertEqual(user.email, 'alice@new.example.com')
+        self.assertFalse(user.is_active)
+        
+        with self.assertRaises(ValidationError) as context:
+            UserService.update_user(user_id, username='bob')
+        self.assertEqual(context.exception.message, '用户名已存在')
+        with self.count_statements() as statements:
+            with self.assertRaises(NotFoundError):
+                UserService.update_user(9999, username='nobody')
+        self.assertEqual(len(statements), 1)
+        
+        UserService.update_user(user_id, password='changed123', is_active=True)
+        self.assertIsNotNone(UserService.authenticate('alice', 'changed123'))
+        
+    def test_delete_user_single_statement(self):
+        """测试删除用户只发出一条DELETE"""
+        user_id = UserService.create_user('alice', 'alice@example.com', 'secret123').id
+        with self.count_statements() as statements:
+            self.assertTrue(UserService.delete_user(user_id))
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('DELETE'))
+        with self.assertRaises(NotFoundError):
+            UserService.get_user_by_id(user_id)
+        with self.assertRaises(NotFoundError):
+            UserService.delete_user(user_id)
+            
+    def test_user_cache_read_through(self):
+        """测试重复查询命中缓存，未知用户名被负缓存"""
+        user_id = UserService.create_user('alice', 'alice@example.com', 'secret123').id
+        db.session.expunge_all()
+        UserService.get_user_by_id(user_id)
+        with self.count_statements() as statements:
+            self.assertEqual(UserService.get_user_by_id(user_id).email, 'alice@example.com')
+            self.assertEqual(UserService.get_user_by_username('alice').id, user_id)
+            self.assertEqual(UserService.get_user_by_email('alice@example.com').id, user_id)
+        self.assertEqual(statements, [])
+        
+        self.assertIsNone(UserService.get_user_by_username('nobody'))
+        with self.count_statements() as statements:
+            self.assertIsNone(UserService.get_user_by_username('nobody'))
+        self.assertEqual(statements, [])
+        
+        # 创建用户清除负缓存
+        UserService.create_user('nobody', 'nobody@example.com', 'secret123')
+        self.assertIsNotNone(UserService.get_user_by_username('nobody'))
+        
+    def test_user_cache_invalidated_by_writes(self):
+        """测试更新和删除使缓存失效"""
+        user_id = UserService.create_user('alice', 'alice@example.com', 'secret123').id
+        UserService.get_user_by_username('alice')
+        UserService.update_user(user_id, username='alice2')
+        self.assertIsNone(UserService.get_user_by_username('alice'))
+        self.assertEqual(UserService.get_user_by_username('alice2').id, user_id)
+        
+        UserService.delete_user(user_id)
+        self.assertIsNone(UserService.get_user_by_username('alice2'))
+        with self.assertRaises(NotFoundError):
+            UserService.get_user_by_id(user_id)
+            
+    def test_user_cache_cross_worker_invalidation(self):
+        """测试一个工作进程的修改使其他工作进程的缓存失效"""
+        other_worker = UserCache()
+        other_worker.init_app(self.app)
+        user_id = UserService.create_user('alice', 'alice@example.com', 'secret123').id
+        
+        def load():
+            return User.query.filter_by(username='alice').first()
+            
+        self.assertTrue(other_worker.get_or_load('username', 'alice', load).is_active)
+        self.assertEqual(other_worker.hits, 0)
+        other_worker.get_or_load('username', 'alice', load)
+        self.assertEqual(other_worker.hits, 1)
+        
+        UserService.update_user(user_id, is_active=False)
+        db.session.expunge_all()
+        self.assertFalse(other_worker.get_or_load('username', 'alice', load).is_active)
+        self.assertEqual(other_worker.hits, 1)
+        
+    def test_user_cache_skips_replica_reads_after_write(self):
+        """测试写入后的复制延迟窗口内，从副本读到的旧值不写入缓存"""
+        other_worker = UserCache()
+        other_worker.init_app(self.app)
+        other_worker.replica_lag = 5.0
+        user_id = UserService.create_user('alice', 'alice@example.com', 'secret123').id
+        stale = db.session.get(User, user_id)
+        db.session.expunge_all()
+        loads = []
+        
+        def load_from_lagging_replica():
+            loads.append(1)
+            return stale
+            
+        UserService.update_user(user_id, is_active=False)
+        for _ in range(2):
+            other_worker.get_or_load('username', 'alice', load_from_lagging_replica)
+        self.assertEqual((len(loads), other_worker.hits), (2, 0))
+        
+        # 复制延迟窗口过后恢复缓存
+        later = time.monotonic() + 6
+        with mock.patch('app.services.user_cache.time.monotonic', return_value=later):
+            for _ in range(2):
+                other_worker.get_or_load('username', 'alice', load_from_lagging_replica)
+        self.assertEqual((len(loads), other_worker.hits), (3, 1))
+        
+    def test_bulk_import_users(self):
+        """测试批量导入跳过重复和不合法的记录"""
+        UserService.create_user('alice', 'alice@example.com', 'secret123')
+        records = [
+            {'username': f'user{i}', 'email': f'user{i}@example.com', 'password': 'secret123'}
+            for i in range(5)
+        ]
+        records += [
+            {'username': 'alice', 'email': 'other@example.com', 'password': 'secret123'},
+            {'username': 'user0', 'email': 'dup@example.com', 'password': 'secret123'},
+            {'username': 'carol', 'email': 'user1@example.com', 'password': 'secret123'},
+            {'username': 'dave', 'email': 'not-an-email', 'password': 'secret123'}
+        ]
+        result = UserService.bulk_import_users(records, batch_size=2)
+        self.assertEqual(result['total'], 9)
+        self.assertEqual(result['created'], 5)
+        self.assertEqual([item['row'] for item in result['skipped']], [6, 7, 8, 9])
+        self.assertTrue(UserService.authenticate('user3', 'secret123'))
+        
+    def test_bulk_import_parses_is_active(self):
+        """测试批量导入明确解析is_active，无法识别的取值作为错误行跳过"""
+        records = [
+            {'username': 'user0', 'email': 'user0@example.com', 'password': 'secret123', 'is_active': 'false'},
+            {'username': 'user1', 'email': 'user1@example.com', 'password': 'secret123', 'is_active': ' True '},
+            {'username': 'user2', 'email': 'user2@example.com', 'password': 'secret123', 'is_active': False},
+            {'username': 'user3', 'email': 'user3@example.com', 'password': 'secret123'},
+            {'username': 'user4', 'email': 'user4@example.com', 'password': 'secret123', 'is_active': 'off'},
+            {'username': 'user5', 'email': 'user5@example.com', 'password': 'secret123', 'is_active': 0}
+        ]
+        result = UserService.bulk_import_users(records)
+        self.assertEqual(result['created'], 4)
+        self.assertEqual([item['row'] for item in result['skipped']], [5, 6])
+        self.assertEqual(result['skipped'][0]['message'], 'is_active必须是true或false')
+        self.assertEqual(
+            [UserService.get_user_by_username(f'user{i}').is_active for i in range(4)],
+            [False, True, False, True]
+        )
+        
+    def test_import_and_export_endpoints(self):
+        """测试导入和流式导出接口"""
+        client = self.app.test_client()
+        response = client.post('/api/v1/auth/login', json={'username': 'admin', 'password': 'password'})
+        headers = {'Authorization': f"Bearer {response.json['access_token']}"}
+        
+        body = 'username,email,password\nbob,bob@example.com,secret123\ncarol,carol@example.com,secret123\n'
+        response = client.post('/api/v1/users/import', data=body, content_type='text/csv', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['created'], 2)
+        
+        body = '{"username": "dave", "email": "dave@example.com", "password": "secret123"}\n'
+        response = client.post('/api/v1/users/import', data=body, content_type='application/x-ndjson', headers=headers)
+        self.assertEqual(response.json['created'], 1)
+        
+        response = client.get('/api/v1/users/export', headers=headers)
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([line['username'] for line in lines], ['bob', 'carol', 'dave'])
+        self.assertNotIn('password_hash', lines[0])
+        
+        response = client.get('/api/v1/users/export?format=csv', headers=headers)
+        rows = response.get_data(as_text=True).splitlines()
+        self.assertEqual(rows[0], 'id,username,email,is_active,created_at,updated_at')
+        self.assertEqual(len(rows), 4)
+        
+if __name__ == '__main__':
+    unittest.main()
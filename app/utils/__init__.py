@@ -0,0 +1,6 @@
+"""
+工具函数模块
+"""
+
+from .digest import stable_digest
+from .process import is_process_alive
@@ -0,0 +1,29 @@
+"""
+稳定摘要工具
+"""
+import hashlib
+import json
+
+def canonical_json(obj):
+    """
+    将对象序列化为规范化JSON字符串（键排序、无多余空白）
+    
+    Args:
+        obj: 可JSON序列化的对象
+        
+    Returns:
+        str: 规范化JSON字符串
+    """
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+def stable_digest(obj):
+    """
+    计算对象的稳定摘要，相同内容在不同进程中得到相同结果
+    
+    Args:
+        obj: 可JSON序列化的对象
+        
+    Returns:
+        str: 十六进制摘要
+    """
+    return hashlib.sha256(canonical_json(obj).encode('utf-8')).hexdigest()
@@ -0,0 +1,25 @@
+"""
+进程工具
+"""
+import os
+
+def is_process_alive(pid):
+    """
+    判断本机上的进程是否存活
+    
+    Args:
+        pid (int): 进程ID
+    
+    Returns:
+        bool: 进程存在返回True
+    """
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # 进程存在但属于其他用户
+        return True
+    return True
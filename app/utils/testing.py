@@ -0,0 +1,51 @@
+"""
+测试辅助工具
+"""
+from contextlib import contextmanager
+
+from app.core.query_stats import capture
+
+class QueryBudgetMixin:
+    """
+    为unittest.TestCase提供SQL查询预算断言
+    
+    超出预算时列出实际发出的全部语句，便于定位N+1查询。
+    """
+    
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        """
+        断言代码块发出的SQL语句不超过预算
+        
+        Args:
+            budget (int): 允许的最大语句数
+        
+        Yields:
+            QueryCollector: 收集到的语句
+        """
+        with capture() as collector:
+            yield collector
+        if collector.count > budget:
+            statements = '\n'.join(
+                f'  {index}. {statement}' for index, (statement, _) in enumerate(collector.statements, start=1)
+            )
+            self.fail(f'发出了{collector.count}条SQL语句，超出预算{budget}条:\n{statements}')
+    
+    def assertEndpointQueryBudget(self, client, method, url, budget, **kwargs):
+        """
+        请求接口并断言其SQL语句数不超过预算（包括流式响应体生成期间的查询）
+        
+        Args:
+            client: Flask测试客户端
+            method (str): HTTP方法
+            url (str): 请求路径
+            budget (int): 允许的最大语句数
+            **kwargs: 传给测试客户端的其他参数
+        
+        Returns:
+            Response: 响应
+        """
+        with self.assertQueryBudget(budget):
+            response = client.open(url, method=method, **kwargs)
+            response.get_data()
+        return response
@@ -0,0 +1,95 @@
+"""
+响应压缩基准测试
+
+对典型响应体比较不同压缩级别的CPU耗时与节省的字节数：
+    - users_json:     GET /api/v1/users 形式的用户列表JSON
+    - users_ndjson:   GET /api/v1/users/export 形式的NDJSON（整体压缩）
+    - stream_ndjson:  同上，按行逐块压缩（与流式导出相同）
+    - stream_flush:   同上，每块之后同步刷新（与禁止缓冲的Agent流式响应相同）
+    - agent_json:     包含较长文本结果的Agent批量处理响应
+
+输出每种组合的压缩耗时（毫秒）、压缩率、节省的字节数以及每毫秒CPU节省的KB数，
+用于选择 COMPRESS_LEVEL 与 COMPRESS_MIN_SIZE。
+
+用法:
+    python benchmarks/bench_compression.py [--rows 5000] [--repeat 5] [--levels 1,6,9]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.compression import compress_body, compress_stream
+
+WORDS = 'agent process result input output stream batch cache token user model request'.split()
+
+def make_payloads(rows):
+    """构造典型响应体，返回 {名称: (字节块列表, 是否逐块压缩, 是否每块刷新)}"""
+    rng = random.Random(42)
+    users = [
+        {
+            'id': i + 1,
+            'username': f'user{i}',
+            'email': f'user{i}@example.com',
+            'is_active': i % 7 != 0,
+            'created_at': f'2025-01-{i % 28 + 1:02d}T{i % 24:02d}:{i % 60:02d}:00',
+            'updated_at': f'2025-02-{i % 28 + 1:02d}T{i % 24:02d}:{i % 60:02d}:00'
+        }
+        for i in range(rows)
+    ]
+    users_json = json.dumps({'status': 'success', 'users': users, 'next_cursor': None}).encode()
+    lines = [(json.dumps(user) + '\n').encode() for user in users]
+    results = [
+        {'index': i, 'status': 'success', 'result': ' '.join(rng.choice(WORDS) for _ in range(40))}
+        for i in range(rows // 10)
+    ]
+    agent_json = json.dumps({'status': 'success', 'results': results}, ensure_ascii=False).encode()
+    return {
+        'users_json': ([users_json], False, False),
+        'users_ndjson': ([b''.join(lines)], False, False),
+        'stream_ndjson': (lines, True, False),
+        'stream_flush': (lines, True, True),
+        'agent_json': ([agent_json], False, False)
+    }
+
+def best_of(repeat, func):
+    """返回多次运行的最短耗时（秒）与最后一次的结果"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description='响应压缩基准测试')
+    parser.add_argument('--rows', type=int, default=5000, help='用户行数')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数')
+    parser.add_argument('--levels', default='1,6,9', help='逗号分隔的压缩级别')
+    parser.add_argument('--encoding', default='gzip', choices=('gzip', 'deflate'), help='编码')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.levels.split(',')]
+    
+    print(f'rows={args.rows} encoding={args.encoding}')
+    print(f"{'payload':<16}{'level':>6}{'raw_KB':>10}{'out_KB':>10}{'ratio':>8}{'cpu_ms':>10}{'saved_KB/ms':>13}")
+    for name, (chunks, streamed, flush_each) in make_payloads(args.rows).items():
+        raw = sum(len(chunk) for chunk in chunks)
+        for level in levels:
+            if streamed:
+                func = lambda: b''.join(compress_stream(chunks, args.encoding, level, flush_each))
+            else:
+                func = lambda: compress_body(chunks[0], args.encoding, level)
+            elapsed, output = best_of(args.repeat, func)
+            saved = (raw - len(output)) / 1024
+            print(
+                f'{name:<16}{level:>6}{raw / 1024:>10.1f}{len(output) / 1024:>10.1f}'
+                f'{len(output) / raw:>8.2f}{elapsed * 1000:>10.2f}{saved / (elapsed * 1000):>13.1f}'
+            )
+
+if __name__ == '__main__':
+    main()
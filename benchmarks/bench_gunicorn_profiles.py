@@ -0,0 +1,174 @@
+"""
+Gunicorn运行配置负载基准测试
+
+依次以不同的配置启动 gunicorn -c gunicorn.conf.py run:app，对以下接口施加固定时长的并发负载：
+    - GET  /api/v1/ping
+    - POST /api/v1/agents/process（demo Agent，每个请求使用不同输入以绕过结果缓存）
+
+比较的配置：
+    - sync:          sync工作进程，不预加载（与原Dockerfile的 gunicorn -w 4 相同）
+    - sync-preload:  sync工作进程，预加载应用
+    - gthread:       gthread工作进程（每进程4线程），预加载应用
+
+输出每种配置的启动耗时、各接口的吞吐量、p50/p99延迟和错误数。负载由本进程的线程产生，
+绝对数值受客户端自身开销影响，用于在同一台机器上比较不同配置。
+
+用法:
+    python benchmarks/bench_gunicorn_profiles.py [--workers 4] [--concurrency 16] [--duration 5]
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = {
+    'sync': {'GUNICORN_WORKER_CLASS': 'sync', 'GUNICORN_PRELOAD': 'false'},
+    'sync-preload': {'GUNICORN_WORKER_CLASS': 'sync', 'GUNICORN_PRELOAD': 'true'},
+    'gthread': {'GUNICORN_WORKER_CLASS': 'gthread', 'GUNICORN_PRELOAD': 'true', 'GUNICORN_THREADS': '4'}
+}
+
+def free_port():
+    """获取一个空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def request(port, method, path, body=None, headers=None):
+    """发送一个请求，返回 (状态码, 响应体)"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+def wait_ready(port, process, timeout=30):
+    """等待服务可以响应"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn 启动失败')
+        try:
+            if request(port, 'GET', '/health')[0] == 200:
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError('gunicorn 启动超时')
+
+def run_load(port, concurrency, duration, make_request):
+    """并发施加负载，返回 (请求数, 错误数, 延迟列表)"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.time() + duration
+    
+    def loop(index):
+        local = []
+        local_errors = 0
+        n = 0
+        while time.time() < deadline:
+            method, path, body, headers = make_request(index, n)
+            n += 1
+            start = time.perf_counter()
+            try:
+                status, _ = request(port, method, path, body, headers)
+                if status >= 400:
+                    local_errors += 1
+            except OSError:
+                local_errors += 1
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+    
+    threads = [threading.Thread(target=loop, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies), errors[0], sorted(latencies)
+
+def percentile(values, fraction):
+    """计算百分位数（毫秒）"""
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * fraction), len(values) - 1)] * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Gunicorn运行配置负载基准测试')
+    parser.add_argument('--workers', type=int, default=4, help='工作进程数')
+    parser.add_argument('--concurrency', type=int, default=16, help='并发客户端线程数')
+    parser.add_argument('--duration', type=float, default=5.0, help='每个接口的负载秒数')
+    parser.add_argument('--profiles', default=','.join(PROFILES), help='逗号分隔的配置名')
+    args = parser.parse_args()
+    
+    state_dir = tempfile.mkdtemp(prefix='bench_gunicorn_')
+    env = dict(
+        os.environ,
+        FLASK_CONFIG='development',
+        DEV_DATABASE_URL=f'sqlite:///{os.path.join(state_dir, "bench.db")}',
+        LOCAL_STATE_DIR=state_dir,
+        GUNICORN_WORKERS=str(args.workers),
+        GUNICORN_LOGLEVEL='warning'
+    )
+    # 在独立进程中建表，避免本进程导入应用
+    subprocess.check_call([
+        sys.executable, '-c',
+        'from app import create_app\n'
+        'from app.core.extensions import db\n'
+        'app = create_app("development")\n'
+        'app.app_context().push()\n'
+        'db.create_all()\n'
+    ], cwd=ROOT, env=env)
+    
+    print(f'workers={args.workers} concurrency={args.concurrency} duration={args.duration}s')
+    print(f"{'profile':<14}{'endpoint':<22}{'startup_s':>10}{'req/s':>10}{'p50_ms':>10}{'p99_ms':>10}{'errors':>8}")
+    for name in args.profiles.split(','):
+        port = free_port()
+        profile_env = dict(env, GUNICORN_BIND=f'127.0.0.1:{port}', **PROFILES[name])
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'run:app'],
+            cwd=ROOT, env=profile_env
+        )
+        try:
+            wait_ready(port, process)
+            startup = time.perf_counter() - start
+            
+            _, body = request(
+                port, 'POST', '/api/v1/auth/login',
+                json.dumps({'username': 'admin', 'password': 'password'}),
+                {'Content-Type': 'application/json'}
+            )
+            token = json.loads(body)['access_token']
+            process_headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {token}'}
+            
+            endpoints = {
+                'GET /ping': lambda i, n: ('GET', '/api/v1/ping', None, {}),
+                'POST /agents/process': lambda i, n: (
+                    'POST', '/api/v1/agents/process',
+                    json.dumps({'agent_type': 'demo', 'input': f'hello {i} {n}'}),
+                    process_headers
+                )
+            }
+            for endpoint, make_request in endpoints.items():
+                count, errors, latencies = run_load(port, args.concurrency, args.duration, make_request)
+                print(
+                    f'{name:<14}{endpoint:<22}{startup:>10.2f}{count / args.duration:>10.0f}'
+                    f'{percentile(latencies, 0.5):>10.2f}{percentile(latencies, 0.99):>10.2f}{errors:>8}'
+                )
+        finally:
+            process.terminate()
+            process.wait()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+请求指标开销基准测试
+
+1. 端到端：分别在关闭指标、开启指标（单进程）和开启指标并写入多进程快照
+   （METRICS_DIR）三种配置下，通过测试客户端交替多轮请求 /api/v1/ping，
+   取每种配置各轮的最小平均耗时进行比较。
+2. 钩子本身：在请求上下文中直接调用指标的 before/after 钩子，测量每个请求
+   增加的CPU时间，排除测试客户端自身的噪声。
+
+用法:
+    python benchmarks/bench_metrics_overhead.py [--requests 5000] [--rounds 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Response
+from app import create_app
+from app.config.config import TestingConfig, config
+from app.core.metrics import RequestMetrics
+
+def build_app(name, metrics_enabled, metrics_dir=None):
+    """创建指定指标配置的应用"""
+    class BenchConfig(TestingConfig):
+        METRICS_ENABLED = metrics_enabled
+        METRICS_DIR = metrics_dir
+    
+    config[name] = BenchConfig
+    return create_app(name)
+
+def run_client(app, requests):
+    """返回每个请求的平均耗时（微秒）"""
+    client = app.test_client()
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get('/api/v1/ping')
+    return (time.perf_counter() - start) / requests * 1e6
+
+def run_hooks(app, metrics, requests):
+    """直接调用指标钩子，返回每个请求的平均开销（微秒）"""
+    response = Response('pong')
+    with app.test_request_context('/api/v1/ping'):
+        start = time.perf_counter()
+        for _ in range(requests):
+            metrics._before_request()
+            metrics._after_request(response)
+        return (time.perf_counter() - start) / requests * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description='请求指标开销基准测试')
+    parser.add_argument('--requests', type=int, default=5000, help='每轮请求数')
+    parser.add_argument('--rounds', type=int, default=5, help='交替轮数')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as metrics_dir:
+        apps = {
+            'metrics关闭': build_app('bench_off', False),
+            'metrics开启(单进程)': build_app('bench_memory', True),
+            'metrics开启(METRICS_DIR)': build_app('bench_multiprocess', True, metrics_dir)
+        }
+        for app in apps.values():
+            run_client(app, 500)
+        best = {name: float('inf') for name in apps}
+        for _ in range(args.rounds):
+            for name, app in apps.items():
+                best[name] = min(best[name], run_client(app, args.requests))
+        
+        hook_app = build_app('bench_hooks', False)
+        in_memory = RequestMetrics()
+        multiprocess = RequestMetrics()
+        multiprocess.directory = metrics_dir
+        hook_memory = run_hooks(hook_app, in_memory, args.requests * args.rounds)
+        hook_multiprocess = run_hooks(hook_app, multiprocess, args.requests * args.rounds)
+    
+    baseline = best['metrics关闭']
+    print('端到端（测试客户端，各轮最小值）')
+    print(f"{'配置':<28}{'平均耗时(us)':>14}{'额外开销(us)':>14}")
+    for name, value in best.items():
+        print(f"{name:<28}{value:>14.1f}{value - baseline:>14.1f}")
+    print()
+    print('指标钩子本身')
+    print(f"{'单进程':<28}{hook_memory:>14.2f} us/请求")
+    print(f"{'METRICS_DIR（每秒写一次快照）':<28}{hook_multiprocess:>14.2f} us/请求")
+
+if __name__ == '__main__':
+    main()
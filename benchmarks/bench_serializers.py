@@ -0,0 +1,83 @@
+"""
+序列化性能基准测试
+
+在内存中构造10000个User对象，比较以下方式序列化整个列表的耗时：
+    - UserSchema().dump(users, many=True)
+    - [user.to_dict() for user in users]
+    - 编译后的模式dump函数（与UserSchema输出一致）
+    - 编译后的模型dump函数（dump_many）
+    - FastJSONProvider直接序列化模型列表为JSON字符串（含JSON编码）
+
+用法:
+    python benchmarks/bench_serializers.py [--users 10000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.core.serialization import dump_many, get_schema_dumper
+from app.models import User
+
+def make_users(count):
+    """构造不触发密码哈希的用户对象"""
+    manager = User.__mapper__.class_manager
+    now = datetime(2025, 1, 1)
+    users = []
+    for i in range(count):
+        user = manager.new_instance()
+        user.id = i + 1
+        user.username = f'user{i}'
+        user.email = f'user{i}@example.com'
+        user.password_hash = 'x'
+        user.is_active = True
+        user.created_at = now + timedelta(seconds=i)
+        user.updated_at = now + timedelta(seconds=i)
+        users.append(user)
+    return users
+
+def best_of(repeat, func):
+    """返回多次运行的最短耗时（毫秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='序列化性能基准测试')
+    parser.add_argument('--users', type=int, default=10000, help='用户数量')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数')
+    args = parser.parse_args()
+    
+    app = create_app('testing')
+    with app.app_context():
+        from app.schemas import UserSchema
+        
+        users = make_users(args.users)
+        schema = UserSchema()
+        schema_dumper = get_schema_dumper(schema)
+        assert [schema_dumper(u) for u in users[:10]] == schema.dump(users[:10], many=True)
+        
+        results = [
+            ('UserSchema().dump(many=True)', best_of(args.repeat, lambda: schema.dump(users, many=True))),
+            ('to_dict', best_of(args.repeat, lambda: [u.to_dict() for u in users])),
+            ('编译模式dump函数', best_of(args.repeat, lambda: [schema_dumper(u) for u in users])),
+            ('编译模型dump函数(dump_many)', best_of(args.repeat, lambda: dump_many(users))),
+            ('FastJSONProvider.dumps(模型列表)', best_of(args.repeat, lambda: app.json.dumps(users))),
+            ('json.dumps(to_dict列表)', best_of(args.repeat, lambda: app.json.dumps([u.to_dict() for u in users])))
+        ]
+    
+    baseline = results[0][1]
+    print(f"{args.users} 个用户，取 {args.repeat} 次最优值")
+    print(f"{'方式':<36}{'耗时(ms)':>12}{'相对marshmallow':>18}")
+    for name, elapsed in results:
+        print(f"{name:<36}{elapsed:>12.2f}{baseline / elapsed:>17.1f}x")
+
+if __name__ == '__main__':
+    main()
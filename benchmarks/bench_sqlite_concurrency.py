@@ -0,0 +1,117 @@
+"""
+SQLite多进程读写基准测试
+
+模拟多个gunicorn工作进程共享同一个SQLite文件：每个进程在固定时长内按给定写比例
+混合执行按主键查询和单行插入（每次写入单独提交），分别在以下两种配置下运行：
+    - baseline: SQLAlchemy默认引擎（回滚日志模式，pysqlite默认的5秒锁等待）
+    - tuned:    应用的SQLite性能设置（WAL、busy_timeout、synchronous=NORMAL、mmap、cache_size）
+
+输出每种配置的总吞吐量、读写各自的完成数以及 "database is locked" 错误数。
+
+用法:
+    python benchmarks/bench_sqlite_concurrency.py [--workers 4] [--duration 5] [--write-ratio 0.2]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.database import install_sqlite_pragmas, sqlite_settings
+
+SEED_ROWS = 10000
+
+def make_engine(path, tuned):
+    """创建引擎，tuned为True时安装应用的SQLite设置"""
+    engine = create_engine(f'sqlite:///{path}')
+    if tuned:
+        install_sqlite_pragmas(engine, sqlite_settings({}))
+    return engine
+
+def seed(path, tuned):
+    """建表并写入初始数据"""
+    engine = make_engine(path, tuned)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, payload TEXT)'))
+        conn.execute(
+            text('INSERT INTO items (name, payload) VALUES (:name, :payload)'),
+            [{'name': f'item{i}', 'payload': 'x' * 200} for i in range(SEED_ROWS)]
+        )
+    engine.dispose()
+
+def worker(path, tuned, duration, write_ratio, start_at, results):
+    """单个工作进程的读写循环"""
+    engine = make_engine(path, tuned)
+    rng = random.Random(os.getpid())
+    reads = writes = locked = 0
+    while time.time() < start_at:
+        time.sleep(0.001)
+    deadline = start_at + duration
+    while time.time() < deadline:
+        try:
+            if rng.random() < write_ratio:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text('INSERT INTO items (name, payload) VALUES (:name, :payload)'),
+                        {'name': f'w{os.getpid()}', 'payload': 'y' * 200}
+                    )
+                writes += 1
+            else:
+                with engine.connect() as conn:
+                    conn.execute(
+                        text('SELECT name, payload FROM items WHERE id = :id'),
+                        {'id': rng.randint(1, SEED_ROWS)}
+                    ).first()
+                reads += 1
+        except OperationalError as e:
+            if 'locked' not in str(e) and 'busy' not in str(e):
+                raise
+            locked += 1
+    engine.dispose()
+    results.put((reads, writes, locked))
+
+def run(mode, workers, duration, write_ratio):
+    """运行一种配置，返回 (读数, 写数, 锁错误数)"""
+    tuned = mode == 'tuned'
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f'{mode}.db')
+        seed(path, tuned)
+        results = multiprocessing.Queue()
+        start_at = time.time() + 0.5
+        processes = [
+            multiprocessing.Process(target=worker, args=(path, tuned, duration, write_ratio, start_at, results))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        totals = [0, 0, 0]
+        for _ in processes:
+            for i, value in enumerate(results.get()):
+                totals[i] += value
+        for process in processes:
+            process.join()
+        return totals
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite多进程读写基准测试')
+    parser.add_argument('--workers', type=int, default=4, help='进程数')
+    parser.add_argument('--duration', type=float, default=5.0, help='每种配置运行秒数')
+    parser.add_argument('--write-ratio', type=float, default=0.2, help='写操作比例')
+    args = parser.parse_args()
+    
+    print(f'workers={args.workers} duration={args.duration}s write_ratio={args.write_ratio}')
+    print(f"{'mode':<10}{'ops/s':>12}{'reads':>12}{'writes':>12}{'locked':>12}")
+    for mode in ('baseline', 'tuned'):
+        reads, writes, locked = run(mode, args.workers, args.duration, args.write_ratio)
+        ops = (reads + writes) / args.duration
+        print(f'{mode:<10}{ops:>12.0f}{reads:>12}{writes:>12}{locked:>12}')
+
+if __name__ == '__main__':
+    main()
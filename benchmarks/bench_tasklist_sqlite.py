@@ -0,0 +1,133 @@
+"""
+任务列表SQLite后端基准测试
+
+按给定的行数（默认1万和100万）生成任务文件，导入SQLite数据库后统计：
+    - 导入耗时和数据库大小
+    - query_tasks 分页查询（首页和翻页）的耗时，与内存中的 TaskStore 对比
+    - search_tasks 全文搜索的耗时
+    - get_tasklist 单个分类的输出耗时（SQLite后端每次查询数据库，TaskStore 使用缓存的文本）
+
+用法:
+    python benchmarks/bench_tasklist_sqlite.py [--rows 10000,1000000] [--calls 200]
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mcps', 'server'))
+
+from task_db import SqliteTaskStore, import_csv
+from task_store import CSV_COLUMNS, TaskStore
+
+CATEGORIES = ['Work', 'Personal', 'Fitness', 'Learning', 'Finance', 'Travel', 'Health', 'Home']
+
+# 任务主题词
+TOPICS = [
+    'client', 'presentation', 'report', 'meeting', 'budget', 'review', 'draft', 'invoice', 'slides',
+    'quarterly', 'project', 'update', 'groceries', 'workout', 'course', 'chapter', 'flight', 'hotel',
+    'doctor', 'appointment', 'garden', 'repair', 'taxes', 'savings', 'interview', 'proposal', 'deadline',
+    'contract', 'design', 'release', 'backup', 'dentist', 'yoga', 'marathon', 'recipe', 'birthday'
+]
+
+QUERIES = [
+    ('category', {'category': 'work'}, None, None, 'due_date'),
+    ('status by priority', {'status': 'in progress'}, None, None, 'priority'),
+    ('2 filters + range', {'category': 'travel', 'priority': 'high'}, '2025-06-01', '2025-06-30', 'due_date'),
+    ('range only', {}, '2025-03-01', '2025-03-07', 'due_date'),
+]
+
+# 描述中的其他词：按Zipf分布从较大的词表中抽取，接近真实文本中词频的长尾
+VOCABULARY = [f'w{i}' for i in range(20000)]
+VOCABULARY_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+
+SEARCHES = ['client presentation', 'quarterly report', 'dentist', 'proj', 'w17', 'w5000']
+
+def generate_csv(path, rows):
+    """生成测试用任务文件"""
+    rng = random.Random(42)
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_COLUMNS)
+        for i in range(rows):
+            writer.writerow([
+                rng.choice(CATEGORIES),
+                ' '.join(rng.sample(TOPICS, 2)).title(),
+                ' '.join(rng.sample(TOPICS, 2) + rng.choices(VOCABULARY, cum_weights=VOCABULARY_WEIGHTS, k=10)),
+                f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+                rng.choice(['High', 'Medium', 'Low']),
+                rng.choice(['Not Started', 'In Progress', 'Completed'])
+            ])
+
+def timed(func, calls):
+    """返回每次调用的耗时（毫秒，已排序）"""
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)
+
+def describe(name, latencies):
+    """输出耗时统计"""
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+    print(f'{name:<36}{len(latencies):>8}{p50:>12.3f}{p99:>12.3f}')
+
+def paged(view, filters, due_from, due_to, sort_by):
+    """返回依次翻页的查询函数（到最后一页后从头开始）"""
+    state = {'after': None}
+
+    def next_page():
+        _, state['after'] = view.query(filters, due_from, due_to, sort_by, 20, state['after'])
+
+    return next_page
+
+def run(rows, calls, directory):
+    """对一种行数执行全部测试"""
+    csv_path = os.path.join(directory, f'task-{rows}.csv')
+    db_path = os.path.join(directory, f'tasks-{rows}.db')
+    generate_csv(csv_path, rows)
+    start = time.perf_counter()
+    import_csv(csv_path, db_path)
+    print(f'\n{rows} rows: import {time.perf_counter() - start:.1f}s, '
+          f'database {os.path.getsize(db_path) / 1024 / 1024:.1f} MiB')
+
+    sqlite_view = asyncio.run(SqliteTaskStore(db_path).snapshot())
+    start = time.perf_counter()
+    memory_view = asyncio.run(TaskStore(csv_path).snapshot())
+    print(f'TaskStore load {time.perf_counter() - start:.1f}s')
+
+    print(f"{'case':<36}{'calls':>8}{'p50_ms':>12}{'p99_ms':>12}")
+    for name, filters, due_from, due_to, sort_by in QUERIES:
+        for backend, view in (('sqlite', sqlite_view), ('memory', memory_view)):
+            # 第一次查询会生成 TaskStore 的有序索引，先执行一次再计时
+            view.query(filters, due_from, due_to, sort_by, 20)
+            describe(f'{backend} query {name}', timed(lambda: view.query(filters, due_from, due_to, sort_by, 20), calls))
+            describe(f'{backend} page {name}', timed(paged(view, filters, due_from, due_to, sort_by), calls))
+    for text in SEARCHES:
+        describe(f"sqlite search '{text}'", timed(lambda: sqlite_view.search(text, None, 20), calls))
+    describe('sqlite search + category', timed(lambda: sqlite_view.search('client', 'work', 20), calls))
+
+    render_calls = max(calls // 20, 3)
+    describe('sqlite get_tasklist category', timed(lambda: sqlite_view.render('finance'), render_calls))
+    memory_view.render('finance')
+    describe('memory get_tasklist category', timed(lambda: memory_view.render('finance'), render_calls))
+
+def main():
+    parser = argparse.ArgumentParser(description='任务列表SQLite后端基准测试')
+    parser.add_argument('--rows', default='10000,1000000', help='任务行数，逗号分隔')
+    parser.add_argument('--calls', type=int, default=200, help='每种查询的调用次数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in (int(value) for value in args.rows.split(',')):
+            run(rows, args.calls, directory)
+
+if __name__ == '__main__':
+    main()
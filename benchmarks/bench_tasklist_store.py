@@ -0,0 +1,168 @@
+"""
+任务列表MCP服务器查询基准测试
+
+生成一个包含大量任务的CSV文件，比较 get_tasklist 的单次调用耗时：
+    - legacy: 原实现，每次调用都用 csv.DictReader 重新读取并解析整个文件
+    - store:  TaskStore，首次调用加载并建立分类索引，之后文件未变化时直接使用内存索引
+
+同时给出 store 的首次加载耗时，以及文件变化后（在线程中）重新加载的耗时，
+并统计 query_tasks 使用有序索引分页查询的耗时（首次使用的有序索引需要排序，单独统计）。
+
+修改任务时比较：
+    - rewrite: 每次修改都重写整个 task.csv（临时文件 + fsync + 原子替换）
+    - log:     TaskStore.update，追加一行日志并fsync，同时更新内存中的索引
+以及把日志压缩进 task.csv 的耗时（在后台执行，期间写入照常进行）。
+
+用法:
+    python benchmarks/bench_tasklist_store.py [--rows 1000000] [--calls 200] [--legacy-calls 3]
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mcps', 'server'))
+
+from task_store import CSV_COLUMNS, TaskStore
+
+CATEGORIES = ['Work', 'Personal', 'Fitness', 'Learning', 'Finance', 'Travel', 'Health', 'Home']
+
+def generate_csv(path, rows):
+    """生成测试用任务文件"""
+    rng = random.Random(42)
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_COLUMNS)
+        for i in range(rows):
+            writer.writerow([
+                rng.choice(CATEGORIES),
+                f'Task {i}',
+                f'Description of task {i}',
+                f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+                rng.choice(['High', 'Medium', 'Low']),
+                rng.choice(['Not Started', 'In Progress', 'Completed'])
+            ])
+
+async def legacy_get_tasklist(csv_path, category):
+    """原实现（每次调用读取并解析整个文件）"""
+    if not os.path.exists(csv_path):
+        raise ValueError(f"Task file not found: {csv_path}")
+    tasks = []
+    with open(csv_path, 'r', encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            if category.lower() == 'all' or row['Category'].lower() == category.lower():
+                task_info = f"{row['Task Name']} - {row['Description']} (Due: {row['Due Date']}, Priority: {row['Priority']}, Status: {row['Status']})"
+                tasks.append(task_info)
+    if not tasks and category.lower() != 'all':
+        return f"No tasks found for category: {category}"
+    return f"Tasks for category '{category}':\n" + "\n".join(tasks)
+
+async def store_get_tasklist(store, category):
+    """新实现（与 tasklist.get_tasklist 相同）"""
+    snapshot = await store.snapshot()
+    tasks = snapshot.render(category)
+    if not tasks and category.lower() != 'all':
+        return f"No tasks found for category: {category}"
+    return f"Tasks for category '{category}':\n" + tasks
+
+async def measure(func, calls):
+    """返回每次调用的耗时（毫秒，已排序）"""
+    latencies = []
+    for i in range(calls):
+        category = CATEGORIES[i % len(CATEGORIES)].lower()
+        start = time.perf_counter()
+        await func(category)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)
+
+def describe(name, latencies):
+    """输出耗时统计"""
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+    print(f'{name:<28}{len(latencies):>8}{p50:>12.3f}{p99:>12.3f}')
+
+async def run(args, path):
+    print(f"{'case':<28}{'calls':>8}{'p50_ms':>12}{'p99_ms':>12}")
+    legacy = await measure(lambda category: legacy_get_tasklist(path, category), args.legacy_calls)
+    describe('legacy', legacy)
+    
+    store = TaskStore(path)
+    start = time.perf_counter()
+    await store_get_tasklist(store, 'work')
+    print(f"{'store first call (load)':<28}{1:>8}{(time.perf_counter() - start) * 1000:>12.3f}")
+    # 首轮调用会生成各分类的输出文本，单独统计
+    describe('store first per category', await measure(lambda c: store_get_tasklist(store, c), len(CATEGORIES)))
+    describe('store steady state', await measure(lambda c: store_get_tasklist(store, c), args.calls))
+    
+    
+    snapshot = await store.snapshot()
+    queries = [
+        ('query category', {'category': 'work'}, None, None, 'due_date'),
+        ('query status prio', {'status': 'in progress'}, None, None, 'priority'),
+        ('query 2 filters+range', {'category': 'travel', 'priority': 'high'}, '2025-06-01', '2025-06-30', 'due_date'),
+        ('query range only', {}, '2025-03-01', '2025-03-07', 'due_date'),
+    ]
+    for name, filters, due_from, due_to, sort_by in queries:
+        start = time.perf_counter()
+        snapshot.query(filters, due_from, due_to, sort_by, 20)
+        print(f"{name + ' (index)':<28}{1:>8}{(time.perf_counter() - start) * 1000:>12.3f}")
+        latencies = []
+        after = None
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            _, after = snapshot.query(filters, due_from, due_to, sort_by, 20, after)
+            latencies.append((time.perf_counter() - start) * 1000)
+        describe(name, sorted(latencies))
+    
+    # 修改文件后，下一次调用在线程中重新加载
+    with open(path, 'a', encoding='utf-8', newline='') as file:
+        csv.writer(file).writerow(['Work', 'Extra', 'Appended task', '2025-12-31', 'Low', 'Not Started'])
+    start = time.perf_counter()
+    await store_get_tasklist(store, 'work')
+    print(f"{'store after file change':<28}{1:>8}{(time.perf_counter() - start) * 1000:>12.3f}")
+    
+    snapshot = await store.snapshot()
+    latencies = []
+    for i in range(args.legacy_calls):
+        start = time.perf_counter()
+        tasks = list(snapshot.tasks)
+        tasks[i] = tasks[i]._replace(status='Completed')
+        store._write_csv(tasks)
+        latencies.append((time.perf_counter() - start) * 1000)
+    os.remove(path + '.compacting')
+    describe('rewrite csv per edit', sorted(latencies))
+    
+    store.compact_after = args.calls + 1
+    rng = random.Random(7)
+    latencies = []
+    for _ in range(args.calls):
+        start = time.perf_counter()
+        await store.update(rng.randint(1, len(snapshot.tasks)), {'status': rng.choice(['Completed', 'In Progress'])})
+        latencies.append((time.perf_counter() - start) * 1000)
+    describe('store update (log + fsync)', sorted(latencies))
+    start = time.perf_counter()
+    await store.compact()
+    print(f"{'store compaction':<28}{1:>8}{(time.perf_counter() - start) * 1000:>12.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='任务列表MCP服务器查询基准测试')
+    parser.add_argument('--rows', type=int, default=1000000, help='任务行数')
+    parser.add_argument('--calls', type=int, default=200, help='新实现的调用次数')
+    parser.add_argument('--legacy-calls', type=int, default=3, help='原实现的调用次数')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'task.csv')
+        start = time.perf_counter()
+        generate_csv(path, args.rows)
+        print(f'generated {args.rows} rows ({os.path.getsize(path) / 1024 / 1024:.1f} MiB) '
+              f'in {time.perf_counter() - start:.1f}s')
+        asyncio.run(run(args, path))
+
+if __name__ == '__main__':
+    main()
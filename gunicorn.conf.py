@@ -0,0 +1,110 @@
+"""
+Gunicorn运行配置
+
+用法:
+    gunicorn -c gunicorn.conf.py run:app
+
+所有参数都可以通过环境变量覆盖：
+    GUNICORN_BIND                监听地址，默认 0.0.0.0:5000
+    GUNICORN_WORKERS             工作进程数，默认 CPU核数 * 2 + 1（上限 GUNICORN_MAX_WORKERS，默认12）
+    GUNICORN_WORKER_CLASS        sync 或 gthread，默认 sync
+    GUNICORN_THREADS             gthread模式下每个工作进程的线程数，默认4
+    GUNICORN_PRELOAD             是否在主进程中预加载应用，默认 true
+    GUNICORN_MAX_REQUESTS        工作进程处理多少请求后重启，默认1000，0表示不重启
+    GUNICORN_MAX_REQUESTS_JITTER 重启阈值的随机抖动，默认为 max_requests 的10%
+    GUNICORN_TIMEOUT             请求超时秒数，默认30
+    GUNICORN_KEEPALIVE           keep-alive秒数，默认5
+    METRICS_DIR                  工作进程共享的指标目录，默认为本次运行创建的临时目录
+    PASSWORD_HASH_INLINE         密码哈希是否在请求线程中直接计算，sync模式默认 true，gthread模式默认 false
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    return value.lower() in ('1', 'true', 'yes') if value not in (None, '') else default
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# 工作进程数按CPU核数推导；容器中CPU核数可能远大于配额，设置上限
+workers = _env_int(
+    'GUNICORN_WORKERS',
+    min(multiprocessing.cpu_count() * 2 + 1, _env_int('GUNICORN_MAX_WORKERS', 12))
+)
+
+# sync适合CPU密集的请求；gthread在等待数据库、下游服务或流式响应时能同时处理多个请求
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+if worker_class not in ('sync', 'gthread'):
+    raise ValueError(f'GUNICORN_WORKER_CLASS 必须是 sync 或 gthread，实际为 {worker_class}')
+threads = _env_int('GUNICORN_THREADS', 4) if worker_class == 'gthread' else 1
+
+# sync工作进程同时只处理一个请求，密码哈希直接在请求线程中计算，不经过线程池
+os.environ.setdefault('PASSWORD_HASH_INLINE', 'true' if worker_class == 'sync' else 'false')
+
+# 在主进程中导入应用一次，工作进程通过fork共享已导入模块的内存页，启动更快
+preload_app = _env_bool('GUNICORN_PRELOAD', True)
+
+# 定期重启工作进程以回收内存碎片；加入随机抖动，避免所有工作进程同时重启
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)
+
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+# 多个工作进程通过共享目录汇总请求指标；应用配置从环境变量读取，需要在加载应用之前设置
+_created_metrics_dir = None
+if not os.environ.get('METRICS_DIR'):
+    _created_metrics_dir = os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='gunicorn-metrics-')
+
+def on_starting(server):
+    """启动前合并上次运行遗留的快照文件，避免与本次的工作进程pid冲突"""
+    from app.core.metrics import fold_worker_snapshot
+    
+    directory = os.environ['METRICS_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        pid = name[len('metrics_'):-len('.json')]
+        if name.startswith('metrics_') and name.endswith('.json') and pid.isdigit():
+            fold_worker_snapshot(directory, int(pid))
+
+def on_exit(server):
+    """删除为本次运行创建的临时指标目录"""
+    if _created_metrics_dir:
+        shutil.rmtree(_created_metrics_dir, ignore_errors=True)
+
+def post_fork(server, worker):
+    """
+    工作进程fork之后丢弃从主进程继承的数据库连接池
+    
+    其余按进程持有的状态（本机共享存储连接、密码哈希线程池、请求指标等）
+    会在检测到pid变化时自行重建。
+    """
+    if not preload_app:
+        return
+    from app.core.database import dispose_engines
+    from app.core.extensions import db
+    
+    dispose_engines(server.app.wsgi(), db)
+
+def worker_exit(server, worker):
+    """工作进程退出前写入最终的指标快照"""
+    from app.core.metrics import request_metrics
+    
+    request_metrics.flush()
+
+def child_exit(server, worker):
+    """回收工作进程后把它的指标计入汇总文件并删除快照，pid被复用时计数不会倒退"""
+    from app.core.metrics import fold_worker_snapshot
+    
+    fold_worker_snapshot(os.environ['METRICS_DIR'], worker.pid)
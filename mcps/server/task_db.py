@@ -0,0 +1,447 @@
+"""
+任务存储（SQLite后端）
+
+任务保存在SQLite数据库中，分类、优先级、状态和截止日期上建有复合索引，
+Task Name 与 Description 上建有FTS5全文索引。接口与 task_store.TaskStore 相同，
+适合几十万行以上、无法整体放入内存的任务表。
+
+数据库由一次性的CSV导入生成：
+    python task_db.py import task.csv tasks.db
+"""
+import argparse
+import asyncio
+import csv
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from task_store import CSV_COLUMNS, FILTER_FIELDS, PRIORITY_RANK, Task, new_task, normalize_fields, to_thread
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL,
+    due_date TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    status TEXT NOT NULL,
+    category_key TEXT NOT NULL,
+    priority_key TEXT NOT NULL,
+    status_key TEXT NOT NULL,
+    priority_rank INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+    name, description, content='tasks', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+# 导入完成后再建立的索引（先插入后建索引比逐行维护索引快得多）
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS ix_tasks_due ON tasks (due_date, id);
+CREATE INDEX IF NOT EXISTS ix_tasks_priority ON tasks (priority_rank, due_date, id);
+CREATE INDEX IF NOT EXISTS ix_tasks_category_due ON tasks (category_key, due_date, id);
+CREATE INDEX IF NOT EXISTS ix_tasks_category_priority ON tasks (category_key, priority_rank, due_date, id);
+CREATE INDEX IF NOT EXISTS ix_tasks_priority_due ON tasks (priority_key, due_date, id);
+CREATE INDEX IF NOT EXISTS ix_tasks_status_due ON tasks (status_key, due_date, id);
+CREATE INDEX IF NOT EXISTS ix_tasks_status_priority ON tasks (status_key, priority_rank, due_date, id);
+CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO tasks_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+    INSERT INTO tasks_fts (tasks_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF name, description ON tasks BEGIN
+    INSERT INTO tasks_fts (tasks_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    INSERT INTO tasks_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+END;
+"""
+
+_TASK_COLUMNS = 'category, name, description, due_date, priority, status'
+
+_INSERT = (
+    f'INSERT INTO tasks ({_TASK_COLUMNS}, category_key, priority_key, status_key, priority_rank) '
+    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+)
+
+# 排序方式 -> 排序列（与 TaskSnapshot.sort_key 的排序键一一对应，id 代替文件中的位置）
+_ORDER_COLUMNS = {
+    'due_date': ('due_date', 'id'),
+    'priority': ('priority_rank', 'due_date', 'id')
+}
+
+# 搜索词：按Unicode单词切分，每个词作为一个带引号的短语，避免用户输入被解析为FTS5查询语法
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+# 搜索结果排序时 Task Name 相对 Description 的权重
+NAME_WEIGHT = 10.0
+
+def task_row(task: Task) -> tuple:
+    """
+    把任务转换为 tasks 表的一行（不含id）
+    
+    Args:
+        task: 任务
+    
+    Returns:
+        tuple: 列值
+    """
+    return (
+        *task, task.category.lower(), task.priority.lower(), task.status.lower(),
+        PRIORITY_RANK.get(task.priority.lower(), len(PRIORITY_RANK))
+    )
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    打开任务数据库
+    
+    Args:
+        path: 数据库文件路径
+    
+    Returns:
+        sqlite3.Connection: 数据库连接
+    """
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA mmap_size=268435456')
+    return conn
+
+def import_csv(csv_path: str, db_path: str, batch_size: int = 10000) -> int:
+    """
+    把CSV任务文件一次性导入为新的数据库
+    
+    先写入同目录下的临时文件，完成后原子替换目标文件，导入失败不影响已有数据库。
+    
+    Args:
+        csv_path: CSV文件路径
+        db_path: 数据库文件路径
+        batch_size: 每批插入的行数
+    
+    Returns:
+        int: 导入的任务数
+    
+    Raises:
+        ValueError: CSV文件不存在或缺少列
+    """
+    if not os.path.exists(csv_path):
+        raise ValueError(f"Task file not found: {csv_path}")
+    temp_path = f"{db_path}.importing-{os.getpid()}"
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(temp_path + suffix):
+            os.remove(temp_path + suffix)
+    
+    count = 0
+    conn = sqlite3.connect(temp_path, isolation_level=None)
+    try:
+        # 临时文件导入失败会被丢弃，不需要日志
+        conn.execute('PRAGMA journal_mode=OFF')
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.executescript(_SCHEMA)
+        with open(csv_path, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            header = next(reader, None) or []
+            missing = [column for column in CSV_COLUMNS if column not in header]
+            if missing:
+                raise ValueError(f"Task file is missing columns: {', '.join(missing)}")
+            indexes = [header.index(column) for column in CSV_COLUMNS]
+            conn.execute('BEGIN')
+            batch: List[tuple] = []
+            for row in reader:
+                if not row:
+                    continue
+                batch.append(task_row(Task._make(row[index] for index in indexes)))
+                if len(batch) >= batch_size:
+                    conn.executemany(_INSERT, batch)
+                    count += len(batch)
+                    batch.clear()
+            conn.executemany(_INSERT, batch)
+            count += len(batch)
+            conn.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+            # 保存默认排序函数，ORDER BY rank 由FTS5直接按相关度取前几条
+            conn.execute(
+                "INSERT INTO tasks_fts (tasks_fts, rank) VALUES ('rank', ?)", (f'bm25({NAME_WEIGHT}, 1.0)',)
+            )
+            conn.execute('COMMIT')
+        conn.executescript(_INDEXES)
+        conn.execute('ANALYZE')
+    except BaseException:
+        conn.close()
+        os.remove(temp_path)
+        raise
+    conn.close()
+    os.replace(temp_path, db_path)
+    # 旧数据库遗留的日志属于被替换的文件，不能应用到新文件上
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    return count
+
+def match_expression(text: str) -> str:
+    """
+    把用户输入的搜索文本转换为FTS5查询：出现任意一个词即匹配（命中的词越多相关度越高），
+    最后一个词按前缀匹配
+    
+    Args:
+        text: 搜索文本
+    
+    Returns:
+        str: FTS5 MATCH 表达式
+    
+    Raises:
+        ValueError: 文本中没有可搜索的词
+    """
+    terms = _TERM.findall(text)
+    if not terms:
+        raise ValueError("Search text must contain at least one word")
+    phrases = [f'"{term}"' for term in terms]
+    phrases[-1] += '*'
+    return ' OR '.join(phrases)
+
+class SqliteTaskView:
+    """
+    任务数据库上的查询，方法与 task_store.TaskSnapshot 相同
+    
+    每个线程使用各自的数据库连接；方法会执行SQL，应在线程中调用。
+    """
+    
+    def __init__(self, path: str):
+        """
+        初始化查询
+        
+        Args:
+            path: 数据库文件路径
+        """
+        self.path = path
+        self._local = threading.local()
+    
+    def connection(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+    
+    def tasks_for(self, category: str) -> List[Task]:
+        """
+        获取分类下的任务
+        
+        Args:
+            category: 任务分类，大小写不敏感；'all' 表示全部任务
+        
+        Returns:
+            List[Task]: 按导入顺序排列的任务列表
+        """
+        key = category.lower()
+        if key == 'all':
+            rows = self.connection().execute(f'SELECT {_TASK_COLUMNS} FROM tasks ORDER BY id')
+        else:
+            rows = self.connection().execute(
+                f'SELECT {_TASK_COLUMNS} FROM tasks WHERE category_key = ? ORDER BY id', (key,)
+            )
+        return [Task._make(row) for row in rows]
+    
+    def render(self, category: str) -> str:
+        """
+        获取分类下全部任务格式化后的文本（每行一条）
+        
+        Args:
+            category: 任务分类，大小写不敏感；'all' 表示全部任务
+        
+        Returns:
+            str: 任务列表文本
+        """
+        return "\n".join(task.format() for task in self.tasks_for(category))
+    
+    def query(self, filters: Dict[str, str], due_from: Optional[str] = None, due_to: Optional[str] = None,
+              sort_by: str = 'due_date', limit: int = 20, after: Optional[tuple] = None) -> Tuple[List[Task], Optional[tuple]]:
+        """
+        按条件分页查询任务，参数与返回值同 TaskSnapshot.query
+        
+        Returns:
+            tuple: (本页的 (任务编号, 任务) 列表, 下一页起点的排序键；没有更多时为None)
+        """
+        order = _ORDER_COLUMNS[sort_by]
+        conditions: List[str] = []
+        params: List[object] = []
+        for field, value in filters.items():
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Unknown filter: {field}")
+            conditions.append(f'{field}_key = ?')
+            params.append(value.lower())
+        if due_from:
+            conditions.append('due_date >= ?')
+            params.append(due_from)
+        if due_to:
+            conditions.append('due_date <= ?')
+            params.append(due_to)
+        if after is not None:
+            # 行值比较可以直接使用 (…, id) 复合索引定位起点
+            conditions.append(f"({', '.join(order)}) > ({', '.join('?' * len(order))})")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        rows = self.connection().execute(
+            f"SELECT {_TASK_COLUMNS}, {', '.join(order)} FROM tasks {where} "
+            f"ORDER BY {', '.join(order)} LIMIT ?",
+            (*params, limit + 1)
+        ).fetchall()
+        next_key = tuple(rows[limit - 1][6:]) if len(rows) > limit else None
+        return [(row[-1], Task._make(row[:6])) for row in rows[:limit]], next_key
+    
+    def search(self, text: str, category: Optional[str] = None, limit: int = 20) -> List[Dict[str, object]]:
+        """
+        全文搜索任务名称和描述，按相关度排序
+        
+        Args:
+            text: 搜索文本
+            category: 任务分类，为空表示不限制
+            limit: 最多返回的任务数
+        
+        Returns:
+            List[dict]: 任务编号 id、任务字段，以及 score（越大越相关）和 snippet（匹配片段，命中词以 [] 标出）
+        
+        Raises:
+            ValueError: 文本中没有可搜索的词
+        """
+        columns = ', '.join('t.' + column for column in ('id', *_TASK_COLUMNS.split(', ')))
+        snippet = "snippet(tasks_fts, -1, '[', ']', '...', 12)"
+        if category:
+            rows = self.connection().execute(
+                f"SELECT {columns}, rank, {snippet} FROM tasks_fts JOIN tasks t ON t.id = tasks_fts.rowid "
+                "WHERE tasks_fts MATCH ? AND t.category_key = ? ORDER BY rank LIMIT ?",
+                (match_expression(text), category.lower(), limit)
+            ).fetchall()
+        else:
+            # 先在全文索引上取相关度最高的几条，只为这几条读取任务行
+            rows = self.connection().execute(
+                f"SELECT {columns}, m.rank, m.snippet FROM ("
+                f"SELECT rowid, rank, {snippet} AS snippet FROM tasks_fts WHERE tasks_fts MATCH ? ORDER BY rank LIMIT ?"
+                ") m JOIN tasks t ON t.id = m.rowid ORDER BY m.rank",
+                (match_expression(text), limit)
+            ).fetchall()
+        results = []
+        for row in rows:
+            result: Dict[str, object] = {'id': row[0], **Task._make(row[1:7])._asdict()}
+            # bm25 越小越相关，取反后越大越相关
+            result['score'] = round(-row[7], 4)
+            result['snippet'] = row[8]
+            results.append(result)
+        return results
+    
+    def insert(self, task: Task) -> int:
+        """
+        新增任务
+        
+        Args:
+            task: 任务
+        
+        Returns:
+            int: 任务编号
+        """
+        return self.connection().execute(_INSERT, task_row(task)).lastrowid
+    
+    def update(self, task_id: int, fields: Dict[str, str]) -> Task:
+        """
+        修改任务
+        
+        Args:
+            task_id: 任务编号
+            fields: 要修改的字段（已规范化）
+        
+        Returns:
+            Task: 修改后的任务
+        
+        Raises:
+            ValueError: 任务不存在
+        """
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(f'SELECT {_TASK_COLUMNS} FROM tasks WHERE id = ?', (task_id,)).fetchone()
+            if row is None:
+                raise ValueError(f"Task not found: {task_id}")
+            task = Task._make(row)._replace(**fields)
+            conn.execute(
+                'UPDATE tasks SET category = ?, name = ?, description = ?, due_date = ?, priority = ?, status = ?, '
+                'category_key = ?, priority_key = ?, status_key = ?, priority_rank = ? WHERE id = ?',
+                (*task_row(task), task_id)
+            )
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return task
+
+class SqliteTaskStore:
+    """
+    SQLite任务存储，接口与 task_store.TaskStore 相同
+    
+    修改直接写入数据库，由SQLite自身的WAL保证原子性和崩溃恢复。
+    """
+    
+    def __init__(self, path: str):
+        """
+        初始化存储
+        
+        Args:
+            path: 数据库文件路径，由 import_csv 生成
+        """
+        self.path = path
+        self._view = SqliteTaskView(path)
+    
+    async def snapshot(self) -> SqliteTaskView:
+        """
+        获取任务查询（数据库本身即最新数据，不需要重新加载）
+        
+        Returns:
+            SqliteTaskView: 任务查询
+        
+        Raises:
+            ValueError: 数据库不存在
+        """
+        if not os.path.exists(self.path):
+            raise ValueError(f"Task database not found: {self.path}")
+        return self._view
+    
+    async def add(self, fields: Dict[str, str]) -> Tuple[int, Task]:
+        """
+        新增任务，参数与返回值同 TaskStore.add
+        
+        Returns:
+            tuple: (任务编号, 任务)
+        """
+        task = new_task(fields)
+        view = await self.snapshot()
+        return await to_thread(view.insert, task), task
+    
+    async def update(self, task_id: int, fields: Dict[str, str]) -> Tuple[int, Task]:
+        """
+        修改任务，参数与返回值同 TaskStore.update
+        
+        Returns:
+            tuple: (任务编号, 修改后的任务)
+        """
+        fields = normalize_fields(fields)
+        if not fields:
+            raise ValueError("No task fields to update")
+        view = await self.snapshot()
+        return task_id, await to_thread(view.update, task_id, fields)
+
+def main(argv: Optional[Iterable[str]] = None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='任务数据库工具')
+    commands = parser.add_subparsers(dest='command', required=True)
+    importer = commands.add_parser('import', help='把CSV任务文件导入为新的数据库')
+    importer.add_argument('csv_path', help='CSV文件路径')
+    importer.add_argument('db_path', help='数据库文件路径')
+    args = parser.parse_args(argv)
+    
+    start = time.perf_counter()
+    count = import_csv(args.csv_path, args.db_path)
+    print(f'imported {count} tasks into {args.db_path} in {time.perf_counter() - start:.1f}s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,857 @@
+"""
+任务存储
+
+把 task.csv 一次性加载为带索引的内存结构（索引键预先转为小写），之后的
+查询不再读取文件。每次查询前比较文件的 mtime 和大小，发生变化时在线程中重新
+加载，不阻塞asyncio事件循环；加载期间的并发查询等待同一次加载完成。
+
+新增和修改任务时不重写 task.csv：每次修改以一行JSON追加到 task.csv.log 并
+fsync，同时更新内存中的索引。日志达到 compact_after 条后在后台压缩：日志先改名为
+task.csv.log.1，内存中的任务写入临时文件后原子替换 task.csv，再删除 .log.1。
+加载时依次重放 .log.1 和 .log：日志记录的是任务的完整内容，重复重放结果不变，
+因此在压缩的任何阶段崩溃都不会丢失或重复修改；末尾写了一半的记录被丢弃。
+
+日志记录按任务位置定位，只对生成日志时的 task.csv 有效：日志第一行记录该文件
+内容的摘要，task.csv 被手工修改后摘要不再匹配，旧日志改名为 .stale 保留而不重放。
+"""
+import asyncio
+import base64
+import binascii
+import bisect
+import csv
+import functools
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# CSV列名
+CSV_COLUMNS = ('Category', 'Task Name', 'Description', 'Due Date', 'Priority', 'Status')
+
+# 支持等值过滤的字段
+FILTER_FIELDS = ('category', 'priority', 'status')
+
+# 支持的排序方式
+SORT_ORDERS = ('due_date', 'priority')
+
+# 优先级排序（未知优先级排在最后）
+PRIORITY_RANK = {'high': 0, 'medium': 1, 'low': 2}
+
+# 新增和修改任务时允许的优先级和状态
+PRIORITIES = ('High', 'Medium', 'Low')
+STATUSES = ('Not Started', 'In Progress', 'Completed')
+
+# 日志达到该条数后在后台压缩进 task.csv
+COMPACT_AFTER = 1000
+
+logger = logging.getLogger(__name__)
+
+async def to_thread(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    在默认线程池中执行阻塞函数（与 asyncio.to_thread 相同，后者需要 Python 3.9+）
+    
+    Args:
+        func: 阻塞函数
+        *args: 位置参数
+    
+    Returns:
+        Any: 函数返回值
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args))
+
+def validate_date(value: Optional[str], name: str) -> Optional[str]:
+    """
+    校验 YYYY-MM-DD 格式的日期参数
+    
+    Args:
+        value: 日期，空值表示不限制
+        name: 参数名，用于错误信息
+    
+    Returns:
+        Optional[str]: 日期，空值返回None
+    
+    Raises:
+        ValueError: 日期格式错误
+    """
+    if not value:
+        return None
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value} (expected YYYY-MM-DD)")
+    return value
+
+def encode_cursor(sort_by: str, key: tuple) -> str:
+    """
+    把下一页起点编码为不透明的游标
+    
+    Args:
+        sort_by: 排序方式
+        key: 上一页最后一条任务的排序键
+    
+    Returns:
+        str: 游标
+    """
+    raw = json.dumps({'s': sort_by, 'k': list(key)}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str, sort_by: str) -> tuple:
+    """
+    解码游标
+    
+    Args:
+        cursor: encode_cursor 生成的游标
+        sort_by: 本次查询的排序方式，必须与生成游标时一致
+    
+    Returns:
+        tuple: 上一页最后一条任务的排序键
+    
+    Raises:
+        ValueError: 游标无效或排序方式不一致
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        saved_sort, key = data['s'], tuple(data['k'])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    if saved_sort != sort_by:
+        raise ValueError(f"Cursor was created with sort_by={saved_sort}")
+    return key
+
+def normalize_fields(fields: Dict[str, str]) -> Dict[str, str]:
+    """
+    校验并规范化新增或修改任务时传入的字段
+    
+    Args:
+        fields: 任务字段（Task 的字段名），空值表示不修改
+    
+    Returns:
+        Dict[str, str]: 去掉空值后的字段，优先级和状态转换为标准写法
+    
+    Raises:
+        ValueError: 字段无效
+    """
+    normalized: Dict[str, str] = {}
+    for field, value in fields.items():
+        if field not in Task._fields:
+            raise ValueError(f"Unknown task field: {field}")
+        if value is None or not value.strip():
+            continue
+        value = value.strip()
+        if field == 'due_date':
+            validate_date(value, 'due_date')
+        elif field in ('priority', 'status'):
+            allowed = PRIORITIES if field == 'priority' else STATUSES
+            matched = [choice for choice in allowed if choice.lower() == value.lower()]
+            if not matched:
+                raise ValueError(f"Invalid {field}: {value} (expected one of {', '.join(allowed)})")
+            value = matched[0]
+        normalized[field] = value
+    return normalized
+
+def new_task(fields: Dict[str, str]) -> 'Task':
+    """
+    用新增任务时传入的字段创建任务
+    
+    Args:
+        fields: 任务字段，category、name、due_date 必填
+    
+    Returns:
+        Task: 任务，优先级默认 Medium，状态默认 Not Started
+    
+    Raises:
+        ValueError: 字段无效或缺少必填字段
+    """
+    fields = normalize_fields(fields)
+    missing = [field for field in ('category', 'name', 'due_date') if field not in fields]
+    if missing:
+        raise ValueError(f"Missing task fields: {', '.join(missing)}")
+    return Task(
+        fields['category'], fields['name'], fields.get('description', ''), fields['due_date'],
+        fields.get('priority', 'Medium'), fields.get('status', 'Not Started')
+    )
+
+class Task(NamedTuple):
+    """一条任务（使用元组以降低百万行时的内存和加载耗时）"""
+    category: str
+    name: str
+    description: str
+    due_date: str
+    priority: str
+    status: str
+    
+    def format(self) -> str:
+        """格式化为工具输出中的一行"""
+        return (
+            f"{self.name} - {self.description} "
+            f"(Due: {self.due_date}, Priority: {self.priority}, Status: {self.status})"
+        )
+
+class TaskSnapshot:
+    """
+    某一时刻的任务文件内容及其索引
+    
+    加载时为分类、优先级和状态建立等值索引（小写值 -> 按文件顺序排列的任务位置）。
+    query 使用的有序索引（按截止日期或优先级排序的任务位置，以及与之平行的排序键列表，
+    二分查找直接比较排序键）在首次使用时生成并缓存，
+    分页查询从匹配最少的索引开始，按日期范围和游标二分定位起点，不扫描整张表。
+    
+    任务编号为任务在文件中的位置加1。put 就地修改任务并同步更新已生成的索引，
+    查询和修改通过 lock 互斥（查询在线程中执行）。
+    """
+    
+    def __init__(self, tasks: List[Task], signature: Tuple[int, int]):
+        """
+        建立索引
+        
+        Args:
+            tasks: 按文件顺序排列的任务
+            signature: 加载时文件的 (mtime_ns, size)
+        """
+        self.tasks = tasks
+        self.signature = signature
+        # 字段 -> 小写值 -> 任务位置（文件顺序）
+        self.equality: Dict[str, Dict[str, List[int]]] = {field: {} for field in FILTER_FIELDS}
+        for field in FILTER_FIELDS:
+            index = self.equality[field]
+            lowered: Dict[str, str] = {}
+            for position, value in enumerate(getattr(task, field) for task in tasks):
+                key = lowered.get(value)
+                if key is None:
+                    key = lowered[value] = value.lower()
+                positions = index.get(key)
+                if positions is None:
+                    positions = index[key] = []
+                positions.append(position)
+        # (字段, 小写值, 排序) -> (有序的排序键, 对应的任务位置)，首次使用时生成
+        self._sorted: Dict[Tuple[Optional[str], Optional[str], str], Tuple[List[tuple], List[int]]] = {}
+        # 小写分类 -> 格式化后的任务列表文本，首次查询时生成
+        self._rendered: Dict[str, str] = {}
+        # task.csv.log 中尚未压缩的记录数
+        self.pending = 0
+        # 加载的 task.csv 内容摘要，写入新日志的第一行
+        self.digest = ''
+        self.lock = threading.RLock()
+    
+    def tasks_for(self, category: str) -> List[Task]:
+        """
+        获取分类下的任务
+        
+        Args:
+            category: 任务分类，大小写不敏感；'all' 表示全部任务
+        
+        Returns:
+            List[Task]: 任务列表
+        """
+        key = category.lower()
+        with self.lock:
+            if key == 'all':
+                return list(self.tasks)
+            tasks = self.tasks
+            return [tasks[position] for position in self.equality['category'].get(key, [])]
+    
+    def render(self, category: str) -> str:
+        """
+        获取分类下全部任务格式化后的文本（每行一条），结果按分类缓存
+        
+        Args:
+            category: 任务分类，大小写不敏感；'all' 表示全部任务
+        
+        Returns:
+            str: 任务列表文本
+        """
+        key = category.lower()
+        with self.lock:
+            text = self._rendered.get(key)
+            if text is None:
+                tasks = self.tasks if key == 'all' else self.tasks_for(key)
+                text = self._rendered[key] = "\n".join(task.format() for task in tasks)
+            return text
+    
+    def sort_key(self, sort_by: str) -> Callable[[int], tuple]:
+        """
+        获取任务位置的排序键函数，位置作为最后一项保证排序键唯一
+        
+        Args:
+            sort_by: 'due_date' 或 'priority'（高优先级在前，同优先级按截止日期）
+        
+        Returns:
+            Callable: 任务位置 -> 排序键
+        """
+        tasks = self.tasks
+        if sort_by == 'due_date':
+            return lambda position: (tasks[position].due_date, position)
+        unknown = len(PRIORITY_RANK)
+        return lambda position: (
+            PRIORITY_RANK.get(tasks[position].priority.lower(), unknown), tasks[position].due_date, position
+        )
+    
+    def sorted_index(self, field: Optional[str], value: Optional[str],
+                     sort_by: str) -> Tuple[List[tuple], List[int]]:
+        """
+        获取按排序键排列的任务位置
+        
+        Args:
+            field: 等值过滤字段，None表示全部任务
+            value: 小写的过滤值
+            sort_by: 排序方式
+        
+        Returns:
+            tuple: (有序的排序键, 对应的任务位置)
+        """
+        cache_key = (field, value, sort_by)
+        index = self._sorted.get(cache_key)
+        if index is None:
+            source = range(len(self.tasks)) if field is None else self.equality[field].get(value, [])
+            key = self.sort_key(sort_by)
+            pairs = sorted((key(position), position) for position in source)
+            index = self._sorted[cache_key] = ([k for k, _ in pairs], [position for _, position in pairs])
+        return index
+    
+    def query(self, filters: Dict[str, str], due_from: Optional[str] = None, due_to: Optional[str] = None,
+              sort_by: str = 'due_date', limit: int = 20, after: Optional[tuple] = None) -> Tuple[List[Task], Optional[tuple]]:
+        """
+        按条件分页查询任务
+        
+        Args:
+            filters: 等值过滤条件，字段为 category、priority、status，值大小写不敏感
+            due_from: 截止日期下限（含），YYYY-MM-DD
+            due_to: 截止日期上限（含），YYYY-MM-DD
+            sort_by: 'due_date' 或 'priority'
+            limit: 每页条数
+            after: 上一页最后一条任务的排序键
+        
+        Returns:
+            tuple: (本页的 (任务编号, 任务) 列表, 下一页起点的排序键；没有更多时为None)
+        """
+        with self.lock:
+            filters = {field: value.lower() for field, value in filters.items()}
+            
+            def bounds(keys: List[tuple]) -> List[Tuple[int, int]]:
+                # 日期范围直接在有序索引上二分定位：按截止日期排序时是一段连续区间；
+                # 按优先级排序时同一优先级内按截止日期有序，每个优先级各取一段
+                if not (due_from or due_to):
+                    return [(0, len(keys))]
+                prefixes = [()] if sort_by == 'due_date' else [(rank,) for rank in range(len(PRIORITY_RANK) + 1)]
+                ranges = []
+                for prefix in prefixes:
+                    lo = bisect.bisect_left(keys, prefix + ((due_from,) if due_from else ()))
+                    if due_to:
+                        hi = bisect.bisect_left(keys, prefix + (due_to + '\uffff',))
+                    elif prefix:
+                        hi = bisect.bisect_left(keys, (prefix[0] + 1,))
+                    else:
+                        hi = len(keys)
+                    if lo < hi:
+                        ranges.append((lo, hi))
+                return ranges
+            
+            def size(ranges: List[Tuple[int, int]]) -> int:
+                return sum(hi - lo for lo, hi in ranges)
+            
+            # 以匹配最少的等值条件为驱动索引，只为它生成有序索引；其余条件逐条检查
+            driver = None
+            if filters:
+                field, value = min(filters.items(), key=lambda item: len(self.equality[item[0]].get(item[1], ())))
+                driver_keys, driver = self.sorted_index(field, value, sort_by)
+                ranges = bounds(driver_keys)
+            if driver is None or ((due_from or due_to) and size(ranges) > 0):
+                # 日期范围可能比等值条件更有选择性
+                all_keys, everything = self.sorted_index(None, None, sort_by)
+                all_ranges = bounds(all_keys)
+                if driver is None or size(all_ranges) < size(ranges):
+                    driver_keys, driver, ranges = all_keys, everything, all_ranges
+            start = 0 if after is None else bisect.bisect_right(driver_keys, after)
+            
+            tasks = self.tasks
+            page: List[int] = []
+            for lo, hi in ranges:
+                for index in range(max(lo, start), hi):
+                    position = driver[index]
+                    task = tasks[position]
+                    if any(getattr(task, field).lower() != value for field, value in filters.items()):
+                        continue
+                    if len(page) == limit:
+                        return [(p + 1, tasks[p]) for p in page], self.sort_key(sort_by)(page[-1])
+                    page.append(position)
+            return [(p + 1, tasks[p]) for p in page], None
+    
+    def get(self, task_id: int) -> Task:
+        """
+        按编号获取任务
+        
+        Args:
+            task_id: 任务编号
+        
+        Returns:
+            Task: 任务
+        
+        Raises:
+            ValueError: 任务不存在
+        """
+        with self.lock:
+            if not 1 <= task_id <= len(self.tasks):
+                raise ValueError(f"Task not found: {task_id}")
+            return self.tasks[task_id - 1]
+    
+    def put(self, task_id: int, task: Task):
+        """
+        写入任务并更新索引
+        
+        Args:
+            task_id: 任务编号；等于任务数加1时新增任务，否则替换已有任务
+            task: 任务
+        
+        Raises:
+            ValueError: 编号不连续
+        """
+        position = task_id - 1
+        with self.lock:
+            tasks = self.tasks
+            if not 0 <= position <= len(tasks):
+                raise ValueError(f"Task not found: {task_id}")
+            old = tasks[position] if position < len(tasks) else None
+            if old == task:
+                return
+            # 先用旧内容从有序索引中删除（排序键读取 tasks[position]），写入后再按新内容插入
+            matching = []
+            for (field, value, sort_by), (keys, positions) in self._sorted.items():
+                key = self.sort_key(sort_by)
+                if old is not None and (field is None or getattr(old, field).lower() == value):
+                    index = bisect.bisect_left(keys, key(position))
+                    del keys[index]
+                    del positions[index]
+                matching.append((field, value, key, keys, positions))
+            if old is None:
+                tasks.append(task)
+            else:
+                tasks[position] = task
+            for field, value, key, keys, positions in matching:
+                if field is None or getattr(task, field).lower() == value:
+                    new_key = key(position)
+                    index = bisect.bisect_left(keys, new_key)
+                    keys.insert(index, new_key)
+                    positions.insert(index, position)
+            
+            for field in FILTER_FIELDS:
+                index = self.equality[field]
+                new_value = getattr(task, field).lower()
+                if old is not None:
+                    old_value = getattr(old, field).lower()
+                    if old_value == new_value:
+                        continue
+                    index[old_value].remove(position)
+                    if not index[old_value]:
+                        del index[old_value]
+                bisect.insort(index.setdefault(new_value, []), position)
+            
+            for category in ('all', task.category.lower(), old.category.lower() if old else None):
+                self._rendered.pop(category, None)
+
+def content_digest(data: bytes) -> str:
+    """task.csv 内容摘要，用于判断日志是否基于当前文件"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def read_log(path: str) -> Optional[Tuple[Dict[str, str], List[Tuple[int, Task]]]]:
+    """
+    读取修改日志
+    
+    第一行记录日志所基于的 task.csv 摘要（base），压缩替换文件前再追加压缩后文件的
+    摘要（into），其余每行是一条任务记录。末尾没有换行或无法解析的记录是写入时崩溃
+    留下的，截断丢弃。
+    
+    Args:
+        path: 日志文件路径
+    
+    Returns:
+        Optional[tuple]: (摘要, [(任务位置, 任务)])，文件不存在时返回None
+    
+    Raises:
+        ValueError: 日志中间的记录损坏
+    """
+    try:
+        file = open(path, 'rb+')
+    except FileNotFoundError:
+        return None
+    digests: Dict[str, str] = {}
+    records: List[Tuple[int, Task]] = []
+    with file:
+        offset = 0
+        for line in file:
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError('incomplete record')
+                entry = json.loads(line)
+                if offset == 0:
+                    digests['base'] = entry['base']
+                elif 'into' in entry:
+                    digests['into'] = entry['into']
+                else:
+                    records.append((entry['id'] - 1, Task._make(entry['task'])))
+            except (ValueError, KeyError, TypeError):
+                if file.read(1):
+                    raise ValueError(f"Task log is corrupted at byte {offset}: {path}")
+                file.truncate(offset)
+                break
+            offset += len(line)
+    return digests, records
+
+def apply_log(path: str, records: List[Tuple[int, Task]], tasks: List[Task]):
+    """
+    把日志记录应用到任务列表上
+    
+    Args:
+        path: 日志文件路径，用于错误信息
+        records: read_log 返回的任务记录
+        tasks: 任务列表，原地修改
+    
+    Raises:
+        ValueError: 记录的编号不连续
+    """
+    for position, task in records:
+        if position == len(tasks):
+            tasks.append(task)
+        elif 0 <= position < len(tasks):
+            tasks[position] = task
+        else:
+            raise ValueError(f"Task log refers to missing task {position + 1}: {path}")
+
+def replay_logs(path: str, digest: str, tasks: List[Task]) -> int:
+    """
+    依次重放 .log.1 和 .log，跳过不是基于当前 task.csv 的日志
+    
+    压缩替换 task.csv 之后、删除 .log.1 之前崩溃时，.log.1 的 into 与当前文件一致：
+    其内容已在 task.csv 中，.log 改为以当前文件为基准后删除 .log.1，完成压缩。
+    
+    Args:
+        path: CSV文件路径
+        digest: 当前 task.csv 的内容摘要
+        tasks: 任务列表，原地修改
+    
+    Returns:
+        int: .log 中的记录数
+    
+    Raises:
+        ValueError: 日志损坏
+    """
+    log_path = path + '.log'
+    rotated_path = log_path + '.1'
+    rotated = read_log(rotated_path)
+    current = read_log(log_path)
+    bases = {digest}
+    compacted = False
+    if rotated is not None:
+        digests, records = rotated
+        if digests.get('base') == digest:
+            apply_log(rotated_path, records, tasks)
+        elif digests.get('into') == digest:
+            bases.add(digests['base'])
+            compacted = True
+        elif digests or records:
+            _set_aside(rotated_path)
+        else:
+            os.remove(rotated_path)
+    if current is None:
+        pending = 0
+    else:
+        digests, records = current
+        if digests.get('base', digest) in bases:
+            apply_log(log_path, records, tasks)
+            if digests.get('base', digest) != digest:
+                _write_log_base(log_path, digest)
+            pending = len(records)
+        else:
+            _set_aside(log_path)
+            pending = 0
+    if compacted:
+        os.remove(rotated_path)
+    return pending
+
+def _set_aside(log_path: str):
+    """task.csv 已被外部修改，日志改名为 .stale 保留，不再重放"""
+    logger.warning("Task file changed outside the task log, keeping stale log as %s.stale", log_path)
+    os.replace(log_path, log_path + '.stale')
+
+def _log_header(key: str, digest: str) -> bytes:
+    """日志中的摘要行"""
+    return (json.dumps({key: digest}) + '\n').encode('utf-8')
+
+def _write_log_base(log_path: str, digest: str):
+    """把日志的第一行替换为新的 task.csv 摘要，原子替换日志文件"""
+    with open(log_path, 'rb') as source:
+        source.readline()
+        body = source.read()
+    temp_path = log_path + '.tmp'
+    with open(temp_path, 'wb') as target:
+        target.write(_log_header('base', digest) + body)
+        target.flush()
+        os.fsync(target.fileno())
+    os.replace(temp_path, log_path)
+    _fsync_directory(log_path)
+
+def load_tasks(path: str) -> TaskSnapshot:
+    """
+    读取任务文件，重放修改日志并建立索引
+    
+    Args:
+        path: CSV文件路径
+    
+    Returns:
+        TaskSnapshot: 任务快照
+    
+    Raises:
+        ValueError: 文件不存在、缺少列或日志损坏
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise ValueError(f"Task file not found: {path}")
+    # 读取前记录签名：读取期间文件被修改时，下一次查询会看到新的签名并重新加载
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with open(path, 'rb') as file:
+        data = file.read()
+    digest = content_digest(data)
+    reader = csv.reader(io.StringIO(data.decode('utf-8'), newline=''))
+    header = next(reader, None) or []
+    if tuple(header) == CSV_COLUMNS:
+        tasks = [Task._make(row) for row in reader if row]
+    else:
+        missing = [column for column in CSV_COLUMNS if column not in header]
+        if missing:
+            raise ValueError(f"Task file is missing columns: {', '.join(missing)}")
+        indexes = [header.index(column) for column in CSV_COLUMNS]
+        tasks = [Task._make(row[index] for index in indexes) for row in reader if row]
+    pending = replay_logs(path, digest, tasks)
+    snapshot = TaskSnapshot(tasks, signature)
+    snapshot.pending = pending
+    snapshot.digest = digest
+    return snapshot
+
+class TaskStore:
+    """
+    按文件变化自动重新加载的任务存储，修改写入追加日志并在后台压缩
+    """
+    
+    def __init__(self, path: str, compact_after: int = COMPACT_AFTER):
+        """
+        初始化存储，首次查询时加载
+        
+        Args:
+            path: CSV文件路径
+            compact_after: 日志达到该条数后在后台压缩
+        """
+        self.path = path
+        self.log_path = path + '.log'
+        self.compact_after = compact_after
+        self._snapshot: Optional[TaskSnapshot] = None
+        self._reload_lock: Optional[asyncio.Lock] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._compaction: Optional[asyncio.Task] = None
+    
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        """当前文件的 (mtime_ns, size)，文件不存在时返回None"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def preload(self):
+        """
+        启动事件循环之前同步加载任务，之后的查询直接使用这份快照
+        
+        Raises:
+            ValueError: 文件不存在、缺少列或日志损坏
+        """
+        self._snapshot = load_tasks(self.path)
+    
+    async def snapshot(self) -> TaskSnapshot:
+        """
+        获取最新的任务快照，文件变化时在线程中重新加载
+        
+        Returns:
+            TaskSnapshot: 任务快照
+        
+        Raises:
+            ValueError: 文件不存在
+        """
+        signature = self._signature()
+        if signature is None:
+            raise ValueError(f"Task file not found: {self.path}")
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.signature == signature:
+            return snapshot
+        
+        if self._reload_lock is None:
+            self._reload_lock = asyncio.Lock()
+        async with self._reload_lock:
+            # 等待锁期间其他查询可能已经完成加载
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.signature != self._signature():
+                snapshot = self._snapshot = await to_thread(load_tasks, self.path)
+            return snapshot
+    
+    async def add(self, fields: Dict[str, str]) -> Tuple[int, Task]:
+        """
+        新增任务
+        
+        Args:
+            fields: 任务字段，见 new_task
+        
+        Returns:
+            tuple: (任务编号, 任务)
+        
+        Raises:
+            ValueError: 字段无效
+        """
+        task = new_task(fields)
+        return await self._write(None, lambda snapshot: task)
+    
+    async def update(self, task_id: int, fields: Dict[str, str]) -> Tuple[int, Task]:
+        """
+        修改任务
+        
+        Args:
+            task_id: 任务编号
+            fields: 要修改的字段，空值表示不修改
+        
+        Returns:
+            tuple: (任务编号, 修改后的任务)
+        
+        Raises:
+            ValueError: 字段无效、没有要修改的字段或任务不存在
+        """
+        fields = normalize_fields(fields)
+        if not fields:
+            raise ValueError("No task fields to update")
+        return await self._write(task_id, lambda snapshot: snapshot.get(task_id)._replace(**fields))
+    
+    async def _write(self, task_id: Optional[int], build: Callable[[TaskSnapshot], Task]) -> Tuple[int, Task]:
+        """
+        在写锁内生成任务，写入日志并更新内存中的索引
+        
+        Args:
+            task_id: 任务编号，None表示新增
+            build: 根据当前快照生成任务内容
+        
+        Returns:
+            tuple: (任务编号, 任务)
+        """
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        async with self._write_lock:
+            snapshot = await self.snapshot()
+            task = build(snapshot)
+            if task_id is None:
+                task_id = len(snapshot.tasks) + 1
+            await to_thread(self._commit, snapshot, task_id, task)
+            snapshot.pending += 1
+            if snapshot.pending >= self.compact_after and (self._compaction is None or self._compaction.done()):
+                self._compaction = asyncio.create_task(self._compact_in_background())
+        return task_id, task
+    
+    def _commit(self, snapshot: TaskSnapshot, task_id: int, task: Task):
+        """追加一条日志并fsync，落盘后再修改内存中的任务"""
+        record = (json.dumps({'id': task_id, 'task': list(task)}, ensure_ascii=False) + '\n').encode('utf-8')
+        with open(self.log_path, 'ab') as file:
+            if file.tell() == 0:
+                # 新日志先写入所基于的 task.csv 摘要
+                record = _log_header('base', snapshot.digest) + record
+            file.write(record)
+            file.flush()
+            os.fsync(file.fileno())
+        snapshot.put(task_id, task)
+    
+    async def _compact_in_background(self):
+        """后台压缩，失败时记录日志，下一次写入后重试"""
+        try:
+            await self.compact()
+        except Exception:
+            logger.exception("Task log compaction failed: %s", self.log_path)
+    
+    async def compact(self):
+        """
+        把日志压缩进 task.csv
+        
+        只在日志改名和替换文件时短暂持有写锁，写入临时文件期间新的修改照常写入新日志。
+        替换前在 .log.1 末尾记录新文件的摘要，替换后新日志改为以新文件为基准；
+        压缩期间 task.csv 被外部修改时放弃本次压缩。
+        """
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        async with self._write_lock:
+            snapshot = await self.snapshot()
+            tasks = await to_thread(self._rotate_log, snapshot)
+            if tasks is None:
+                return
+            snapshot.pending = 0
+        temp_path, digest = await to_thread(self._write_csv, tasks)
+        async with self._write_lock:
+            if self._snapshot is not snapshot or self._signature() != snapshot.signature:
+                os.remove(temp_path)
+                return
+            rotated = self.log_path + '.1'
+            with open(rotated, 'ab') as file:
+                file.write(_log_header('into', digest))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
+            _fsync_directory(self.path)
+            if os.path.exists(self.log_path):
+                _write_log_base(self.log_path, digest)
+            # 压缩后的文件已经包含内存中的内容，更新签名避免重新加载
+            snapshot.signature = self._signature()
+            snapshot.digest = digest
+            os.remove(rotated)
+    
+    def _rotate_log(self, snapshot: TaskSnapshot) -> Optional[List[Task]]:
+        """
+        把 .log 并入 .log.1，并复制此刻的任务列表
+        
+        Returns:
+            Optional[List[Task]]: 任务列表，没有需要压缩的日志时返回None
+        """
+        rotated = self.log_path + '.1'
+        if not os.path.exists(self.log_path) and not os.path.exists(rotated):
+            return None
+        with snapshot.lock:
+            if os.path.exists(self.log_path):
+                if os.path.exists(rotated):
+                    # 上一次压缩未完成，两段日志基于同一个 task.csv，去掉第一行后按顺序合并
+                    with open(rotated, 'ab') as target, open(self.log_path, 'rb') as source:
+                        source.readline()
+                        target.write(source.read())
+                        target.flush()
+                        os.fsync(target.fileno())
+                    os.remove(self.log_path)
+                else:
+                    os.replace(self.log_path, rotated)
+            return list(snapshot.tasks)
+    
+    def _write_csv(self, tasks: List[Task]) -> Tuple[str, str]:
+        """把任务写入临时文件并fsync，返回临时文件路径和内容摘要"""
+        buffer = io.StringIO(newline='')
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(CSV_COLUMNS)
+        writer.writerows(tasks)
+        data = buffer.getvalue().encode('utf-8')
+        temp_path = self.path + '.compacting'
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        return temp_path, content_digest(data)
+
+def _fsync_directory(path: str):
+    """fsync文件所在目录，使改名落盘（不支持目录fsync的平台跳过）"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -1,12 +1,28 @@
-from typing import Any
+from typing import Any, Dict, List
+import asyncio
+import gc
 import httpx
-import csv
 import os
+import sys
 from mcp.server.fastmcp import FastMCP
 
+from task_db import SqliteTaskStore
+from task_store import SORT_ORDERS, TaskStore, decode_cursor, encode_cursor, to_thread, validate_date
+
 # Initialize FastMCP server
 mcp = FastMCP("tasklist")
-    
+
+# 设置 TASKLIST_DB 时使用SQLite数据库（由 python task_db.py import 生成），否则使用 task.csv；
+# task.csv 只加载一次，文件变化时自动重新加载
+TASKLIST_DB = os.environ.get('TASKLIST_DB')
+if TASKLIST_DB:
+    store = SqliteTaskStore(TASKLIST_DB)
+else:
+    store = TaskStore(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'task.csv'))
+
+# query_tasks 每页最多返回的任务数
+MAX_QUERY_LIMIT = 100
+
 
 @mcp.tool()
 async def get_tasklist(category: str) -> str:
@@ -21,32 +37,181 @@ async def get_tasklist(category: str) -> str:
     Raises:
         ValueError: 无效的任务分类或文件不存在
     """
-    # 获取CSV文件的绝对路径
-    csv_path = os.path.join(os.path.dirname(__file__), 'task.csv')
-    
-    # 检查文件是否存在
-    if not os.path.exists(csv_path):
-        raise ValueError(f"Task file not found: {csv_path}")
-    
-    tasks = []
-    
-    # 读取CSV文件
-    with open(csv_path, 'r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if category.lower() == 'all' or row['Category'].lower() == category.lower():
-                task_info = f"{row['Task Name']} - {row['Description']} (Due: {row['Due Date']}, Priority: {row['Priority']}, Status: {row['Status']})"
-                tasks.append(task_info)
+    snapshot = await store.snapshot()
+    # SQLite后端需要查询数据库，放到线程中执行以免阻塞事件循环
+    tasks = await to_thread(snapshot.render, category)
     
     if not tasks and category.lower() != 'all':
         return f"No tasks found for category: {category}"
     
     # 格式化输出
-    result = f"Tasks for category '{category}':\n" + "\n".join(tasks)
+    result = f"Tasks for category '{category}':\n" + tasks
     return result
 
 
+@mcp.tool()
+async def query_tasks(
+    category: str = '',
+    priority: str = '',
+    status: str = '',
+    due_from: str = '',
+    due_to: str = '',
+    sort_by: str = 'due_date',
+    limit: int = 20,
+    cursor: str = ''
+) -> Dict[str, Any]:
+    """
+    按条件分页查询任务
+    
+    Args:
+        category: 任务分类，为空表示不限制
+        priority: 优先级 (High, Medium, Low)，为空表示不限制
+        status: 状态 (Not Started, In Progress, Completed)，为空表示不限制
+        due_from: 截止日期下限（含），YYYY-MM-DD
+        due_to: 截止日期上限（含），YYYY-MM-DD
+        sort_by: 排序方式，due_date 或 priority（高优先级在前，同优先级按截止日期）
+        limit: 每页条数，1到100
+        cursor: 上一页返回的 next_cursor，为空表示第一页
+        
+    Returns:
+        dict: tasks 为本页任务（含任务编号 id），next_cursor 为下一页游标（没有更多时为None）
+    Raises:
+        ValueError: 参数无效
+    """
+    if sort_by not in SORT_ORDERS:
+        raise ValueError(f"Invalid sort_by: {sort_by} (expected one of {', '.join(SORT_ORDERS)})")
+    if not 1 <= limit <= MAX_QUERY_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_QUERY_LIMIT}")
+    due_from = validate_date(due_from, 'due_from')
+    due_to = validate_date(due_to, 'due_to')
+    after = decode_cursor(cursor, sort_by) if cursor else None
+    filters = {field: value for field, value in (('category', category), ('priority', priority), ('status', status)) if value}
+    
+    snapshot = await store.snapshot()
+    # 首次使用的有序索引需要排序（SQLite后端需要查询数据库），放到线程中执行以免阻塞事件循环
+    tasks, next_key = await to_thread(snapshot.query, filters, due_from, due_to, sort_by, limit, after)
+    return {
+        'tasks': [{'id': task_id, **task._asdict()} for task_id, task in tasks],
+        'next_cursor': encode_cursor(sort_by, next_key) if next_key is not None else None
+    }
+
+
+@mcp.tool()
+async def search_tasks(text: str, category: str = '', limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    全文搜索任务名称和描述，按相关度排序（需要SQLite后端）
+    
+    Args:
+        text: 搜索文本，例如 "client presentation"；命中的词越多越靠前，最后一个词按前缀匹配
+        category: 任务分类，为空表示不限制
+        limit: 最多返回的任务数，1到100
+        
+    Returns:
+        list: 任务字段，以及 score（越大越相关）和 snippet（匹配片段，命中词以 [] 标出）
+    Raises:
+        ValueError: 参数无效或未配置SQLite后端
+    """
+    if not isinstance(store, SqliteTaskStore):
+        raise ValueError("search_tasks requires the SQLite backend (set TASKLIST_DB)")
+    if not 1 <= limit <= MAX_QUERY_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_QUERY_LIMIT}")
+    snapshot = await store.snapshot()
+    return await to_thread(snapshot.search, text, category or None, limit)
+
+
+@mcp.tool()
+async def add_task(
+    category: str,
+    name: str,
+    due_date: str,
+    description: str = '',
+    priority: str = 'Medium',
+    status: str = 'Not Started'
+) -> Dict[str, Any]:
+    """
+    新增任务
+    
+    Args:
+        category: 任务分类
+        name: 任务名称
+        due_date: 截止日期，YYYY-MM-DD
+        description: 任务描述
+        priority: 优先级 (High, Medium, Low)
+        status: 状态 (Not Started, In Progress, Completed)
+        
+    Returns:
+        dict: 新增的任务（含任务编号 id）
+    Raises:
+        ValueError: 参数无效
+    """
+    task_id, task = await store.add({
+        'category': category, 'name': name, 'description': description,
+        'due_date': due_date, 'priority': priority, 'status': status
+    })
+    return {'id': task_id, **task._asdict()}
+
+
+@mcp.tool()
+async def update_task(
+    task_id: int,
+    category: str = '',
+    name: str = '',
+    description: str = '',
+    due_date: str = '',
+    priority: str = '',
+    status: str = ''
+) -> Dict[str, Any]:
+    """
+    修改任务，只修改传入的非空字段
+    
+    Args:
+        task_id: 任务编号（query_tasks / search_tasks 结果中的 id）
+        category: 任务分类
+        name: 任务名称
+        description: 任务描述
+        due_date: 截止日期，YYYY-MM-DD
+        priority: 优先级 (High, Medium, Low)
+        status: 状态 (Not Started, In Progress, Completed)
+        
+    Returns:
+        dict: 修改后的任务
+    Raises:
+        ValueError: 参数无效或任务不存在
+    """
+    task_id, task = await store.update(task_id, {
+        'category': category, 'name': name, 'description': description,
+        'due_date': due_date, 'priority': priority, 'status': status
+    })
+    return {'id': task_id, **task._asdict()}
+
+
+@mcp.tool()
+async def complete_task(task_id: int) -> Dict[str, Any]:
+    """
+    把任务标记为已完成
+    
+    Args:
+        task_id: 任务编号（query_tasks / search_tasks 结果中的 id）
+        
+    Returns:
+        dict: 修改后的任务
+    Raises:
+        ValueError: 任务不存在
+    """
+    task_id, task = await store.update(task_id, {'status': 'Completed'})
+    return {'id': task_id, **task._asdict()}
+
+
 if __name__ == "__main__":
+    if isinstance(store, TaskStore):
+        # 启动时加载任务，再把这批常驻的任务元组移出循环垃圾回收的扫描范围，避免事件循环上的
+        # 回收停顿随行数增长；只冻结启动时的对象，之后重新加载的快照照常参与回收
+        try:
+            store.preload()
+        except ValueError as error:
+            # stdout 承载MCP的stdio协议流，诊断信息写到stderr
+            print(f'Task file not loaded: {error}', file=sys.stderr)
+        gc.freeze()
     # Initialize and run the server
     print('Tasklist server started')
     mcp.run(transport='stdio')
@@ -0,0 +1,127 @@
+"""
+SQLite任务存储测试
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server'))
+
+from task_db import SqliteTaskStore, import_csv, match_expression
+from task_store import TaskStore
+
+HEADER = 'Category,Task Name,Description,Due Date,Priority,Status\n'
+
+ROWS = (
+    'Work,Prepare Presentation,Finish slides for the client meeting,2025-04-20,High,In Progress\n'
+    'Work,Email Client,Send project update to client,2025-04-17,Medium,Not Started\n'
+    'work,Team Meeting,Weekly sync-up with team,2025-04-18,Low,Completed\n'
+    'Personal,Grocery Shopping,"Buy groceries, ""fresh"" fruit",2025-04-18,Medium,Not Started\n'
+    'Learning,Café Notes,Résumé of the presentation course,2025-04-25,Urgent,Not Started\n'
+)
+
+class TaskDatabaseTestCase(unittest.TestCase):
+    """SQLite任务存储测试类"""
+    
+    def setUp(self):
+        """测试前置设置"""
+        self.directory = tempfile.mkdtemp()
+        self.csv_path = os.path.join(self.directory, 'task.csv')
+        self.db_path = os.path.join(self.directory, 'tasks.db')
+        with open(self.csv_path, 'w', encoding='utf-8', newline='') as file:
+            file.write(HEADER + ROWS)
+        self.assertEqual(import_csv(self.csv_path, self.db_path), 5)
+        self.view = asyncio.run(SqliteTaskStore(self.db_path).snapshot())
+        self.snapshot = asyncio.run(TaskStore(self.csv_path).snapshot())
+    
+    def tearDown(self):
+        """测试后置清理"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+    
+    def test_same_results_as_csv_store(self):
+        """测试与CSV存储的查询结果一致"""
+        for category in ('work', 'ALL', 'personal', 'missing'):
+            self.assertEqual(self.view.render(category), self.snapshot.render(category))
+        cases = [
+            ({}, None, None, 'due_date'),
+            ({}, None, None, 'priority'),
+            ({'category': 'WORK'}, None, None, 'priority'),
+            ({'status': 'not started'}, '2025-04-18', '2025-04-25', 'due_date'),
+            ({'category': 'work', 'priority': 'low'}, None, '2025-04-18', 'priority'),
+        ]
+        for filters, due_from, due_to, sort_by in cases:
+            expected = self.snapshot.query(filters, due_from, due_to, sort_by, 100)[0]
+            self.assertEqual(self.view.query(filters, due_from, due_to, sort_by, 100)[0], expected)
+    
+    def test_query_pagination(self):
+        """测试游标分页"""
+        for sort_by in ('due_date', 'priority'):
+            names, after = [], None
+            while True:
+                tasks, after = self.view.query({}, sort_by=sort_by, limit=2, after=after)
+                names.extend(task.name for _, task in tasks)
+                if after is None:
+                    break
+            self.assertEqual(names, [task.name for _, task in self.snapshot.query({}, sort_by=sort_by, limit=5)[0]])
+    
+    def test_search_ranked_with_snippets(self):
+        """测试全文搜索按相关度排序并返回匹配片段"""
+        # 同时命中两个词的任务排在最前
+        results = self.view.search('client presentation')
+        self.assertEqual(results[0]['name'], 'Prepare Presentation')
+        self.assertEqual({result['name'] for result in results}, {'Prepare Presentation', 'Email Client', 'Café Notes'})
+        self.assertIn('[Presentation]', results[0]['snippet'])
+        
+        # 名称命中排在只有描述命中之前；最后一个词按前缀匹配
+        results = self.view.search('present')
+        self.assertEqual([result['name'] for result in results], ['Prepare Presentation', 'Café Notes'])
+        self.assertGreater(results[0]['score'], results[1]['score'])
+        
+        # 忽略重音，查询语法字符按普通文本处理
+        self.assertEqual([result['name'] for result in self.view.search('cafe "notes')], ['Café Notes'])
+        self.assertEqual(self.view.search('client', category='personal'), [])
+        with self.assertRaisesRegex(ValueError, 'at least one word'):
+            match_expression('"*" -')
+    
+    def test_reimport_replaces_database(self):
+        """测试重新导入原子替换数据库，导入失败时保留原数据库"""
+        with open(self.csv_path, 'w', encoding='utf-8', newline='') as file:
+            file.write('Task Name,Category\nRun,Fitness\n')
+        with self.assertRaisesRegex(ValueError, 'missing columns'):
+            import_csv(self.csv_path, self.db_path)
+        self.assertEqual(os.listdir(self.directory).count('tasks.db'), 1)
+        self.assertEqual(len(asyncio.run(SqliteTaskStore(self.db_path).snapshot()).tasks_for('all')), 5)
+        
+        with open(self.csv_path, 'w', encoding='utf-8', newline='') as file:
+            file.write(HEADER + 'Fitness,Run,Jog in the park,2025-04-16,Medium,Completed\n')
+        self.assertEqual(import_csv(self.csv_path, self.db_path), 1)
+        view = asyncio.run(SqliteTaskStore(self.db_path).snapshot())
+        self.assertEqual([task.name for task in view.tasks_for('all')], ['Run'])
+        self.assertEqual([result['name'] for result in view.search('park')], ['Run'])
+    
+    def test_writes(self):
+        """测试新增和修改任务，全文索引同步更新"""
+        store = SqliteTaskStore(self.db_path)
+        task_id, task = asyncio.run(store.add({'category': 'Home', 'name': 'Fix Sink', 'due_date': '2025-05-01'}))
+        self.assertEqual((task_id, task.priority), (6, 'Medium'))
+        asyncio.run(store.update(6, {'description': 'Call the plumber', 'status': 'in progress'}))
+        _, task = asyncio.run(store.update(2, {'status': 'completed', 'name': 'Email Customer'}))
+        self.assertEqual(task.status, 'Completed')
+        
+        self.assertEqual(self.view.query({'status': 'in progress'})[0][-1][0], 6)
+        self.assertEqual([result['id'] for result in self.view.search('plumber')], [6])
+        self.assertEqual([result['id'] for result in self.view.search('customer')], [2])
+        self.assertEqual([result['id'] for result in self.view.search('email')], [2])
+        with self.assertRaisesRegex(ValueError, 'Task not found: 99'):
+            asyncio.run(store.update(99, {'status': 'Completed'}))
+    
+    def test_missing_database(self):
+        """测试数据库不存在"""
+        with self.assertRaisesRegex(ValueError, 'Task database not found'):
+            asyncio.run(SqliteTaskStore(os.path.join(self.directory, 'missing.db')).snapshot())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+"""
+任务存储测试
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server'))
+
+from task_store import TaskStore, decode_cursor, encode_cursor, to_thread
+
+HEADER = 'Category,Task Name,Description,Due Date,Priority,Status\n'
+
+class TaskStoreTestCase(unittest.TestCase):
+    """任务存储测试类"""
+    
+    def setUp(self):
+        """测试前置设置"""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'task.csv')
+        self.write(
+            'Work,Write Report,Quarterly report,2025-04-20,High,In Progress\n'
+            'work,Review PR,"Review the ""store"" change",2025-04-21,Low,Not Started\n'
+            'Fitness,Run,Jog in the park,2025-04-16,Medium,Completed\n'
+        )
+        self.store = TaskStore(self.path)
+    
+    def tearDown(self):
+        """测试后置清理"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+    
+    def write(self, rows, header=HEADER):
+        """写入任务文件"""
+        with open(self.path, 'w', encoding='utf-8', newline='') as file:
+            file.write(header + rows)
+    
+    def test_category_index(self):
+        """测试分类索引大小写不敏感并保持文件顺序"""
+        snapshot = asyncio.run(self.store.snapshot())
+        self.assertEqual([task.name for task in snapshot.tasks_for('WORK')], ['Write Report', 'Review PR'])
+        self.assertEqual(len(snapshot.tasks_for('all')), 3)
+        self.assertEqual(snapshot.tasks_for('missing'), [])
+        self.assertEqual(
+            snapshot.render('fitness'),
+            'Run - Jog in the park (Due: 2025-04-16, Priority: Medium, Status: Completed)'
+        )
+    
+    def test_loaded_once_until_file_changes(self):
+        """测试文件未变化时不重新加载，变化后在线程中重新加载"""
+        async def scenario():
+            with mock.patch('task_store.to_thread', wraps=to_thread) as threaded:
+                first = await self.store.snapshot()
+                self.assertIs(await self.store.snapshot(), first)
+                self.assertEqual(threaded.call_count, 1)
+                
+                self.write('Learning,Read,Read a book,2025-04-25,Low,Not Started\n')
+                os.utime(self.path, ns=(first.signature[0] + 10 ** 9, first.signature[0] + 10 ** 9))
+                second = await self.store.snapshot()
+                self.assertEqual(threaded.call_count, 2)
+            return second
+        
+        snapshot = asyncio.run(scenario())
+        self.assertEqual(snapshot.tasks_for('work'), [])
+        self.assertEqual(len(snapshot.tasks_for('learning')), 1)
+    
+    def test_concurrent_calls_share_one_load(self):
+        """测试并发查询只触发一次加载"""
+        async def scenario():
+            with mock.patch('task_store.to_thread', wraps=to_thread) as threaded:
+                snapshots = await asyncio.gather(*(self.store.snapshot() for _ in range(5)))
+                self.assertEqual(threaded.call_count, 1)
+            return snapshots
+        
+        snapshots = asyncio.run(scenario())
+        self.assertTrue(all(snapshot is snapshots[0] for snapshot in snapshots))
+    
+    def test_reordered_and_missing_columns(self):
+        """测试列顺序不同的文件，以及缺少列的文件"""
+        self.write(
+            'High,Run,Fitness,Jog,2025-04-16,Completed\n',
+            header='Priority,Task Name,Category,Description,Due Date,Status\n'
+        )
+        task = asyncio.run(self.store.snapshot()).tasks_for('fitness')[0]
+        self.assertEqual((task.name, task.priority, task.description), ('Run', 'High', 'Jog'))
+        
+        self.write('Run,Fitness\n', header='Task Name,Category\n')
+        with self.assertRaisesRegex(ValueError, 'missing columns'):
+            asyncio.run(TaskStore(self.path).snapshot())
+    
+    def test_missing_file(self):
+        """测试文件不存在"""
+        os.remove(self.path)
+        with self.assertRaisesRegex(ValueError, 'Task file not found'):
+            asyncio.run(self.store.snapshot())
+    
+    def test_query_filters_and_sorting(self):
+        """测试等值过滤、日期范围和两种排序"""
+        self.write(
+            'Work,A,a,2025-04-20,Low,Not Started\n'
+            'Work,B,b,2025-04-18,High,Completed\n'
+            'Home,C,c,2025-04-19,High,Not Started\n'
+            'work,D,d,2025-04-22,Medium,Not Started\n'
+            'Work,E,e,2025-04-25,Urgent,Not Started\n'
+        )
+        snapshot = asyncio.run(self.store.snapshot())
+        
+        def names(*args, **kwargs):
+            tasks, _ = snapshot.query(*args, **kwargs)
+            return [task.name for _, task in tasks]
+        
+        self.assertEqual(names({}), ['B', 'C', 'A', 'D', 'E'])
+        self.assertEqual(names({'category': 'WORK'}, sort_by='priority'), ['B', 'D', 'A', 'E'])
+        self.assertEqual(names({'category': 'work', 'status': 'not started'}), ['A', 'D', 'E'])
+        self.assertEqual(names({}, due_from='2025-04-19', due_to='2025-04-22'), ['C', 'A', 'D'])
+        self.assertEqual(names({'priority': 'high'}, due_to='2025-04-18', sort_by='priority'), ['B'])
+        self.assertEqual(names({'status': 'missing'}), [])
+    
+    def test_query_pagination(self):
+        """测试游标分页覆盖全部结果且不重复"""
+        rows = ''.join(f'Work,T{i},d,2025-04-{i % 5 + 10},{("High", "Low")[i % 2]},Not Started\n' for i in range(23))
+        self.write(rows)
+        snapshot = asyncio.run(self.store.snapshot())
+        for sort_by in ('due_date', 'priority'):
+            seen, after = [], None
+            while True:
+                tasks, after = snapshot.query({'category': 'work'}, sort_by=sort_by, limit=5, after=after)
+                seen.extend(task.name for _, task in tasks)
+                if after is None:
+                    break
+                after = decode_cursor(encode_cursor(sort_by, after), sort_by)
+            self.assertEqual(len(seen), 23)
+            self.assertEqual(len(set(seen)), 23)
+        self.assertEqual(len(snapshot.query({}, limit=23)[0]), 23)
+        self.assertIsNone(snapshot.query({}, limit=23)[1])
+    
+    def test_query_uses_sorted_indexes(self):
+        """测试查询只遍历最小的候选索引"""
+        self.write(''.join(
+            f'{"Rare" if i == 50 else "Work"},T{i},d,2025-{i % 12 + 1:02d}-01,Low,Not Started\n' for i in range(100)
+        ))
+        snapshot = asyncio.run(self.store.snapshot())
+        result, _ = snapshot.query({'category': 'rare', 'status': 'not started'})
+        self.assertEqual([(task_id, task.name) for task_id, task in result], [(51, 'T50')])
+        # 只为匹配最少的分类条件生成了有序索引
+        self.assertEqual(list(snapshot._sorted), [('category', 'rare', 'due_date')])
+        
+        result, _ = snapshot.query({'status': 'not started'}, due_from='2025-03-01', due_to='2025-03-01')
+        self.assertEqual(len(result), 9)
+        self.assertIn((None, None, 'due_date'), snapshot._sorted)
+    
+    def test_priority_sort_with_due_range(self):
+        """测试按优先级排序时日期范围在每个优先级内二分定位，只访问范围内的任务"""
+        priorities = ['High', 'Medium', 'Low', 'Urgent']
+        self.write(''.join(
+            f'Work,T{i},d,2025-{i % 12 + 1:02d}-{i % 28 + 1:02d},{priorities[i % 4]},Not Started\n' for i in range(4000)
+        ))
+        snapshot = asyncio.run(self.store.snapshot())
+        due_from, due_to = '2025-03-01', '2025-03-10'
+        in_range = [i for i, task in enumerate(snapshot.tasks) if due_from <= task.due_date <= due_to]
+        expected = sorted(in_range, key=snapshot.sort_key('priority'))
+        
+        class CountingList(list):
+            reads = 0
+            
+            def __getitem__(self, index):
+                CountingList.reads += 1
+                return list.__getitem__(self, index)
+                
+        snapshot.query({}, due_from=due_from, due_to=due_to, sort_by='priority')
+        snapshot.tasks = CountingList(snapshot.tasks)
+        positions, after = [], None
+        while True:
+            tasks, after = snapshot.query({}, due_from, due_to, 'priority', limit=50, after=after)
+            positions.extend(task_id - 1 for task_id, _ in tasks)
+            if after is None:
+                break
+        self.assertEqual(len(positions), len(in_range))
+        self.assertEqual(positions, expected)
+        # 只读取范围内的任务和二分查找经过的任务，不遍历整个优先级索引
+        self.assertLess(CountingList.reads, len(snapshot.tasks) // 2)
+    
+    def test_invalid_cursor(self):
+        """测试无效游标和排序方式不一致的游标"""
+        with self.assertRaisesRegex(ValueError, 'Invalid cursor'):
+            decode_cursor('not-a-cursor', 'due_date')
+        with self.assertRaisesRegex(ValueError, 'sort_by=priority'):
+            decode_cursor(encode_cursor('priority', (0, '2025-04-20', 1)), 'due_date')
+
+if __name__ == '__main__':
+    unittest.main()
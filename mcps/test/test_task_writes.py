@@ -0,0 +1,316 @@
+"""
+任务修改日志与压缩测试
+"""
+import asyncio
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import unittest
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server')
+sys.path.insert(0, SERVER_DIR)
+
+from task_store import Task, TaskStore, load_tasks
+
+HEADER = 'Category,Task Name,Description,Due Date,Priority,Status\n'
+
+class TaskWriteTestCase(unittest.TestCase):
+    """任务修改日志与压缩测试类"""
+    
+    def setUp(self):
+        """测试前置设置"""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'task.csv')
+        with open(self.path, 'w', encoding='utf-8', newline='') as file:
+            file.write(
+                HEADER +
+                'Work,Write Report,Quarterly report,2025-04-20,High,In Progress\n'
+                'Fitness,Run,Jog in the park,2025-04-16,Medium,Not Started\n'
+            )
+        with open(self.path, 'rb') as file:
+            self.original = file.read()
+    
+    def tearDown(self):
+        """测试后置清理"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+    
+    def reloaded(self):
+        """从磁盘重新加载的任务列表"""
+        return load_tasks(self.path).tasks
+    
+    def test_writes_applied_immediately_and_logged(self):
+        """测试修改立即反映到查询和索引中，只追加日志不重写 task.csv"""
+        store = TaskStore(self.path)
+        
+        async def scenario():
+            snapshot = await store.snapshot()
+            # 先生成缓存和有序索引，验证修改后同步更新
+            snapshot.render('work')
+            snapshot.query({'category': 'work'}, sort_by='priority')
+            snapshot.query({}, due_from='2025-04-01')
+            
+            task_id, task = await store.add({
+                'category': 'work', 'name': 'Email Client', 'due_date': '2025-04-17', 'priority': 'high'
+            })
+            self.assertEqual((task_id, task.priority, task.status), (3, 'High', 'Not Started'))
+            await store.update(2, {'category': 'Work', 'description': '', 'due_date': '2025-04-25'})
+            _, completed = await store.update(1, {'status': 'completed'})
+            self.assertEqual(completed.status, 'Completed')
+            return snapshot
+        
+        snapshot = asyncio.run(scenario())
+        tasks, _ = snapshot.query({'category': 'work'}, sort_by='priority')
+        self.assertEqual([(task_id, task.name) for task_id, task in tasks], [(3, 'Email Client'), (1, 'Write Report'), (2, 'Run')])
+        tasks, _ = snapshot.query({}, due_from='2025-04-18')
+        self.assertEqual([task_id for task_id, _ in tasks], [1, 2])
+        self.assertEqual(snapshot.query({'category': 'fitness'})[0], [])
+        self.assertEqual(snapshot.query({'status': 'completed'})[0], [(1, snapshot.tasks[0])])
+        self.assertIn('Run - Jog in the park (Due: 2025-04-25', snapshot.render('work'))
+        
+        with open(self.path, 'rb') as file:
+            self.assertEqual(file.read(), self.original)
+        with open(self.path + '.log', encoding='utf-8') as file:
+            self.assertEqual(json.loads(file.readline()), {'base': snapshot.digest})
+            self.assertEqual([json.loads(line)['id'] for line in file], [3, 2, 1])
+        self.assertEqual(self.reloaded(), snapshot.tasks)
+    
+    def test_invalid_writes(self):
+        """测试无效的修改"""
+        store = TaskStore(self.path)
+        cases = [
+            (store.add({'category': 'Work', 'name': 'x'}), 'Missing task fields: due_date'),
+            (store.add({'category': 'Work', 'name': 'x', 'due_date': '2025-02-30'}), 'Invalid due_date'),
+            (store.update(1, {'priority': 'urgent'}), 'Invalid priority'),
+            (store.update(1, {'status': ''}), 'No task fields'),
+            (store.update(9, {'status': 'Completed'}), 'Task not found: 9'),
+            (store.update(0, {'status': 'Completed'}), 'Task not found: 0'),
+        ]
+        for coroutine, message in cases:
+            with self.assertRaisesRegex(ValueError, message):
+                asyncio.run(coroutine)
+        self.assertFalse(os.path.exists(self.path + '.log'))
+    
+    def test_background_compaction(self):
+        """测试日志达到阈值后在后台压缩进 task.csv，压缩后不重新加载"""
+        store = TaskStore(self.path, compact_after=3)
+        
+        async def scenario():
+            snapshot = await store.snapshot()
+            for day in range(10, 13):
+                await store.add({'category': 'Home', 'name': f'Task {day}', 'due_date': f'2025-05-{day}'})
+            await store._compaction
+            self.assertIs(await store.snapshot(), snapshot)
+            await store.update(4, {'status': 'In Progress'})
+            return snapshot
+        
+        snapshot = asyncio.run(scenario())
+        with open(self.path, encoding='utf-8') as file:
+            self.assertEqual(len(file.readlines()), 1 + 5)
+        self.assertFalse(os.path.exists(self.path + '.log.1'))
+        self.assertFalse(os.path.exists(self.path + '.compacting'))
+        with open(self.path + '.log', encoding='utf-8') as file:
+            self.assertEqual(json.loads(file.readline()), {'base': snapshot.digest})
+            self.assertEqual(len(file.readlines()), 1)
+        self.assertEqual(self.reloaded(), snapshot.tasks)
+    
+    def test_recovery_from_torn_record(self):
+        """测试写了一半的日志记录被丢弃，之后的写入正常"""
+        store = TaskStore(self.path)
+        asyncio.run(store.update(2, {'status': 'Completed'}))
+        with open(self.path + '.log', 'ab') as file:
+            file.write(b'{"id": 1, "task": ["Work", "Wri')
+        
+        store = TaskStore(self.path)
+        snapshot = asyncio.run(store.snapshot())
+        self.assertEqual(snapshot.tasks[1].status, 'Completed')
+        self.assertEqual(snapshot.tasks[0].status, 'In Progress')
+        asyncio.run(store.update(1, {'priority': 'Low'}))
+        self.assertEqual(self.reloaded(), snapshot.tasks)
+        
+        # 中间的记录损坏无法自动恢复
+        with open(self.path + '.log', 'r+b') as file:
+            file.write(b'garbage')
+        with self.assertRaisesRegex(ValueError, 'corrupted at byte 0'):
+            self.reloaded()
+    
+    def test_recovery_at_each_compaction_step(self):
+        """测试压缩的每个阶段崩溃后重新加载得到相同的内容"""
+        store = TaskStore(self.path)
+        
+        async def write_some(offset):
+            for i in range(3):
+                await store.add({'category': 'Home', 'name': f'Task {offset + i}', 'due_date': '2025-05-01'})
+            await store.update(1, {'name': f'Renamed {offset}'})
+            return await store.snapshot()
+        
+        snapshot = asyncio.run(write_some(0))
+        expected = list(snapshot.tasks)
+        # 日志已改名为 .log.1，task.csv 尚未替换
+        tasks = store._rotate_log(snapshot)
+        self.assertEqual(self.reloaded(), expected)
+        # 压缩期间有新的修改，task.csv 已替换，新日志和 .log.1 尚未更新
+        snapshot = asyncio.run(write_some(10))
+        temp_path, digest = store._write_csv(tasks)
+        with open(self.path + '.log.1', 'ab') as file:
+            file.write(json.dumps({'into': digest}).encode() + b'\n')
+        os.replace(temp_path, self.path)
+        self.assertEqual(len(snapshot.tasks), 8)
+        self.assertEqual(self.reloaded(), snapshot.tasks)
+        # 重新加载时完成压缩的收尾
+        self.assertFalse(os.path.exists(self.path + '.log.1'))
+        store._snapshot = None
+        snapshot = asyncio.run(write_some(20))
+        self.assertEqual(self.reloaded(), snapshot.tasks)
+        # 压缩失败留下的 .log.1 在再次压缩时合并
+        store._rotate_log(snapshot)
+        asyncio.run(store.update(2, {'name': 'Renamed again'}))
+        self.assertEqual(self.reloaded(), snapshot.tasks)
+        asyncio.run(store.compact())
+        self.assertFalse(os.path.exists(self.path + '.log'))
+        self.assertFalse(os.path.exists(self.path + '.log.1'))
+        self.assertEqual(self.reloaded(), snapshot.tasks)
+    
+    def test_stale_log_after_external_edit(self):
+        """测试手工修改 task.csv 后不再重放基于旧文件的日志"""
+        store = TaskStore(self.path)
+        asyncio.run(store.add({'category': 'Home', 'name': 'Fix Sink', 'due_date': '2025-05-01'}))
+        asyncio.run(store.update(2, {'status': 'Completed'}))
+        # 删除第一行任务，日志中的编号对应的任务已经改变
+        with open(self.path, 'w', encoding='utf-8', newline='') as file:
+            file.write(HEADER + 'Fitness,Run,Jog in the park,2025-04-16,Medium,Not Started\n')
+        
+        with self.assertLogs('task_store', 'WARNING'):
+            snapshot = asyncio.run(store.snapshot())
+        self.assertEqual([(task.name, task.status) for task in snapshot.tasks], [('Run', 'Not Started')])
+        self.assertTrue(os.path.exists(self.path + '.log.stale'))
+        self.assertFalse(os.path.exists(self.path + '.log'))
+        
+        # 之后的修改基于新文件，重新加载结果一致
+        asyncio.run(store.update(1, {'status': 'In Progress'}))
+        asyncio.run(store.add({'category': 'Home', 'name': 'Fix Sink', 'due_date': '2025-05-01'}))
+        self.assertEqual(self.reloaded(), snapshot.tasks)
+        self.assertEqual(len(snapshot.tasks), 2)
+    
+    @unittest.skipUnless(hasattr(signal, 'SIGKILL'), '需要SIGKILL')
+    def test_recovery_after_killed_process(self):
+        """测试写入和压缩过程中进程被强制终止后，已确认的修改都能恢复"""
+        script = textwrap.dedent(f"""
+            import asyncio, sys
+            sys.path.insert(0, {SERVER_DIR!r})
+            from task_store import TaskStore
+            
+            async def main():
+                store = TaskStore({self.path!r}, compact_after=20)
+                i = 0
+                while True:
+                    task_id, _ = await store.add({{'category': 'Home', 'name': f'Task {{i}}', 'due_date': '2025-05-01'}})
+                    await store.update(task_id, {{'status': 'Completed'}})
+                    # 修改落盘后才输出编号
+                    print(task_id, flush=True)
+                    i += 1
+            
+            asyncio.run(main())
+        """)
+        process = subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE, text=True)
+        acknowledged = []
+        deadline = time.monotonic() + 30
+        while len(acknowledged) < 150 and time.monotonic() < deadline:
+            acknowledged.append(int(process.stdout.readline()))
+        time.sleep(random.random() * 0.05)
+        process.send_signal(signal.SIGKILL)
+        process.wait()
+        process.stdout.close()
+        
+        tasks = self.reloaded()
+        self.assertEqual(tasks[:2], [Task._make(line.split(',')) for line in self.original.decode().splitlines()[1:]])
+        # 已确认的修改全部存在；最后一次新增可能已落盘但其修改尚未写入
+        self.assertGreaterEqual(len(tasks), acknowledged[-1])
+        for i, task in enumerate(tasks[2:]):
+            self.assertEqual(task.name, f'Task {i}')
+            if i + 3 <= acknowledged[-1]:
+                self.assertEqual(task.status, 'Completed')
+        
+        # 恢复后可以继续写入和压缩
+        store = TaskStore(self.path)
+        asyncio.run(store.add({'category': 'Home', 'name': 'After crash', 'due_date': '2025-06-01'}))
+        asyncio.run(store.compact())
+        self.assertEqual(self.reloaded()[-1].name, 'After crash')
+        self.assertEqual(len(self.reloaded()), len(tasks) + 1)
+    
+    def test_concurrent_writers_stress(self):
+        """测试大量并发写入、查询和后台压缩交错执行时结果一致"""
+        store = TaskStore(self.path, compact_after=40)
+        writers, writes_per_writer = 16, 25
+        stop = threading.Event()
+        errors = []
+        
+        def reader(snapshot):
+            # 在其他线程中持续查询，检查索引与任务内容一致
+            while not stop.is_set():
+                try:
+                    for task_id, task in snapshot.query({'status': 'completed'}, sort_by='priority', limit=50)[0]:
+                        assert task.status == 'Completed', task
+                    snapshot.render('all')
+                except Exception as error:
+                    errors.append(error)
+                    return
+        
+        async def writer(number):
+            rng = random.Random(number)
+            for i in range(writes_per_writer):
+                if i % 3 == 0:
+                    await store.add({
+                        'category': f'Writer {number}', 'name': f'Task {number}-{i}',
+                        'due_date': f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+                        'priority': rng.choice(['High', 'Medium', 'Low'])
+                    })
+                else:
+                    snapshot = await store.snapshot()
+                    await store.update(rng.randint(1, len(snapshot.tasks)), {
+                        'status': rng.choice(['Not Started', 'In Progress', 'Completed']),
+                        'priority': rng.choice(['High', 'Medium', 'Low'])
+                    })
+        
+        async def scenario():
+            snapshot = await store.snapshot()
+            threads = [threading.Thread(target=reader, args=(snapshot,)) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            try:
+                await asyncio.gather(*(writer(number) for number in range(writers)))
+                if store._compaction is not None:
+                    await store._compaction
+            finally:
+                stop.set()
+                for thread in threads:
+                    thread.join()
+            self.assertIs(await store.snapshot(), snapshot)
+            return snapshot
+        
+        snapshot = asyncio.run(scenario())
+        self.assertEqual(errors, [])
+        added = sum(1 for i in range(writes_per_writer) if i % 3 == 0) * writers
+        self.assertEqual(len(snapshot.tasks), 2 + added)
+        self.assertEqual(len({task.name for task in snapshot.tasks}), 2 + added)
+        self.assertEqual(self.reloaded(), snapshot.tasks)
+        
+        # 增量维护的索引与重新建立的索引一致
+        fresh = load_tasks(self.path)
+        for sort_by in ('due_date', 'priority'):
+            for filters in ({}, {'status': 'completed'}, {'category': 'writer 3'}, {'priority': 'high'}):
+                self.assertEqual(
+                    snapshot.query(filters, sort_by=sort_by, limit=1000),
+                    fresh.query(filters, sort_by=sort_by, limit=1000)
+                )
+        self.assertEqual(snapshot.render('all'), fresh.render('all'))
+
+if __name__ == '__main__':
+    unittest.main()